@@ -5,7 +5,6 @@ from __future__ import annotations
 import json
 import os
 import re
-import shutil
 import subprocess
 import sys
 import time
@@ -23,8 +22,20 @@ ROOT = Path(__file__).resolve().parent
 WORKSPACE = ROOT.parent.resolve()
 RUNS_ROOT = ROOT / "runs"
 RUNNER_ROOT = ROOT / "runner"
+if str(RUNNER_ROOT) not in sys.path:
+    sys.path.insert(0, str(RUNNER_ROOT))
+
+import dispatch_daemon  # noqa: E402
+import exe_cache  # noqa: E402
+import lane_results  # noqa: E402
+import lane_stop  # noqa: E402
+from hedge import LEG_SEP  # noqa: E402
+from lane_state import classify_state  # noqa: E402
+import proc_tree  # noqa: E402
+from run_archive import ArchivedRun, list_archived  # noqa: E402
+from stream_events import SidecarReader  # noqa: E402
+from run_journal import EVENTS_FILE, ManifestReader, read_events  # noqa: E402
 RUN_SCRIPT = ROOT / "run_workers.ps1"
-STOP_SCRIPT = ROOT / "stop_workers.ps1"
 PM_SETTINGS_FILE = ROOT / "pm_settings.json"
 _CPU_PREV: dict[int, tuple[float, float]] = {}
 _PID_CACHE_TS: float = 0.0
@@ -32,6 +43,10 @@ _PID_CACHE_SET: set[int] = set()
 _PM_CACHE_TS: float = 0.0
 _PM_CACHE_DATA: dict[str, Any] | None = None
 _DOC_TEXT_CACHE: dict[str, tuple[float, str]] = {}
+_MANIFESTS = ManifestReader()
+_SIDECARS = SidecarReader()
+_ARCHIVE_MANIFESTS: dict[str, tuple[float, dict[str, Any]]] = {}
+ARCHIVE_PREFIX = "archive:"
 
 ORCH_DOCS = [
     ROOT / "inbox.md",
@@ -228,6 +243,63 @@ def _save_json(path: Path, payload: dict[str, Any]) -> tuple[bool, str]:
         return False, str(exc)
 
 
+def _workers_limit_error(config: dict[str, Any]) -> str:
+    """More than 8 workers is only allowed in queue mode (defaults.max_concurrent 1..8)."""
+    workers = config.get("workers", [])
+    if not isinstance(workers, list) or len(workers) <= 8:
+        return ""
+    defaults = config.get("defaults", {}) if isinstance(config.get("defaults", {}), dict) else {}
+    try:
+        limit = int(defaults.get("max_concurrent", 0) or 0)
+    except Exception:
+        limit = 0
+    if 1 <= limit <= 8:
+        return ""
+    return "workers limit exceeded (max 8 running; set defaults.max_concurrent to queue more)"
+
+
+def _archived_run(run_name: str) -> ArchivedRun | None:
+    """Archived runs are addressed as `archive:<name>.<stamp>` and read lazily from the archive."""
+    if not run_name.startswith(ARCHIVE_PREFIX):
+        return None
+    stem = run_name[len(ARCHIVE_PREFIX) :]
+    if not stem or Path(stem).name != stem or stem in {".", ".."}:
+        return None
+    run = ArchivedRun(RUNS_ROOT, stem)
+    return run if run.exists else None
+
+
+def _read_manifest(run_name: str) -> dict[str, Any] | None:
+    """Manifest snapshot plus journal events appended since; shared, do not mutate."""
+    archived = _archived_run(run_name)
+    if archived is None:
+        return _MANIFESTS.read(RUNS_ROOT / run_name)
+    assert archived.path is not None
+    try:
+        mtime = archived.path.stat().st_mtime
+    except OSError:
+        return None
+    key = str(archived.path)
+    cached = _ARCHIVE_MANIFESTS.get(key)
+    if cached is None or cached[0] != mtime:
+        manifest = archived.manifest()
+        if manifest is None:
+            return None
+        cached = (mtime, manifest)
+        _ARCHIVE_MANIFESTS[key] = cached
+    return cached[1]
+
+
+def _lane_log_tail(run_name: str, task_id: str, log_path: Path, n: int) -> str:
+    archived = _archived_run(run_name)
+    if archived is None:
+        return _tail(log_path, n)
+    data = archived.tail(f"{task_id}.log")
+    if data is None:
+        return "(no log)"
+    return "\n".join(data.decode("utf-8", errors="replace").splitlines()[-max(1, int(n)) :])
+
+
 def _read_static(filename: str) -> str:
     path = _resolve_static_file(filename)
     if path is None:
@@ -483,12 +555,12 @@ def _worker_map(orch: str) -> dict[str, dict[str, Any]]:
 def _list_runs(orch_filter: str = "") -> list[dict[str, Any]]:
     RUNS_ROOT.mkdir(parents=True, exist_ok=True)
     out: list[dict[str, Any]] = []
-    run_dirs = [p for p in RUNS_ROOT.iterdir() if p.is_dir()]
+    run_dirs = [p for p in RUNS_ROOT.iterdir() if p.is_dir() and not p.name.startswith(".")]
     run_dirs.sort(key=lambda p: p.stat().st_mtime, reverse=True)
     now_ts = time.time()
     want_orch = _orch_id(orch_filter) if str(orch_filter or "").strip() else ""
     for idx, run_dir in enumerate(run_dirs):
-        manifest = _read_json(run_dir / "manifest.json")
+        manifest = _read_manifest(run_dir.name)
         run_mtime = run_dir.stat().st_mtime
         mtime = datetime.fromtimestamp(run_mtime).strftime("%Y-%m-%d %H:%M:%S")
         if not manifest:
@@ -506,6 +578,19 @@ def _list_runs(orch_filter: str = "") -> list[dict[str, Any]]:
         if should_probe:
             running = sum(1 for e in started if _pid_running(int(e.get("pid")) if e.get("pid") else None))
         out.append({"name": run_dir.name, "mtime": mtime, "running": running, "total": len(started), "orch_id": run_orch})
+    # Archived runs follow the live ones; only their manifest is read (and cached).
+    for stem, path in list_archived(RUNS_ROOT):
+        name = f"{ARCHIVE_PREFIX}{stem}"
+        manifest = _read_manifest(name)
+        run_orch = str((manifest or {}).get("orch_id", ""))
+        if want_orch and _orch_id(run_orch) != want_orch:
+            continue
+        try:
+            mtime = datetime.fromtimestamp(path.stat().st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+        except OSError:
+            continue
+        total = len((manifest or {}).get("started", []))
+        out.append({"name": name, "mtime": mtime, "running": 0, "total": total, "orch_id": run_orch, "archived": True})
     return out
 
 
@@ -537,6 +622,8 @@ def _collect_docs(run_name: str, task_id: str, worker: dict[str, Any]) -> list[d
         add(prompt_path, "prompt", prompt_path.name)
 
     add(run_dir / "manifest.json", "manifest", "manifest.json")
+    result_file = lane_results.result_path(run_dir, task_id)
+    add(result_file, "result", result_file.name)
 
     for doc in ORCH_DOCS:
         try:
@@ -580,52 +667,6 @@ def _infer_progress(state: str, log_text: str, docs_count: int) -> int:
     return max(0, min(100, p))
 
 
-def _classify_state(*, running: bool, log_text: str) -> str:
-    if running:
-        return "RUNNING"
-    text = (log_text or "").strip()
-    if not text:
-        return "EXITED"
-    t = text.lower()
-    # Check the tail (last ~2000 chars) for final outcome signals
-    tail = t[-2000:] if len(t) > 2000 else t
-    fail_tokens = [
-        "traceback (most recent call last)",
-        "i can't find any task definition file",
-        "cannot find any task definition file",
-        "[fail]",
-        "fatal:",
-    ]
-    done_tokens = [
-        "updated the following files",
-        "apply_patch",
-        "compile check passed",
-        "done",
-        "completed",
-        "success",
-        "changed files",
-        "residual risk",
-        "runtime risk is low",
-        "implemented for this",
-        "validation run",
-        "tokens used",
-    ]
-    blocked_tokens = [
-        "rejected: blocked by policy",
-        "read-only policy",
-        "[guard]",
-        "switched to manual",
-    ]
-    # Tail-first: if the ending looks successful, trust it even if mid-log had errors
-    if any(token in tail for token in done_tokens):
-        return "DONE"
-    if any(token in tail for token in blocked_tokens):
-        return "BLOCKED"
-    if any(token in t for token in fail_tokens):
-        return "FAILED"
-    return "DONE"
-
-
 def _activity_from_log(log_text: str) -> str:
     text = (log_text or "").replace("\r", "")
     if not text.strip():
@@ -709,8 +750,72 @@ def _token_usage_from_text(log_text: str) -> dict[str, int | None]:
     return out
 
 
+_SHARD_DONE = {"DONE", "CACHED"}
+_SHARD_BAD = {"FAILED", "DEP_FAILED", "BLOCKED", "STALLED", "BUDGET_EXCEEDED", "STOPPED"}
+
+
+def _shard_parents(workers: list[dict[str, Any]], shards: dict[str, Any]) -> list[dict[str, Any]]:
+    """One summary row per sharded task, aggregated over its shard and review lanes. A
+    hedged shard counts as its best leg (a cancelled loser is not a failure)."""
+    lanes: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for w in workers:
+        lanes[str(w.get("task_id", "")).split(LEG_SEP, 1)[0]].append(w)
+    order = ["DONE", "CACHED", "RUNNING", "QUEUED", "EXITED"]
+    out: list[dict[str, Any]] = []
+    for parent, group in shards.items():
+        if not isinstance(group, dict):
+            continue
+        members = [str(m) for m in group.get("members", [])]
+        review = str(group.get("review", "") or "")
+        ids = members + ([review] if review else [])
+        rows = {tid: lanes.get(tid, []) for tid in ids}
+        states = {}
+        for tid, legs in rows.items():
+            picked = sorted((str(w.get("state", "")) for w in legs), key=lambda st: order.index(st) if st in order else len(order))
+            states[tid] = picked[0] if picked else "QUEUED"
+        done = sum(1 for tid in members if states[tid] in _SHARD_DONE)
+        if any(st == "RUNNING" for st in states.values()):
+            state = "RUNNING"
+        elif all(st in _SHARD_DONE for st in states.values()):
+            state = "DONE"
+        elif any(st in _SHARD_BAD for st in states.values()):
+            state = "FAILED"
+        elif any(st == "QUEUED" for st in states.values()):
+            state = "QUEUED"
+        else:
+            state = "EXITED"
+        flat = [w for legs in rows.values() for w in legs]
+        progress = [max((int(w.get("progress", 0) or 0) for w in legs), default=0) for legs in rows.values()]
+        first = next((w for w in flat), {})
+        totals = [w["tokens"]["total"] for w in flat if (w.get("tokens") or {}).get("total") is not None]
+        hint = f"{done}/{len(members)} shards done by {group.get('by', 'size')}"
+        if review:
+            hint += f"; review {states[review].lower()}"
+        out.append(
+            {
+                "task_id": parent,
+                "owner": first.get("owner", "-"),
+                "role": first.get("role", "-"),
+                "engine": first.get("engine", "-"),
+                "pid": None,
+                "state": state,
+                "metrics": {"cpu_percent": 0.0, "rss_mb": 0.0, "threads": None},
+                "progress": round(sum(progress) / max(1, len(progress)), 1),
+                "tokens": {"input": None, "output": None, "total": sum(totals) if totals else None},
+                "activity": hint,
+                "docs_count": sum(int(w.get("docs_count", 0) or 0) for w in flat),
+                "log_file": "",
+                "prompt_file": str(first.get("prompt_file", "")),
+                "state_hint": hint,
+                "shard_parent": True,
+                "shards": {"members": ids, "done": done, "total": len(members)},
+            }
+        )
+    return out
+
+
 def _run_status(run_name: str) -> dict[str, Any]:
-    manifest = _read_json(RUNS_ROOT / run_name / "manifest.json")
+    manifest = _read_manifest(run_name)
     if not manifest:
         return {"ok": False, "error": "manifest not found", "workers": [], "manual": []}
 
@@ -732,7 +837,12 @@ def _run_status(run_name: str) -> dict[str, Any]:
         owner = str(entry.get("owner", "") or cfg.get("owner", "")) or "-"
         engine = str(entry.get("engine", "") or cfg.get("engine", "")) or "-"
         pid = int(entry.get("pid")) if entry.get("pid") else None
-        is_running = _pid_running(pid)
+        host = str(entry.get("host", "") or "")
+        if host and host != "local":
+            # Runs on a remote agent: no local pid; the dispatcher records the exit.
+            is_running = entry.get("exit_code") is None
+        else:
+            is_running = _pid_running(pid)
         state = "RUNNING" if is_running else "EXITED"
         metrics = _proc_metrics(pid)
 
@@ -747,21 +857,66 @@ def _run_status(run_name: str) -> dict[str, Any]:
         log_path = _safe_resolve(str(merged.get("log_file", "")))
         if not log_path:
             log_path = RUNS_ROOT / run_name / f"{task_id}.log"
-        log_tail = _tail(log_path, 400)
-        tok = _token_usage_from_text(log_tail)
+        log_tail = _lane_log_tail(run_name, task_id, log_path, 400)
+        # Facts the dispatcher already extracted while pumping the output; the log-tail
+        # heuristics below are the fallback for lanes without a sidecar.
+        stream = _SIDECARS.read(log_path)
+        usage = (stream or {}).get("tokens")
+        if usage:
+            tok = {"input": usage.get("input_tokens"), "output": usage.get("output_tokens"), "total": usage.get("total_tokens")}
+        else:
+            tok = _token_usage_from_text(log_tail)
         tok_total = int(tok["total"]) if tok.get("total") is not None else 0
-        total_tokens += tok_total
-        state = _classify_state(running=is_running, log_text=log_tail)
+        cached = entry.get("state") == "CACHED"
+        if not cached:
+            # A memoized lane replays an earlier run's log; its tokens were not spent now.
+            total_tokens += tok_total
+        result = (stream or {}).get("result")
+        if not is_running and result:
+            state = "FAILED" if result.get("is_error") else "DONE"
+        else:
+            state = classify_state(running=is_running, log_text=log_tail)
         if (not is_running) and engine == "claude-cli" and state == "EXITED":
             # Claude CLI lane is one-shot by design in this runner; treat clean exit as done.
             state = "DONE"
+        retry_at = str(entry.get("retry_at", "") or "")
+        if not is_running and retry_at:
+            state = "QUEUED"
+        if cached:
+            state = "CACHED"
+        # Set by the dispatcher's supervisor (a lane it killed), not inferable from the log.
+        if not is_running and entry.get("state") in {"STALLED", "BUDGET_EXCEEDED", "STOPPED", "CANCELLED"}:
+            state = str(entry["state"])
         progress = _infer_progress(state, log_tail, len(docs))
-        activity = _activity_from_log(log_tail)
+        activity = str((stream or {}).get("activity") or "") if is_running else ""
+        if len(activity) > 88:
+            activity = activity[:85] + "..."
+        activity = activity or _activity_from_log(log_tail)
         hint = ""
-        if state == "BLOCKED":
+        if state == "QUEUED":
+            hint = f"rate-limited; attempt {int(entry.get('attempt', 1) or 1) + 1} at {retry_at}"
+        elif state == "BLOCKED":
             hint = "policy/write blocked; check lane log and guard"
         elif engine == "claude-cli" and state == "DONE":
             hint = "one-shot completed"
+        elif cached:
+            hint = f"reused result of run {(entry.get('cached') or {}).get('from_run', '?')}"
+        elif state == "STALLED":
+            hint = f"killed: {(entry.get('stalls') or [{}])[-1].get('reason', 'stalled')}"
+        elif state == "BUDGET_EXCEEDED":
+            budget = entry.get("budget") or {}
+            hint = f"{budget.get('scope', 'lane')} {budget.get('limit', 'budget')} reached" if budget else str(entry.get("error", ""))
+        elif state == "STOPPED":
+            hint = f"stopped in {entry['stop_sec']}s" if entry.get("stop_sec") is not None else str(entry.get("error", "stopped"))
+        elif state == "CANCELLED":
+            hint = f"hedge lost to {(entry.get('hedge') or {}).get('lost_to', '?')}"
+        elif (entry.get("hedge") or {}).get("won"):
+            applied = entry["hedge"].get("applied") or {}
+            hint = f"hedge won in {entry['hedge'].get('win_sec', '?')}s"
+            if applied and not applied.get("applied"):
+                hint += f"; not merged: {applied.get('error', '?')}"
+        elif (entry.get("hedge") or {}).get("won") is False:
+            hint = f"hedge leg: {entry['hedge'].get('error', 'lost')}"
         by_role[role].append(progress)
 
         workers.append(
@@ -771,6 +926,7 @@ def _run_status(run_name: str) -> dict[str, Any]:
                 "role": role,
                 "engine": engine,
                 "pid": pid,
+                "host": host,
                 "state": state,
                 "metrics": metrics,
                 "progress": progress,
@@ -780,6 +936,9 @@ def _run_status(run_name: str) -> dict[str, Any]:
                     "total": tok.get("total"),
                 },
                 "activity": activity,
+                "tool_calls": int((stream or {}).get("tool_calls", 0)),
+                "edits": len((stream or {}).get("edits", [])),
+                "errors": int((stream or {}).get("errors", 0)),
                 "docs_count": len(docs),
                 "log_file": str(merged.get("log_file", "")),
                 "prompt_file": str(merged.get("prompt_file", "")),
@@ -787,10 +946,80 @@ def _run_status(run_name: str) -> dict[str, Any]:
             }
         )
 
+    seen = {str(w.get("task_id", "")) for w in workers}
+    for entry in manifest.get("queued", []):
+        if not isinstance(entry, dict):
+            continue
+        task_id = str(entry.get("task_id", ""))
+        if task_id in seen:
+            continue
+        cfg = workers_cfg.get(task_id, {})
+        workers.append(
+            {
+                "task_id": task_id,
+                "owner": str(entry.get("owner", "") or cfg.get("owner", "")) or "-",
+                "role": str(entry.get("role", "") or cfg.get("role", "")) or "-",
+                "engine": str(entry.get("engine", "") or cfg.get("engine", "")) or "-",
+                "pid": None,
+                "state": "QUEUED",
+                "metrics": {"cpu_percent": 0.0, "rss_mb": 0.0, "threads": None},
+                "progress": 0,
+                "tokens": {"input": None, "output": None, "total": None},
+                "activity": f"waiting: {entry['waiting_on']}" if entry.get("waiting_on") else f"waiting for a slot ({entry.get('priority', 'P1')})",
+                "docs_count": 0,
+                "log_file": "",
+                "prompt_file": str(cfg.get("prompt_file", "")),
+                "state_hint": "queued",
+            }
+        )
+        seen.add(task_id)
+    for entry in manifest.get("failed", []):
+        # Lanes that never started: launch errors, and DEP_FAILED lanes whose dependency failed.
+        if not isinstance(entry, dict) or str(entry.get("task_id", "")) in seen:
+            continue
+        task_id = str(entry.get("task_id", ""))
+        cfg = workers_cfg.get(task_id, {})
+        workers.append(
+            {
+                "task_id": task_id,
+                "owner": str(entry.get("owner", "") or cfg.get("owner", "")) or "-",
+                "role": str(entry.get("role", "") or cfg.get("role", "")) or "-",
+                "engine": str(entry.get("engine", "") or cfg.get("engine", "")) or "-",
+                "pid": None,
+                "state": str(entry.get("state", "") or "FAILED"),
+                "metrics": {"cpu_percent": 0.0, "rss_mb": 0.0, "threads": None},
+                "progress": 0,
+                "tokens": {"input": None, "output": None, "total": None},
+                "activity": str(entry.get("error", "")),
+                "docs_count": 0,
+                "log_file": "",
+                "prompt_file": str(cfg.get("prompt_file", "")),
+                "state_hint": "not started",
+            }
+        )
+
     role_summary = [
         {"role": role, "progress": round(sum(vals) / max(1, len(vals)), 1), "workers": len(vals)}
         for role, vals in sorted(by_role.items())
     ]
+    lane_count = len(workers)
+    shards = manifest.get("shards") if isinstance(manifest.get("shards"), dict) else {}
+    if shards:
+        # Each sharded task gets a summary row right above its first lane.
+        parent_of = {
+            str(m): parent
+            for parent, group in shards.items()
+            if isinstance(group, dict)
+            for m in list(group.get("members", [])) + [group.get("review") or ""]
+            if m
+        }
+        for w in workers:
+            owner_task = parent_of.get(str(w.get("task_id", "")).split(LEG_SEP, 1)[0])
+            if owner_task:
+                w["shard_of"] = owner_task
+        for row in _shard_parents(workers, shards):
+            idx = next((i for i, w in enumerate(workers) if w.get("shard_of") == row["task_id"]), len(workers))
+            workers.insert(idx, row)
 
     return {
         "ok": True,
@@ -802,7 +1031,7 @@ def _run_status(run_name: str) -> dict[str, Any]:
         "role_summary": role_summary,
         "summary": {
             "running": running,
-            "total": len(workers),
+            "total": lane_count,
             "avg_cpu": round(total_cpu / max(1, running), 1) if running else 0.0,
             "mem_mb": round(total_mem, 1),
             "tokens_total": int(total_tokens),
@@ -811,7 +1040,7 @@ def _run_status(run_name: str) -> dict[str, Any]:
 
 
 def _run_documents(run_name: str, task_filter: str | None = None) -> dict[str, Any]:
-    manifest = _read_json(RUNS_ROOT / run_name / "manifest.json")
+    manifest = _read_manifest(run_name)
     if not manifest:
         return {"ok": False, "error": "manifest not found", "tasks": []}
     orch = str(manifest.get("orch_id", ""))
@@ -838,22 +1067,21 @@ def _run_documents(run_name: str, task_filter: str | None = None) -> dict[str, A
 
 
 def _tool_status() -> dict[str, Any]:
-    claude = next(
-        (
-            n
-            for n in [
-                "claude-code",
-                "claude-code.cmd",
-                "claude-code.ps1",
-                "claude",
-                "claude.cmd",
-                "claude.ps1",
-            ]
-            if shutil.which(n)
-        ),
-        "",
-    )
-    return {"ok": True, "codex": bool(shutil.which("codex")), "claude": bool(claude), "claude_cmd": claude or "(not found)"}
+    # Resolution and `--version` results come from the shared persistent cache, so after
+    # the first call this costs one stat per engine binary.
+    codex = exe_cache.which(*exe_cache.ENGINE_CANDIDATES["codex"])
+    claude = exe_cache.which(*exe_cache.ENGINE_CANDIDATES["claude"])
+    gemini = exe_cache.which(*exe_cache.ENGINE_CANDIDATES["gemini"])
+    versions = {name: exe_cache.version(exe) for name, exe in (("codex", codex), ("claude", claude), ("gemini", gemini)) if exe}
+    exe_cache.save()
+    return {
+        "ok": True,
+        "codex": bool(codex),
+        "claude": bool(claude),
+        "claude_cmd": Path(claude).name if claude else "(not found)",
+        "gemini": bool(gemini),
+        "versions": versions,
+    }
 
 
 def _start(payload: dict[str, Any]) -> dict[str, Any]:
@@ -862,9 +1090,9 @@ def _start(payload: dict[str, Any]) -> dict[str, Any]:
     reasoning = str(payload.get("reasoning_effort", "xhigh"))
 
     if isinstance(payload.get("config"), dict):
-        workers = payload["config"].get("workers", [])
-        if isinstance(workers, list) and len(workers) > 8:
-            return {"ok": False, "error": "workers limit exceeded (max 8)"}
+        limit_error = _workers_limit_error(payload["config"])
+        if limit_error:
+            return {"ok": False, "error": limit_error}
         ok, detail = _save_json(_tasks_file(orch), payload["config"])
         if not ok:
             return {"ok": False, "error": detail}
@@ -894,6 +1122,21 @@ def _start(payload: dict[str, Any]) -> dict[str, Any]:
         cmd += ["-MinWorkers", str(max(1, min_workers)), "-MaxWorkers", str(max(1, min(8, max_workers)))]
     if bool(payload.get("dry_run")):
         cmd.append("-DryRun")
+    if not pm_delegate:
+        # Resident dispatcher: submit directly instead of paying for PowerShell + a new Python.
+        dispatch_args = ["--model", model, "--reasoning-effort", reasoning]
+        if bool(payload.get("dry_run")):
+            dispatch_args.append("--dry-run")
+        reply = dispatch_daemon.try_submit(_tasks_file(orch), dispatch_args)
+        if reply is not None:
+            job = reply.get("job") or {}
+            return {
+                "ok": bool(reply.get("ok")),
+                "code": 0 if reply.get("ok") else 1,
+                "stdout": "\n".join(job.get("output", [])),
+                "stderr": str(reply.get("error", "")),
+                "job_id": job.get("job_id", ""),
+            }
     p = subprocess.run(
         cmd,
         cwd=str(WORKSPACE),
@@ -906,46 +1149,50 @@ def _start(payload: dict[str, Any]) -> dict[str, Any]:
     return {"ok": p.returncode == 0, "code": p.returncode, "stdout": p.stdout, "stderr": p.stderr}
 
 
+def _stop_grace(payload: dict[str, Any]) -> float | None:
+    try:
+        return max(0.0, float(payload["grace"])) if payload.get("grace") is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
 def _stop(payload: dict[str, Any]) -> dict[str, Any]:
-    cmd = ["powershell", "-ExecutionPolicy", "Bypass", "-File", str(STOP_SCRIPT)]
+    """Stop every live lane of a run (default: latest): all trees at once, grace, then force."""
     run_name = str(payload.get("run_name", "")).strip()
-    if run_name:
-        cmd += ["-RunName", run_name]
-    p = subprocess.run(
-        cmd,
-        cwd=str(WORKSPACE),
-        capture_output=True,
-        text=True,
-        encoding="utf-8",
-        errors="replace",
-        creationflags=_no_window_flags(),
-    )
-    return {"ok": p.returncode == 0, "code": p.returncode, "stdout": p.stdout, "stderr": p.stderr}
+    run_dir = RUNS_ROOT / run_name if run_name else lane_stop.latest_run_dir(RUNS_ROOT)
+    if run_dir is None:
+        return {"ok": True, "stdout": "[ORCH] no run to stop.", "stderr": ""}
+    if not run_dir.is_dir():
+        return {"ok": False, "stdout": "", "stderr": f"Run not found: {run_dir}"}
+    result = lane_stop.stop_run(run_dir, grace=_stop_grace(payload))
+    return {**result, "stdout": "\n".join(lane_stop.report_lines(result)), "stderr": str(result.get("error", ""))}
 
 
 def _stop_worker(payload: dict[str, Any]) -> dict[str, Any]:
-    """Stop a single worker by PID."""
+    """Stop a single worker's process tree (graceful, then forced)."""
     pid = payload.get("pid")
     task_id = str(payload.get("task_id", "")).strip()
-    if not pid:
+    run_name = str(payload.get("run_name", "")).strip()
+    grace = _stop_grace(payload)
+    if run_name and task_id and (RUNS_ROOT / run_name).is_dir():
+        result = lane_stop.stop_run(RUNS_ROOT / run_name, [task_id], grace)
+    elif pid:
+        lane = {"task_id": task_id, "pid": int(pid)}
+        result = {"ok": True, "stopped": proc_tree.stop_trees([lane], lane_stop.DEFAULT_GRACE if grace is None else grace)}
+    else:
         return {"ok": False, "error": "pid is required"}
-    pid = int(pid)
-    if not _pid_running(pid):
-        return {"ok": False, "error": f"PID {pid} is not running"}
-    try:
-        if os.name == "nt":
-            subprocess.run(
-                ["taskkill", "/PID", str(pid), "/T", "/F"],
-                capture_output=True,
-                text=True,
-                creationflags=_no_window_flags(),
-            )
-        else:
-            import signal
-            os.kill(pid, signal.SIGTERM)
-        return {"ok": True, "message": f"Stopped {task_id} (PID {pid})"}
-    except Exception as exc:
-        return {"ok": False, "error": str(exc)}
+    if not result.get("ok"):
+        return {"ok": False, "error": str(result.get("error", ""))}
+    if result.get("skipped"):
+        return {"ok": False, "error": f"{task_id}: {result['skipped'][0]['reason']}"}
+    row = next((r for r in result.get("stopped", []) if r.get("result") != "not running"), None)
+    if row is None:
+        return {"ok": False, "error": f"{task_id or 'PID ' + str(pid)} is not running"}
+    return {
+        "ok": True,
+        "message": f"Stopped {task_id} ({row['result']} in {row['stop_sec']:.2f}s)",
+        "stop_sec": row["stop_sec"],
+    }
 
 
 class Handler(BaseHTTPRequestHandler):
@@ -1044,6 +1291,34 @@ class Handler(BaseHTTPRequestHandler):
             task = (qs.get("task") or [""])[0].strip()
             self._json(_run_documents(run_name, task or None))
             return
+        if p.path.startswith("/api/run/") and p.path.endswith("/events"):
+            run_name = unquote(p.path[len("/api/run/") : -len("/events")].strip("/"))
+            qs = parse_qs(p.query)
+            try:
+                offset = max(0, int((qs.get("offset") or ["0"])[0]))
+            except ValueError:
+                offset = 0
+            archived = _archived_run(run_name)
+            if archived is not None:
+                # A finished journal never grows; same offset contract as read_events.
+                data = archived.read(EVENTS_FILE) or b""
+                if offset > len(data):
+                    offset = 0
+                end = max(offset, data.rfind(b"\n") + 1)
+                events = []
+                for line in data[offset:end].splitlines():
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue
+                self._json({"ok": True, "events": events, "offset": end})
+                return
+            if _safe_resolve(str(RUNS_ROOT / run_name)) is None:
+                self._json({"ok": False, "error": "run not found"}, HTTPStatus.BAD_REQUEST)
+                return
+            events, next_offset = read_events(RUNS_ROOT / run_name, offset)
+            self._json({"ok": True, "events": events, "offset": next_offset})
+            return
         if p.path.startswith("/api/run/") and "/log/" in p.path:
             seg = p.path[len("/api/run/") :]
             run_name, task_id = seg.split("/log/", 1)
@@ -1051,7 +1326,7 @@ class Handler(BaseHTTPRequestHandler):
             n = int((qs.get("tail") or ["180"])[0])
             run_name_unquoted = unquote(run_name)
             task_id_unquoted = unquote(task_id)
-            manifest = _read_json(RUNS_ROOT / run_name_unquoted / "manifest.json")
+            manifest = _read_manifest(run_name_unquoted)
             if not manifest:
                 self._json({"ok": False, "error": "manifest not found"})
                 return
@@ -1062,7 +1337,7 @@ class Handler(BaseHTTPRequestHandler):
             log_path = _safe_resolve(str(entry.get("log_file", "")))
             if not log_path:
                 log_path = RUNS_ROOT / run_name_unquoted / f"{task_id_unquoted}.log"
-            self._json({"ok": True, "text": _tail(log_path, n)})
+            self._json({"ok": True, "text": _lane_log_tail(run_name_unquoted, task_id_unquoted, log_path, n)})
             return
         if p.path == "/api/list-dirs":
             qs = parse_qs(p.query)
@@ -1132,9 +1407,9 @@ class Handler(BaseHTTPRequestHandler):
             if not isinstance(config, dict):
                 self._json({"ok": False, "error": "config must be object"}, HTTPStatus.BAD_REQUEST)
                 return
-            workers = config.get("workers", [])
-            if isinstance(workers, list) and len(workers) > 8:
-                self._json({"ok": False, "error": "workers limit exceeded (max 8)"}, HTTPStatus.BAD_REQUEST)
+            limit_error = _workers_limit_error(config)
+            if limit_error:
+                self._json({"ok": False, "error": limit_error}, HTTPStatus.BAD_REQUEST)
                 return
             ok, detail = _save_json(_tasks_file(orch), config)
             self._json({"ok": True, "path": detail} if ok else {"ok": False, "error": detail}, HTTPStatus.OK if ok else HTTPStatus.BAD_REQUEST)
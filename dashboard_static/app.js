@@ -43,7 +43,7 @@ function notifyStateChange(taskId, oldState, newState) {
 // ── Individual worker stop ──
 async function stopWorker(taskId, pid) {
   if (!confirm(`${taskId} (PID ${pid}) 를 중지하시겠습니까?`)) return;
-  const d = await api('/api/stop-worker', { method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify({task_id:taskId,pid}) });
+  const d = await api('/api/stop-worker', { method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify({task_id:taskId,pid,run_name:q('#run')?.value||''}) });
   setLogText(d.ok ? d.message : `stop failed: ${d.error||''}`);
   await loadRun();
 }
@@ -415,10 +415,14 @@ function renderWorkers(arr) {
     // Worker cell: task_id + role (from roster or engine fallback)
     const rosterMatch = TEAM_ROSTER.find(r => r.engine === String(w.engine||'').toLowerCase());
     const roleText = w.role || (rosterMatch ? rosterMatch.role : w.engine) || w.engine;
-    const wCell = `<td class='w-name'><div class='w-id'>${esc(w.task_id)}</div><div class='w-role'>${esc(roleText)}</div></td>`;
+    const hostText = w.host && w.host!=='local' ? ` @ ${w.host}` : '';
+    // Sharded task: a summary row, then its lanes indented under it.
+    const idText = w.shard_of ? `↳ ${w.task_id}` : w.task_id;
+    const subText = w.shard_parent ? `${roleText} · ${w.shards?.done||0}/${w.shards?.total||0} shards` : roleText + hostText;
+    const wCell = `<td class='w-name'><div class='w-id'>${esc(idText)}</div><div class='w-role'>${esc(subText)}</div></td>`;
 
     // State cell
-    const stClass = (state==='RUNNING'||state==='DONE')?'ok':(state==='EXITED'||state==='BLOCKED')?'warn':'bad';
+    const stClass = (state==='RUNNING'||state==='DONE'||state==='CACHED')?'ok':(state==='EXITED'||state==='BLOCKED'||state==='QUEUED'||state==='STOPPED'||state==='CANCELLED')?'warn':'bad';
     let stHtml = esc(state||'-');
     if (state==='RUNNING') {
       if (!workerStartTimes[w.task_id]) workerStartTimes[w.task_id]=Date.now();
@@ -440,13 +444,13 @@ function renderWorkers(arr) {
 
     // Actions cell
     const stopB = (state==='RUNNING'&&w.pid) ? `<button class='btn-stop-worker' onclick='stopWorker("${esc(w.task_id)}",${w.pid})' title='Stop'>■</button>` : '';
-    const logB = `<button class='act-btn' onclick='viewLog("${esc(w.task_id)}")'>Log</button>`;
+    const logB = w.shard_parent ? '' : `<button class='act-btn' onclick='viewLog("${esc(w.task_id)}")'>Log</button>`;
     const actCell = `<td>${stopB}${logB}</td>`;
 
     const runAttr = state==='RUNNING' ? ' data-running' : '';
     return `<tr data-task='${esc(w.task_id)}'${runAttr}>${wCell}${stCell}${pCell}${tCell}${actCell}</tr>`;
   }).join('');
-  renderWorkerScene(arr);
+  renderWorkerScene(rows.filter(w => !w.shard_parent));
 }
 
 // ── PM & Runs ──
@@ -481,7 +485,7 @@ async function loadRun() {
   updateKpi('#m5', formatTokens(s.tokens_total||0));
   const workers = d.workers||[];
   let totalCost=0;
-  for (const w of workers) totalCost += estimateCost(w.engine, w.tokens);
+  for (const w of workers) if (!w.shard_parent) totalCost += estimateCost(w.engine, w.tokens);
   updateKpi('#m6', totalCost>0 ? `$${totalCost.toFixed(2)}` : '$0');
   renderWorkers(workers);
 }
@@ -30,6 +30,15 @@ STOP_WORKERS = ROOT / "stop_workers.ps1"
 DISPATCH = ROOT / "runner" / "dispatch.py"
 PM_DELEGATE = ROOT / "runner" / "pm_delegate.py"
 PROMPTS_DIR = ROOT / "runner" / "prompts"
+if str(ROOT / "runner") not in sys.path:
+    sys.path.insert(0, str(ROOT / "runner"))
+
+import dispatch_daemon  # noqa: E402
+import lane_stop  # noqa: E402
+from run_journal import read_manifest  # noqa: E402
+from stream_events import SidecarReader  # noqa: E402
+
+_SIDECARS = SidecarReader()
 
 # ── Engine distribution rule (built from config) ──
 _ENGINE_PREFIXES = {"claude": "Claude", "codex": "Codex", "gemini": "Gemini"}
@@ -75,10 +84,9 @@ def _write_json(path: Path, data: dict[str, Any]) -> None:
     path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
-def _manifest_path() -> Path | None:
-    run_dir = RUNS_ROOT / "AGENT"
-    mf = run_dir / "manifest.json"
-    return mf if mf.exists() else None
+def _read_manifest() -> dict[str, Any] | None:
+    """Latest AGENT run: manifest snapshot plus journal events appended since."""
+    return read_manifest(RUNS_ROOT / "AGENT")
 
 
 def _ps(script: Path, *extra_args: str, timeout: int = 30) -> str:
@@ -98,19 +106,27 @@ def _ps(script: Path, *extra_args: str, timeout: int = 30) -> str:
 # Tool implementations
 # ─────────────────────────────────────
 
-def tool_dispatch(tasks: list[dict[str, str]], request: str = "") -> dict[str, Any]:
-    """Create tasks and launch workers. PM decides how many workers (1-8).
-    Each task can optionally specify engine/model to override the slot default."""
+def tool_dispatch(tasks: list[dict[str, str]], request: str = "", max_concurrent: int = 0) -> dict[str, Any]:
+    """Create tasks and launch workers. PM decides how many workers run at once (1-8).
+    Each task can optionally specify engine/model to override the slot default.
+    More than 8 tasks (or max_concurrent > 0) switches the dispatcher to queue mode:
+    tasks start by priority (P0 first) whenever a slot frees up.
+    A task with `hedge` runs on several engines at once; the first success wins.
+    A task with `shard` is split by scope into sibling lanes, optionally followed by a review lane."""
 
     if not tasks:
         return {"error": "At least 1 task required"}
-    if len(tasks) > 8:
-        tasks = tasks[:8]
 
     cfg = _read_json(TASKS_FILE)
     engines_cfg = cfg.get("engines", {})
     engine_slots = _build_engine_slots(engines_cfg)
-    defaults = cfg.get("defaults", {})
+    defaults = cfg.setdefault("defaults", {})
+    # Passed to this invocation only (--max-concurrent); the saved defaults stay as they are.
+    limit = 0
+    if max_concurrent:
+        limit = max(1, min(8, int(max_concurrent)))
+    elif len(tasks) > 8 and not int(defaults.get("max_concurrent", 0) or 0):
+        limit = 8
 
     workers = []
     for i, task in enumerate(tasks):
@@ -128,13 +144,15 @@ def tool_dispatch(tasks: list[dict[str, str]], request: str = "") -> dict[str, A
         prefix = _ENGINE_PREFIXES.get(task_engine, task_engine.capitalize())
 
         prompt_file = PROMPTS_DIR / f"{task_id}-auto.md"
-        prompt_content = f"""You are executing task {task_id} (Role: {role}).
+        shard_count = int(task.get("shard", 0) or 0)
+        # A sharded task renders one prompt per shard from this file, so keep it a template.
+        prompt_content = f"""You are executing task {"{{TASK_ID}}" if shard_count > 1 else task_id} (Role: {role}).
 
-## Goal: {goal}
+## Goal: {"{{GOAL}}" if shard_count > 1 else goal}
 
 ### Scope
 Files to work on:
-{chr(10).join(f'- {p}' for p in scope)}
+{"{{SCOPE_PATHS}}" if shard_count > 1 else chr(10).join(f'- {p}' for p in scope)}
 
 ### Instructions
 1. Read each file in scope completely
@@ -142,6 +160,7 @@ Files to work on:
 3. Execute the goal described above
 4. Verify syntax after editing (python -c or node -c)
 5. Print a summary of changes at the end
+6. Write the same summary (what changed, what was verified) to {{{{RESULT_FILE}}}}
 
 ### Constraints
 - ONLY modify files listed in scope
@@ -162,6 +181,19 @@ Files to work on:
             "done_when": task.get("done_when", ["task completed", "syntax verified"]),
             "prompt_file": f"orchestrator/runner/prompts/{task_id}-auto.md",
         }
+        if task.get("priority"):
+            worker["priority"] = task["priority"]
+        if task.get("depends_on"):
+            worker["depends_on"] = task["depends_on"]
+        if task.get("hedge"):
+            hedge = str(task["hedge"]).strip()
+            worker["hedge"] = int(hedge) if hedge.isdigit() else [e.strip() for e in hedge.split(",") if e.strip()]
+        if shard_count > 1:
+            worker["shard"] = {
+                "count": shard_count,
+                "by": task.get("shard_by", "size"),
+                "review": bool(task.get("shard_review", False)),
+            }
         # Model: task-level > slot default
         if task_engine == "claude":
             worker["claude_model"] = task_model or slot.get("claude_model", "")
@@ -181,20 +213,27 @@ Files to work on:
     codex_cfg = engines_cfg.get("codex", {})
     codex_model = codex_cfg.get("model", "gpt-5.4")
     codex_reasoning = codex_cfg.get("reasoning_effort", "high")
-    env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
-    subprocess.Popen(
-        ["python", str(DISPATCH), "--tasks-file", str(TASKS_FILE),
-         "--model", codex_model, "--reasoning-effort", codex_reasoning],
-        cwd=str(WORKSPACE), env=env,
-        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
-    )
-    time.sleep(2)
+    dispatch_args = ["--model", codex_model, "--reasoning-effort", codex_reasoning]
+    if limit:
+        dispatch_args += ["--max-concurrent", str(limit)]
+    # A resident dispatcher (runner/dispatch_daemon.py serve) answers once the first
+    # workers are up; otherwise spawn dispatch.py and give it time to write the manifest.
+    reply = dispatch_daemon.try_submit(TASKS_FILE, dispatch_args)
+    if reply is not None and not reply.get("ok"):
+        return {"ok": False, "error": reply.get("error", "dispatcher daemon rejected the job"), "job": reply.get("job")}
+    if reply is None:
+        env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
+        subprocess.Popen(
+            ["python", str(DISPATCH), "--tasks-file", str(TASKS_FILE), *dispatch_args],
+            cwd=str(WORKSPACE), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+        time.sleep(2)
 
     # Read manifest
-    mf = _manifest_path()
-    if mf:
-        manifest = _read_json(mf)
+    manifest = _read_manifest()
+    if manifest:
         started = [
             {"task_id": s["task_id"], "engine": s["engine"], "owner": s["owner"], "pid": s["pid"]}
             for s in manifest.get("started", [])
@@ -212,12 +251,14 @@ def _parse_token_usage(log_text: str, engine: str) -> dict[str, Any] | None:
         return None
     try:
         if engine == "claude":
-            # Claude --output-format json: single JSON line with usage field
+            # Claude --output-format json / stream-json: the result line carries the total usage
             for line in reversed(log_text.strip().splitlines()):
                 line = line.strip()
                 if line.startswith("{") and '"usage"' in line:
                     data = json.loads(line)
-                    usage = data.get("usage", {})
+                    usage = data.get("usage")
+                    if not isinstance(usage, dict):
+                        continue
                     model_usage = data.get("modelUsage", {})
                     cost = data.get("total_cost_usd")
                     input_t = usage.get("input_tokens", 0)
@@ -263,11 +304,10 @@ def _parse_token_usage(log_text: str, engine: str) -> dict[str, Any] | None:
 
 def tool_status() -> dict[str, Any]:
     """Check status of all running orchestrator workers (with token usage)."""
-    mf = _manifest_path()
-    if not mf:
+    manifest = _read_manifest()
+    if not manifest:
         return {"ok": False, "error": "No active run found"}
 
-    manifest = _read_json(mf)
     results = []
     total_tokens_all = 0
     total_cost_all = 0.0
@@ -279,7 +319,10 @@ def tool_status() -> dict[str, Any]:
 
         # Check if process is still running
         alive = False
-        if pid:
+        if str(entry.get("host", "") or "local") != "local":
+            # Remote lane: the pid is on the agent; the dispatcher records the exit.
+            alive = entry.get("exit_code") is None
+        elif pid:
             try:
                 os.kill(pid, 0)
                 alive = True
@@ -297,8 +340,12 @@ def tool_status() -> dict[str, Any]:
             except Exception:
                 pass
 
-        token_usage = _parse_token_usage(log_text, engine) if not alive else None
-        if token_usage:
+        stream = _SIDECARS.read(log_file) if log_file.name else None
+        token_usage = None
+        if not alive:
+            token_usage = (stream or {}).get("tokens") or _parse_token_usage(log_text, engine)
+        cached = entry.get("state") == "CACHED"
+        if token_usage and not cached:
             total_tokens_all += token_usage.get("total_tokens", 0)
             total_cost_all += token_usage.get("cost_usd", 0) or 0
 
@@ -308,7 +355,7 @@ def tool_status() -> dict[str, Any]:
             "owner": entry.get("owner", "?"),
             "pid": pid,
             "alive": alive,
-            "state": "RUNNING" if alive else "DONE",
+            "state": "RUNNING" if alive else (str(entry.get("state") or "") or "DONE"),
             "log_tail": log_tail,
         }
         if token_usage:
@@ -317,39 +364,24 @@ def tool_status() -> dict[str, Any]:
 
     running = sum(1 for r in results if r["alive"])
     done = sum(1 for r in results if not r["alive"])
+    queued = [q.get("task_id") for q in manifest.get("queued", []) if isinstance(q, dict)]
     return {
         "ok": True,
         "running": running,
         "done": done,
+        "queued": queued,
         "total_tokens": total_tokens_all,
         "total_cost_usd": round(total_cost_all, 6) if total_cost_all else None,
         "workers": results,
     }
 
 
-def tool_stop() -> dict[str, Any]:
-    """Stop all running orchestrator workers."""
-    mf = _manifest_path()
-    if not mf:
+def tool_stop(grace: float | None = None) -> dict[str, Any]:
+    """Stop all running orchestrator workers: every process tree at once, then force after
+    the grace period.  Rows report each lane's stop latency."""
+    if not _read_manifest():
         return {"ok": False, "error": "No active run found"}
-
-    manifest = _read_json(mf)
-    killed = []
-    for entry in manifest.get("started", []):
-        pid = entry.get("pid")
-        if not pid:
-            continue
-        try:
-            os.kill(pid, 0)  # check alive
-            subprocess.run(
-                ["taskkill", "/F", "/PID", str(pid)],
-                capture_output=True, timeout=5,
-            )
-            killed.append({"task_id": entry["task_id"], "pid": pid})
-        except Exception:
-            pass
-
-    return {"ok": True, "killed": killed}
+    return lane_stop.stop_run(RUNS_ROOT / "AGENT", grace=grace)
 
 
 def tool_logs(task_id: str = "AGENT-T1", lines: int = 30) -> dict[str, Any]:
@@ -391,23 +423,30 @@ def tool_dashboard(action: str = "status") -> dict[str, Any]:
 
 TOOLS = {
     "orchestrator_dispatch": {
-        "description": "Create and launch workers. PM decides count (1-8) and can override engine/model per task. Default engine/model from 'engines' config.",
+        "description": "Create and launch workers. PM decides count and can override engine/model/priority per task. Up to 8 run at once; more are queued by priority. Default engine/model from 'engines' config.",
         "inputSchema": {
             "type": "object",
             "properties": {
                 "request": {"type": "string", "description": "Natural language description of the work"},
+                "max_concurrent": {"type": "integer", "description": "Queue mode: max workers running at once (1-8). Defaults to 8 when more than 8 tasks are given."},
                 "tasks": {
                     "type": "array",
-                    "description": "List of task definitions (1-8). Only create as many as needed.",
+                    "description": "List of task definitions. Only create as many as needed; beyond max_concurrent they are queued.",
                     "items": {
                         "type": "object",
                         "properties": {
                             "goal": {"type": "string", "description": "What this worker should accomplish"},
-                            "scope_paths": {"type": "string", "description": "Comma-separated file paths relative to repo root"},
+                            "scope_paths": {"type": "string", "description": "Comma-separated file paths, dirs or globs relative to repo root. Tasks with overlapping scopes run one after another."},
                             "role": {"type": "string", "description": "Short role name (e.g. Backend, Frontend, Config)"},
                             "engine": {"type": "string", "enum": ["claude", "codex", "gemini"], "description": "Override engine for this task"},
                             "model": {"type": "string", "description": "Override model for this task (e.g. claude-opus-4-6, gpt-5.4, gemini-2.5-pro)"},
                             "repo": {"type": "string", "description": "Repository name (default: machining_monitor_server)"},
+                            "priority": {"type": "string", "enum": ["P0", "P1", "P2"], "description": "Queue priority (P0 starts first, default P1)"},
+                            "depends_on": {"type": "string", "description": "Comma-separated task ids that must finish successfully first (tasks are AGENT-T1, AGENT-T2, ... in list order)"},
+                            "hedge": {"type": "string", "description": "Race this task on several engines and keep the first success: a count (e.g. 2) or comma-separated engines"},
+                            "shard": {"type": "integer", "description": "Split the files in scope_paths into this many balanced shards that run in parallel (2-16)"},
+                            "shard_by": {"type": "string", "enum": ["size", "lines"], "description": "Balance shards by file size (default) or line count"},
+                            "shard_review": {"type": "boolean", "description": "Add a review lane that runs after every shard and checks they fit together"},
                         },
                         "required": ["goal", "scope_paths"],
                     },
@@ -423,8 +462,13 @@ TOOLS = {
         "fn": tool_status,
     },
     "orchestrator_stop": {
-        "description": "Stop all running orchestrator workers.",
-        "inputSchema": {"type": "object", "properties": {}},
+        "description": "Stop all running orchestrator workers (graceful, then forced); reports per-lane stop latency.",
+        "inputSchema": {
+            "type": "object",
+            "properties": {
+                "grace": {"type": "number", "description": "Seconds before force-kill (default: each lane's kill_grace)"},
+            },
+        },
         "fn": tool_stop,
     },
     "orchestrator_logs": {
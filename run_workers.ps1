@@ -7,7 +7,8 @@ param(
     [int]$MinWorkers = 1,
     [int]$MaxWorkers = 10,
     [switch]$Wait,
-    [switch]$DryRun
+    [switch]$DryRun,
+    [switch]$Simulate
 )
 
 $ErrorActionPreference = "Stop"
@@ -49,6 +50,7 @@ $args = @(
 )
 if ($Wait) { $args += "--wait" }
 if ($DryRun) { $args += "--dry-run" }
+if ($Simulate) { $args += "--simulate" }
 
 Write-Host "[ORCH] workspace: $root"
 Write-Host "[ORCH] tasks: $tasksFile"
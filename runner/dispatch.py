@@ -2,16 +2,44 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
+import math
 import os
+import queue
+import random
+import re
+import selectors
 import shlex
 import shutil
 import subprocess
 import sys
+import threading
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
+
+import exe_cache
+import hedge
+import host_load
+import lane_budget
+import lane_results
+import lane_watchdog
+import memo_cache
+import proc_tree
+import remote_runner
+import resource_limits
+import run_archive
+import schedule_sim
+import scope_plan
+import shard
+import stream_events
+import task_dag
+import worktree_isolation
+from outcome_index import OutcomeIndex, index_path
+from run_journal import RunJournal, read_manifest
 
 
 @dataclass
@@ -27,10 +55,35 @@ class WorkerRun:
     repo: str
     stdin_text: str | None = None
     process: subprocess.Popen[str] | None = None
+    priority: int = 1
+    entry: dict[str, Any] = field(default_factory=dict)
+    started_at: float = 0.0
+    reserved_tokens: int = 0
+    deferred_since: float = 0.0
+    retry: dict[str, float] = field(default_factory=dict)
+    attempt: int = 0
+    not_before: float = 0.0
+    log_offset: int = 0
+    pump: stream_events.LogFollower | None = None
+    stream_usage: dict[str, Any] | None = None
+    stream_result: dict[str, Any] | None = None
+    limits: dict[str, Any] = field(default_factory=dict)
+    worktree: dict[str, Any] = field(default_factory=dict)
+    scope: list[str] = field(default_factory=list)
+    depends_on: list[str] = field(default_factory=list)
+    memo: dict[str, Any] = field(default_factory=dict)
+    worker: dict[str, Any] = field(default_factory=dict)
+    stall: dict[str, Any] = field(default_factory=dict)
+    watch: lane_watchdog.StallWatch | None = None
+    budget: dict[str, float] = field(default_factory=dict)
+    kill_grace: float = 10.0
+    host: str = ""
+    stop_requested: float = 0.0
 
 
 def _workspace_write_probe(path: Path) -> tuple[bool, str]:
-    probe = path / ".orch_write_probe.tmp"
+    # Unique per thread: lanes sharing a workspace are probed concurrently.
+    probe = path / f".orch_write_probe.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
         path.mkdir(parents=True, exist_ok=True)
         probe.write_text("probe", encoding="utf-8")
@@ -45,8 +98,12 @@ def _workspace_write_probe(path: Path) -> tuple[bool, str]:
 
 
 def _tail_text(path: Path, max_chars: int = 9000) -> str:
+    # Seek instead of reading the whole log: 4 bytes per char covers any UTF-8 tail.
     try:
-        text = path.read_text(encoding="utf-8", errors="replace")
+        with path.open("rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - max_chars * 4))
+            text = f.read().decode("utf-8", errors="replace")
     except Exception:
         return ""
     if len(text) <= max_chars:
@@ -54,14 +111,82 @@ def _tail_text(path: Path, max_chars: int = 9000) -> str:
     return text[-max_chars:]
 
 
-def _latest_task_log_hint(runs_root: Path, task_id: str) -> str:
-    run_dirs = [p for p in runs_root.iterdir() if p.is_dir()] if runs_root.exists() else []
+def _recent_run_dirs(runs_root: Path, limit: int = 20) -> list[Path]:
+    run_dirs = [p for p in runs_root.iterdir() if p.is_dir() and not p.name.startswith(".")] if runs_root.exists() else []
     run_dirs.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-    for run_dir in run_dirs[:20]:
+    return run_dirs[:limit]
+
+
+# States the dispatcher sets on a row itself; they win over the exit code.
+_SUPERVISOR_STATES = {"STALLED", "BUDGET_EXCEEDED", "STOPPED", "CANCELLED"}
+
+
+def _outcome_record(row: dict[str, Any], log_text: str, engine: str, log_file: Path) -> dict[str, Any]:
+    """Compact outcome-index row for a finished lane; the block reason is classified once here."""
+    tail = log_text[-9000:]
+    block = ""
+    if _looks_like_readonly_policy(tail):
+        block = "readonly_policy"
+    elif _looks_like_claude_quota_or_prompt_block(tail):
+        block = "quota_or_prompt"
+    code = row.get("exit_code")
+    usage = _parse_token_usage(log_text, engine)
+    try:
+        log_mtime = log_file.stat().st_mtime
+    except OSError:
+        log_mtime = 0.0
+    if row.get("state") in _SUPERVISOR_STATES:
+        state = str(row["state"])
+    else:
+        state = "UNKNOWN" if code is None else ("DONE" if int(code) == 0 else "FAILED")
+    return {
+        "state": state,
+        "block": block,
+        "engine": engine,
+        "exit_code": code,
+        "ended_at": row.get("ended_at"),
+        "duration_sec": row.get("duration_sec"),
+        "tokens": usage.get("total_tokens") if usage else None,
+        "log_file": str(log_file),
+        "log_mtime": log_mtime,
+    }
+
+
+def _backfill_outcomes(run_dir: Path, index: OutcomeIndex) -> None:
+    """Index lanes of the previous run that finished without a supervising dispatcher,
+    before the run dir is cleared.  Logs already indexed at exit are skipped."""
+    if not run_dir.is_dir():
+        return
+    rows = {
+        str(row.get("task_id")): row
+        for row in ((read_manifest(run_dir) or {}).get("started") or [])
+        if isinstance(row, dict)
+    }
+    for log_file in run_dir.glob("*.log"):
+        task_id = log_file.stem
+        known = index.get(task_id)
+        try:
+            if known and float(known.get("log_mtime", 0) or 0) >= log_file.stat().st_mtime:
+                continue
+        except OSError:
+            continue
+        row = rows.get(task_id, {})
+        index.record(task_id, _outcome_record(row, _tail_text(log_file, 64000), str(row.get("engine", "")), log_file), flush=False)
+    index.flush()
+
+
+def _latest_task_log(task_id: str, run_dirs: list[Path]) -> tuple[Path | None, float]:
+    """(newest `<task>.log` across run dirs, its mtime), or (None, 0.0)."""
+    newest: tuple[Path | None, float] = (None, 0.0)
+    for run_dir in run_dirs:
         log_file = run_dir / f"{task_id}.log"
-        if log_file.exists():
-            return _tail_text(log_file, 9000)
-    return ""
+        try:
+            mtime = log_file.stat().st_mtime
+        except OSError:
+            continue
+        if mtime > newest[1]:
+            newest = (log_file, mtime)
+    return newest
 
 
 def _looks_like_readonly_policy(log_text: str) -> bool:
@@ -114,14 +239,159 @@ def _looks_like_claude_quota_or_prompt_block(log_text: str) -> bool:
     return any(tok in t for tok in tokens)
 
 
+_RATE_LIMIT_429 = re.compile(r"\b(status|code|error|http)\W{0,3}429\b")
+
+
+def _looks_like_rate_limit(log_text: str) -> bool:
+    """Transient quota/rate-limit failure worth an in-run retry (no approval prompts)."""
+    t = (log_text or "").lower()
+    if not t:
+        return False
+    tokens = [
+        "rate limit",
+        "rate_limit",
+        "ratelimit",
+        "too many requests",
+        "resource_exhausted",
+        "resource exhausted",
+        "hit your limit",
+        "quota",
+        "overloaded",
+    ]
+    return any(tok in t for tok in tokens) or bool(_RATE_LIMIT_429.search(t))
+
+
+def _read_from_offset(path: Path, offset: int, max_chars: int = 64000) -> str:
+    try:
+        with path.open("rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(int(offset), size - max_chars * 4, 0))
+            data = f.read()
+    except Exception:
+        return ""
+    return data.decode("utf-8", errors="replace")[-max_chars:]
+
+
+def _retry_policy(engine_cfg: dict[str, Any], worker: dict[str, Any]) -> dict[str, float]:
+    """In-run retry for rate-limited lanes; worker keys override engines.<name>."""
+
+    def pick(key: str, default: float) -> float:
+        raw = worker.get(key, engine_cfg.get(key, default))
+        try:
+            return max(0.0, float(raw))
+        except (TypeError, ValueError):
+            return default
+
+    return {
+        "max_retries": int(pick("max_retries", 0)),
+        "base_delay": pick("retry_base_delay", 30.0),
+        "jitter": min(1.0, pick("retry_jitter", 0.25)),
+        "max_delay": pick("retry_max_delay", 900.0),
+    }
+
+
+def _kill_grace(defaults: dict[str, Any], engine_cfg: dict[str, Any], worker: dict[str, Any]) -> float:
+    """Seconds a lane killed by the supervisor gets between the polite signal and the forced kill."""
+    try:
+        return max(0.0, float(worker.get("kill_grace", engine_cfg.get("kill_grace", defaults.get("kill_grace", 10.0)))))
+    except (TypeError, ValueError):
+        return 10.0
+
+
+def _retry_delay(policy: dict[str, float], attempt: int) -> float:
+    """Exponential backoff: base * 2^(attempt-1), +/- jitter fraction, capped at max_delay."""
+    delay = float(policy.get("base_delay", 30.0)) * (2 ** max(0, attempt - 1))
+    jitter = float(policy.get("jitter", 0.0))
+    if jitter:
+        delay *= 1.0 + random.uniform(-jitter, jitter)
+    return max(0.0, min(delay, float(policy.get("max_delay", 900.0))))
+
+
+def _exit_rate_limited(code: int, killed: bool, attempt_text: str, stream_result: dict[str, Any] | None) -> bool:
+    """Whether a lane's exit was a rate limit worth retrying.  A clean exit counts only
+    when the CLI's own result event reports a limit error; words like "quota" in a
+    successful summary are not a signal."""
+    if killed:
+        return False
+    if code != 0:
+        return _looks_like_rate_limit(attempt_text)
+    result = stream_result or {}
+    return bool(result.get("is_error")) and _looks_like_rate_limit(str(result.get("text", "")))
+
+
+def _exit_action(run: WorkerRun, limited: bool, run_budget_hit: bool) -> str:
+    """What follows a lane's exit: "restart" (stalled, restarts left), "retry" (rate
+    limited, retries left) or "finish"."""
+    stalls = run.entry.get("stalls", [])
+    if run.entry.get("state") == "STALLED" and not run_budget_hit and len(stalls) <= int(run.stall.get("restarts", 0)):
+        return "restart"
+    if limited and run.attempt - len(stalls) <= int(run.retry.get("max_retries", 0)):
+        return "retry"
+    return "finish"
+
+
+def _dep_lanes(dep: str, shard_groups: dict[str, dict[str, Any]], hedge_groups: dict[str, dict[str, Any]]) -> list[str]:
+    """The lanes a dependency on `dep` waits for: a sharded task's review lane (or every
+    shard), a hedged task's legs, otherwise `dep` itself."""
+    if dep in shard_groups:
+        return [lane for member in shard_groups[dep]["after"] for lane in _dep_lanes(member, shard_groups, hedge_groups)]
+    return hedge_groups.get(dep, {}).get("legs") or [dep]
+
+
+def _failed_hedge_groups(hedge_groups: dict[str, dict[str, Any]], dep_state: dict[str, str]) -> list[str]:
+    """Hedged tasks still open whose every leg has failed (or never ran); marks them FAILED."""
+    failed: list[str] = []
+    for group_id, group in hedge_groups.items():
+        if "state" in group or not group["legs"]:
+            continue
+        if all(dep_state.get(leg) in {"FAILED", "MISSING"} for leg in group["legs"]):
+            group["state"] = "FAILED"
+            dep_state[group_id] = "FAILED"
+            failed.append(group_id)
+    return failed
+
+
+def _settle_shard_groups(shard_groups: dict[str, dict[str, Any]], dep_state: dict[str, str]) -> list[str]:
+    """Settle sharded tasks in dep_state: DONE once every lane they wait on (`after`) is,
+    FAILED as soon as one failed or was never dispatched.  Returns the groups settled now."""
+    settled: list[str] = []
+    for group_id, group in shard_groups.items():
+        if group_id in dep_state:
+            continue
+        states = [dep_state.get(lane) for lane in group["after"]]
+        if any(st in {"FAILED", "MISSING"} for st in states):
+            dep_state[group_id] = "FAILED"
+        elif all(st == "DONE" for st in states):
+            dep_state[group_id] = "DONE"
+        else:
+            continue
+        group["state"] = dep_state[group_id]
+        settled.append(group_id)
+    return settled
+
+
+def _priority_rank(value: Any) -> int:
+    """Map a worker priority (P0/P1/P2 as in inbox.md, or a plain int) to a sort rank; lower runs first."""
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        return max(0, value)
+    raw = str(value or "").strip().upper()
+    if raw.startswith("P"):
+        raw = raw[1:]
+    return int(raw) if raw.isdigit() else 1
+
+
 def _read_json(path: Path) -> dict[str, Any]:
     return json.loads(path.read_text(encoding="utf-8-sig"))
 
 
-def _resolve_prompt(prompt_file: Path, worker: dict[str, Any]) -> str:
+def _resolve_prompt(prompt_file: Path, worker: dict[str, Any], result_file: str = "") -> str:
     text = prompt_file.read_text(encoding="utf-8")
     mapping = {
-        "{{TASK_ID}}": str(worker.get("task_id", "")),
+        "{{RESULT_FILE}}": result_file,
+        "{{TASK_ID}}": str(worker.get("hedge_of") or worker.get("task_id", "")),
         "{{OWNER}}": str(worker.get("owner", "")),
         "{{REPO}}": str(worker.get("repo", "")),
         "{{SCOPE_PATHS}}": "\n".join(f"- {p}" for p in worker.get("scope_paths", [])),
@@ -154,6 +424,13 @@ def _to_list_args(value: Any, default: list[str]) -> list[str]:
     return list(default)
 
 
+def _command_executable(command: list[str]) -> str:
+    """The engine binary inside a built command (unwraps the powershell -File shim)."""
+    if "-File" in command[:-1] and str(command[0]).lower().startswith("powershell"):
+        return command[command.index("-File") + 1]
+    return command[0] if command else ""
+
+
 def _build_gemini_command(
     *,
     workspace: str,
@@ -164,11 +441,7 @@ def _build_gemini_command(
 ) -> list[str]:
     cmd_bin = str(gemini_cmd or "gemini").strip() or "gemini"
     if not os.path.isabs(cmd_bin):
-        for cand in [cmd_bin, "gemini", "gemini.cmd", "gemini.exe", "gemini.ps1"]:
-            found = shutil.which(cand)
-            if found:
-                cmd_bin = found
-                break
+        cmd_bin = exe_cache.which(cmd_bin, *exe_cache.ENGINE_CANDIDATES["gemini"]) or cmd_bin
 
     cmd = [cmd_bin]
     if yolo:
@@ -196,15 +469,7 @@ def _build_codex_command(
 ) -> list[str]:
     cmd_bin = str(codex_cmd or "codex").strip() or "codex"
     if not os.path.isabs(cmd_bin):
-        probe_names = [cmd_bin, "codex", "codex.cmd", "codex.exe", "codex.ps1"]
-        resolved = ""
-        for cand in probe_names:
-            found = shutil.which(cand)
-            if found:
-                resolved = found
-                break
-        if resolved:
-            cmd_bin = resolved
+        cmd_bin = exe_cache.which(cmd_bin, *exe_cache.ENGINE_CANDIDATES["codex"]) or cmd_bin
 
     cmd = [
         "exec",
@@ -247,29 +512,9 @@ def _build_claude_command(
 
     cmd_bin = requested_cmd
     if not os.path.isabs(cmd_bin):
-        probe_names = [cmd_bin]
-        probe_names.extend(
-            [
-                "claude-code",
-                "claude-code.cmd",
-                "claude-code.ps1",
-                "claude-code.exe",
-                "claude",
-                "claude.cmd",
-                "claude.ps1",
-                "claude.exe",
-            ]
-        )
-        resolved = ""
-        for cand in probe_names:
-            found = shutil.which(cand)
-            if found:
-                resolved = found
-                break
-        if resolved:
-            cmd_bin = resolved
+        cmd_bin = exe_cache.which(cmd_bin, *exe_cache.ENGINE_CANDIDATES["claude"]) or cmd_bin
 
-    if not os.path.isabs(cmd_bin) and not shutil.which(cmd_bin):
+    if not os.path.isabs(cmd_bin) and not exe_cache.which(cmd_bin):
         return None, None, f"claude command not found: {requested_cmd}"
 
     args = _to_list_args(
@@ -341,10 +586,11 @@ def _build_claude_command(
     if claude_model and not has_model_flag:
         args = ["--model", claude_model, *args]
 
-    # JSON output for token tracking (usage, cost)
+    # Streamed JSON (one event per line) so token usage is visible while the lane runs;
+    # the final "result" line carries the total usage and cost.  -p stream-json needs --verbose.
     has_output_format = any(a == "--output-format" for a in args)
     if not has_output_format:
-        args = ["--output-format", "json", *args]
+        args = ["--output-format", "stream-json", "--verbose", *args]
 
     command: list[str]
     if cmd_bin.lower().endswith(".ps1"):
@@ -376,10 +622,6 @@ def _build_claude_command(
     return command, stdin_text, None
 
 
-def _write_manifest(path: Path, payload: dict[str, Any]) -> None:
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-
-
 def _no_window_flags() -> int:
     try:
         return int(getattr(subprocess, "CREATE_NO_WINDOW", 0) or 0)
@@ -398,7 +640,7 @@ def _new_console_flags() -> int:
 def _latest_run_dir(root: Path) -> Path | None:
     if not root.exists():
         return None
-    run_dirs = [p for p in root.iterdir() if p.is_dir()]
+    run_dirs = [p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")]
     if not run_dirs:
         return None
     return sorted(run_dirs, key=lambda p: p.stat().st_mtime, reverse=True)[0]
@@ -427,28 +669,1591 @@ def _clear_run_dir(run_dir: Path) -> None:
             pass
 
 
-def _prune_legacy_run_dirs(runs_root: Path, orch_id: str, keep_dir: Path) -> None:
+def _prune_legacy_run_dirs(runs_root: Path, orch_id: str, keep_dir: Path, archive: bool = False) -> int:
+    """Remove (or, with `archive`, set aside) old timestamped run dirs; returns how many
+    were set aside."""
     prefix = f"{orch_id}_"
+    moved = 0
     for child in runs_root.iterdir():
         if not child.is_dir():
             continue
         if child.resolve() == keep_dir.resolve():
             continue
         if child.name.startswith(prefix):
+            if archive and run_archive.set_aside(child, runs_root) is not None:
+                moved += 1
+                continue
             try:
                 shutil.rmtree(child, ignore_errors=True)
             except Exception:
                 pass
+    return moved
+
+
+_HEADLESS_ENGINES = {"codex", "gemini", "claude", "claude-cli"}
+
 
+def _engine_family(engine: str) -> str:
+    e = (engine or "").strip().lower()
+    return "claude" if e in {"claude", "claude-cli"} else e
+
+
+def _parse_token_usage(log_text: str, engine: str) -> dict[str, Any] | None:
+    """Extract token usage from a worker log (same formats as mcp_server._parse_token_usage)."""
+    if not log_text:
+        return None
+    family = _engine_family(engine)
+    try:
+        if family == "claude":
+            for line in reversed(log_text.strip().splitlines()):
+                line = line.strip()
+                if line.startswith("{") and '"usage"' in line:
+                    data = json.loads(line)
+                    usage = data.get("usage")
+                    if not isinstance(usage, dict):
+                        # stream-json turn: its usage sits under "message"; only the result has the total.
+                        continue
+                    input_t = int(usage.get("input_tokens", 0) or 0)
+                    output_t = int(usage.get("output_tokens", 0) or 0)
+                    cache_read = int(usage.get("cache_read_input_tokens", 0) or 0)
+                    cache_create = int(usage.get("cache_creation_input_tokens", 0) or 0)
+                    return {
+                        "input_tokens": input_t,
+                        "output_tokens": output_t,
+                        "total_tokens": input_t + output_t + cache_read + cache_create,
+                        "cost_usd": data.get("total_cost_usd"),
+                    }
+        elif family == "codex":
+            m = re.search(r"tokens used\s*\n\s*([\d,]+)", log_text)
+            if m:
+                return {"total_tokens": int(m.group(1).replace(",", ""))}
+        elif family == "gemini":
+            for line in reversed(log_text.strip().splitlines()):
+                line = line.strip()
+                if line.startswith("{") and '"stats"' in line:
+                    tokens = json.loads(line).get("stats", {}).get("tokens", {})
+                    if tokens:
+                        return {
+                            "input_tokens": tokens.get("inputTokens", 0),
+                            "output_tokens": tokens.get("outputTokens", 0),
+                            "total_tokens": tokens.get("totalTokens", 0),
+                        }
+            m = re.search(r'"totalTokens"\s*:\s*(\d+)', log_text)
+            if m:
+                return {"total_tokens": int(m.group(1))}
+    except Exception:
+        pass
+    return None
+
+
+class _EngineLimiter:
+    """Admission control for one engine, configured under engines.<name> in the tasks JSON.
+
+    - requests_per_min: token bucket for launches (burst defaults to the per-minute rate)
+    - concurrent_sessions: max lanes of this engine running at once
+    - tokens_per_hour: spend bucket; each launch reserves the average observed usage and
+      is reconciled with the usage parsed from the worker log when it exits
+    Zero or missing means unlimited.
+    """
+
+    def __init__(self, name: str, cfg: dict[str, Any]) -> None:
+        self.name = name
+        self.requests_per_min = max(0.0, float(cfg.get("requests_per_min", 0) or 0))
+        self.concurrent_sessions = max(0, int(cfg.get("concurrent_sessions", 0) or 0))
+        self.tokens_per_hour = max(0.0, float(cfg.get("tokens_per_hour", 0) or 0))
+        self.burst = max(1.0, float(cfg.get("burst", 0) or self.requests_per_min or 1))
+        self.retries = max(0, int(cfg.get("max_retries", 0) or 0))
+        self.active = 0
+        self.observed_tokens: list[int] = []
+        self._requests = self.burst
+        self._tokens = self.tokens_per_hour
+        self._last = time.monotonic()
+        self.cooldown_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.requests_per_min or self.concurrent_sessions or self.tokens_per_hour or self.retries)
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._last)
+        self._last = now
+        if self.requests_per_min:
+            self._requests = min(self.burst, self._requests + elapsed * self.requests_per_min / 60.0)
+        if self.tokens_per_hour:
+            self._tokens = min(self.tokens_per_hour, self._tokens + elapsed * self.tokens_per_hour / 3600.0)
+
+    def estimate(self) -> int:
+        if not self.observed_tokens:
+            return 0
+        recent = self.observed_tokens[-10:]
+        return int(sum(recent) / len(recent))
+
+    def delay(self, now: float) -> tuple[float, str]:
+        """Seconds until one more launch fits (inf = wait for a running lane to exit)."""
+        self._refill(now)
+        if self.cooldown_until > now:
+            return self.cooldown_until - now, "rate_limited"
+        if self.concurrent_sessions and self.active >= self.concurrent_sessions:
+            return math.inf, "concurrent_sessions"
+        if self.requests_per_min and self._requests < 1.0:
+            return (1.0 - self._requests) * 60.0 / self.requests_per_min, "requests_per_min"
+        if self.tokens_per_hour and self._tokens < self.estimate():
+            return (self.estimate() - self._tokens) * 3600.0 / self.tokens_per_hour, "tokens_per_hour"
+        return 0.0, ""
+
+    def acquire(self, now: float) -> int:
+        self._refill(now)
+        self.active += 1
+        if self.requests_per_min:
+            self._requests -= 1.0
+        reserved = self.estimate()
+        if self.tokens_per_hour:
+            self._tokens -= reserved
+        return reserved
+
+    def release(self, reserved: int, used: int | None) -> None:
+        self.active = max(0, self.active - 1)
+        if used is None:
+            return
+        self.observed_tokens.append(int(used))
+        if self.tokens_per_hour:
+            self._tokens -= int(used) - int(reserved)
+
+    def cool_down(self, until: float) -> None:
+        """A lane hit the provider's limit: hold every launch of this engine until then."""
+        self.cooldown_until = max(self.cooldown_until, until)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "requests_per_min": self.requests_per_min,
+            "concurrent_sessions": self.concurrent_sessions,
+            "tokens_per_hour": self.tokens_per_hour,
+            "active": self.active,
+            "requests_available": round(self._requests, 2) if self.requests_per_min else None,
+            "tokens_available": int(self._tokens) if self.tokens_per_hour else None,
+            "avg_tokens_per_task": self.estimate(),
+        }
+
+
+class _ChildWatcher:
+    """Delivers worker exits as events instead of polling.
+
+    Linux: one selector thread blocks on a pidfd per child.
+    Elsewhere (or when pidfd_open is refused): one waiter thread per child.
+    """
+
+    def __init__(self) -> None:
+        self.events: queue.Queue[tuple[str, WorkerRun, int, float]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._incoming: list[tuple[int, WorkerRun]] = []
+        self._selector: selectors.BaseSelector | None = None
+        self._wake_r = -1
+        self._wake_w = -1
+        if hasattr(os, "pidfd_open"):
+            try:
+                self._selector = selectors.DefaultSelector()
+                self._wake_r, self._wake_w = os.pipe()
+                self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+                threading.Thread(target=self._select_loop, name="orch-pidfd", daemon=True).start()
+            except Exception:
+                self._selector = None
+
+    def watch(self, run: WorkerRun) -> None:
+        proc = run.process
+        if proc is None:
+            return
+        if self._selector is not None and not getattr(proc, "remote", False):
+            try:
+                pidfd = os.pidfd_open(proc.pid)  # type: ignore[attr-defined]
+            except OSError:
+                pidfd = -1
+            if pidfd >= 0:
+                with self._lock:
+                    self._incoming.append((pidfd, run))
+                os.write(self._wake_w, b"x")
+                return
+        threading.Thread(target=self._wait_one, args=(run,), name=f"orch-wait-{run.task_id}", daemon=True).start()
+
+    def next_event(self, timeout: float | None = None) -> tuple[str, WorkerRun, int, float] | None:
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _wait_one(self, run: WorkerRun) -> None:
+        assert run.process is not None
+        code = run.process.wait()
+        self.events.put(("exit", run, int(code), time.time()))
+
+    def _select_loop(self) -> None:
+        assert self._selector is not None
+        while True:
+            for key, _mask in self._selector.select():
+                if key.data is None:
+                    os.read(self._wake_r, 4096)
+                    with self._lock:
+                        incoming, self._incoming = self._incoming, []
+                    for pidfd, run in incoming:
+                        self._selector.register(pidfd, selectors.EVENT_READ, run)
+                    continue
+                run = key.data
+                self._selector.unregister(key.fd)
+                os.close(key.fd)
+                assert run.process is not None
+                code = run.process.wait()
+                self.events.put(("exit", run, int(code), time.time()))
+
+
+def _feed_stdin(proc: subprocess.Popen[str], text: str) -> None:
+    assert proc.stdin is not None
+    try:
+        proc.stdin.write(text)
+    except (BrokenPipeError, OSError, ValueError):
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except (BrokenPipeError, OSError, ValueError):
+            pass
 
-def main() -> int:
+
+def _detached_kwargs() -> dict[str, Any]:
+    """Popen options for helpers that must outlive the dispatcher and its console."""
+    if os.name == "nt":
+        return {"creationflags": _no_window_flags() | int(getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0) or 0)}
+    return {"start_new_session": True}
+
+
+def _spawn_stream_tap(run: WorkerRun, pid: int) -> None:
+    """Detached `stream_events.py` process that follows this worker's log after the
+    dispatcher exits (no --wait); it ends once the worker has exited."""
+    try:
+        subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(stream_events.__file__).resolve()),
+                "--log",
+                str(run.log_file),
+                "--engine",
+                run.engine,
+                "--attempt",
+                str(run.attempt),
+                "--offset",
+                str(run.log_offset),
+                "--pid",
+                str(pid),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_detached_kwargs(),
+        )
+    except Exception as exc:
+        print(f"[WARN] {run.task_id}: event tap not started ({exc}); the log is still written")
+
+
+def _spawn_archiver(runs_root: Path, policy: dict[str, Any]) -> None:
+    """Background `run_archive.py`: packs the dirs set aside and applies retention."""
+    try:
+        subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(run_archive.__file__).resolve()),
+                "--runs-root",
+                str(runs_root),
+                "--keep-runs",
+                str(int(policy.get("keep_runs", 0) or 0)),
+                "--max-age-days",
+                str(float(policy.get("max_age_days", 0) or 0)),
+                "--max-total-mb",
+                str(float(policy.get("max_total_mb", 0) or 0)),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_detached_kwargs(),
+        )
+    except Exception as exc:
+        print(f"[WARN] archiver not started: {exc}")
+
+
+def _spawn_results_merger(run_dir: Path, results_file: Path) -> None:
+    """Background `lane_results.py --wait`: merges results.md once the lanes of a run
+    nobody supervises have exited."""
+    try:
+        subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(lane_results.__file__).resolve()),
+                "--run-dir",
+                str(run_dir),
+                "--results-file",
+                str(results_file),
+                "--wait",
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_detached_kwargs(),
+        )
+    except Exception as exc:
+        print(f"[WARN] results merger not started: {exc}")
+
+
+def _record_exit(run: WorkerRun, code: int, ended_at: float) -> dict[str, Any]:
+    """Exit fields for the manifest row; also closes the latest attempt record."""
+    fields: dict[str, Any] = {
+        "exit_code": code,
+        "ended_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ended_at)),
+        "duration_sec": round(max(0.0, ended_at - run.started_at), 3),
+    }
+    if run.stop_requested:
+        fields["stop_sec"] = round(max(0.0, ended_at - run.stop_requested), 3)
+    attempts = run.entry.get("attempts")
+    if attempts:
+        attempts[-1].update(fields)
+        fields["attempts"] = attempts
+    return fields
+
+
+def _memo_lookup(run: WorkerRun, memo: memo_cache.MemoCache, workspace: str) -> dict[str, Any] | None:
+    """Hash the lane's current inputs once; returns the memo hit, if any."""
+    if "key" not in run.memo:
+        before = memo_cache.snapshot(Path(workspace), run.memo["patterns"], run.worktree)
+        run.memo["before"] = before
+        run.memo["key"] = memo_cache.cache_key(run.command, run.stdin_text, before) if before is not None else ""
+        run.memo["hit"] = memo.lookup(run.memo["key"], run.memo["ttl_hours"]) if run.memo["key"] else None
+        if before is None:
+            print(f"[MEMO] {run.task_id}: scope too large to memoize")
+    return run.memo["hit"]
+
+
+class _Scheduler:
+    """The queue and supervisor of one dispatch: admission, launches, exits, retries and
+    restarts, hedges, shards, budgets and the --simulate replay.
+
+    main() reads the tasks file and prepares the lanes; everything that changes while
+    they run lives here and is recorded in `journal`.  `start` launches what fits,
+    `supervise` handles exits until the queue drains; `plan` and `simulate` are the
+    --dry-run / --simulate counterparts.
+    """
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        journal: RunJournal,
+        planned: list[WorkerRun],
+        *,
+        workspace: str,
+        defaults: dict[str, Any],
+        engines_cfg: dict[str, Any],
+        hosts: dict[str, remote_runner.Host],
+        local_slots: int | None,
+        hedge_groups: dict[str, dict[str, Any]],
+        shard_groups: dict[str, dict[str, Any]],
+        runs_root: Path,
+        run_dir: Path,
+        orch_id: str,
+        stamp: str,
+        outcomes: OutcomeIndex,
+        memo: memo_cache.MemoCache,
+        max_concurrent: int,
+        stream_output: bool,
+        results_file: Path | None,
+        engine_versions: dict[str, str],
+        engine_command: Callable[..., tuple[list[str] | None, str | None, str]],
+    ) -> None:
+        self.args = args
+        self.journal = journal
+        self.planned = planned
+        self.workspace = workspace
+        self.defaults = defaults
+        self.engines_cfg = engines_cfg
+        self.hosts = hosts
+        self.local_slots = local_slots
+        self.hedge_groups = hedge_groups
+        self.shard_groups = shard_groups
+        self.runs_root = runs_root
+        self.run_dir = run_dir
+        self.orch_id = orch_id
+        self.stamp = stamp
+        self.outcomes = outcomes
+        self.memo = memo
+        self.max_concurrent = max_concurrent
+        self.stream_output = stream_output
+        self.results_file = results_file
+        self.engine_versions = engine_versions
+        # Builds (command, stdin_text, error) for an engine; a stall failover re-renders with it.
+        self.engine_command = engine_command
+        self.dag_stages: list[list[str]] = []
+        self.scope_waves: list[list[str]] = []
+
+        self.queue = sorted(self.planned, key=lambda r: r.priority)
+        self.running = 0
+        # depends_on: a lane waits until its dependencies exit 0; plan order is topological
+        # so neither the scope rule below nor the queue can make a lane wait on a dependent.
+        # A hedged task is represented by its legs here; at run time it counts as done once one
+        # leg wins (hedge_exit) and as failed once every leg has failed (settle_hedges).
+        for group in self.hedge_groups.values():
+            kept = [leg for leg in group["legs"] if any(run.task_id == leg for run in self.queue)]
+            group["engines"] = [e for leg, e in zip(group["legs"], group["engines"]) if leg in kept]
+            group["legs"] = kept
+        # A sharded task is done when its review lane (or, without one, every shard) is.
+        self.deps = {
+            run.task_id: [lane for d in run.depends_on for lane in _dep_lanes(d, self.shard_groups, self.hedge_groups)]
+            for run in self.queue
+            if run.depends_on
+        }
+        self.plan_order, self.dep_cycle = task_dag.topo_order([run.task_id for run in self.queue], self.deps)
+        self.plan_order += self.dep_cycle
+        self.dep_state: dict[str, str] = {}  # task_id -> DONE | FAILED | MISSING
+        if self.deps:
+            planned_ids = set(self.plan_order)
+            for dep in {d for ds in self.deps.values() for d in ds} - planned_ids:
+                self.dep_state[dep] = "MISSING"
+            self.dag_stages = task_dag.stages([t for t in self.plan_order if t not in self.dep_cycle], self.deps)
+            self.journal.emit("run", None, {"dag": {"stages": self.dag_stages, "depends_on": self.deps, "cycle": self.dep_cycle}})
+        # Lanes with overlapping scope_paths run one after another, in queue order.
+        self.conflicts = (
+            scope_plan.conflict_graph({run.task_id: run.scope for run in self.queue})
+            if bool(self.defaults.get("scope_scheduling", True))
+            else {}
+        )
+        self.plan_rank = {task_id: idx for idx, task_id in enumerate(self.plan_order)}
+        self.active_runs: dict[str, WorkerRun] = {}
+        if self.conflicts:
+            self.scope_waves = scope_plan.waves(self.plan_order, self.conflicts)
+            self.journal.emit(
+                "run",
+                None,
+                {"scope_plan": {"waves": self.scope_waves, "conflicts": {k: sorted(v) for k, v in sorted(self.conflicts.items())}}},
+            )
+        self.limiters = {
+            name: limiter
+            for name, limiter in (
+                (name, _EngineLimiter(name, ecfg)) for name, ecfg in self.engines_cfg.items() if isinstance(ecfg, dict)
+            )
+            if limiter.enabled
+        }
+        self.published_limits: dict[str, Any] = {}
+        self.published_hosts: dict[str, Any] = {}
+        # Adaptive admission: local lanes wait while this machine is saturated (host_load.py).
+        self.admission = host_load.admission_policy(self.defaults)
+        self.load_monitor = host_load.HostMonitor(self.admission) if self.admission["enabled"] and not self.args.dry_run else None
+        self.admission_log: list[dict[str, Any]] = []
+        self.local_running = 0
+        self.waiting_on: dict[str, str] = {}
+        # Workers are watched even without --wait: a queued or rate-limited task keeps the
+        # dispatcher resident until it has been launched.
+        self.watcher = None if self.args.dry_run else _ChildWatcher()
+        # Resident until every worker exits: queued and deferred tasks need admitting,
+        # retries need relaunching, and worker logs are followed on dispatcher threads.
+        self.run_budget = lane_budget.run_budget(self.defaults)
+        self.supervised = bool(
+            self.args.wait
+            or self.limiters
+            or any(r.retry.get("max_retries") for r in self.planned)
+            or 0 < self.max_concurrent < len(self.planned)
+            or any(r.worktree for r in self.planned)
+            or bool(self.conflicts)
+            or bool(self.deps)
+            or any(r.stall.get("enabled") for r in self.planned)
+            or any(r.budget for r in self.planned)
+            or bool(self.run_budget)
+            or bool(self.hosts)
+            or self.load_monitor is not None
+        )
+        # Running lanes are looked at on this tick: stall detection and live budgets.
+        self.stall_policies = [r.stall for r in self.planned if r.stall.get("enabled")]
+        self.watch_interval = lane_watchdog.check_interval(self.stall_policies) if self.stall_policies else None
+        if self.run_budget or any(r.budget for r in self.planned):
+            self.watch_interval = min(self.watch_interval or lane_budget.CHECK_INTERVAL, lane_budget.CHECK_INTERVAL)
+        # Tokens of lanes that have exited (cached lanes spend none); running lanes add their live usage.
+        self.spent_tokens = 0
+        self.run_budget_hit: dict[str, Any] | None = None
+        self.run_started = time.monotonic()
+        self.merge_lanes: dict[str, dict[str, Any]] = {}
+        self.hedge_stats = hedge.HedgeStats(hedge.stats_path(self.runs_root)) if self.hedge_groups and not self.args.dry_run else None
+        # --simulate drives admit with a virtual clock and predicted exits instead of processes.
+        self.sim_now = 0.0
+        self.sim_exits: list[tuple[float, int, WorkerRun]] = []
+        self.sim_rows: list[dict[str, Any]] = []
+        self.sim_predictions: dict[str, dict[str, Any]] = {}
+        if self.hedge_groups:
+            self.publish_hedges()
+        if self.shard_groups:
+            self.journal.emit("run", None, {"shards": self.shard_groups})
+
+    def publish_limits(self) -> None:
+        current = {name: lim.snapshot() for name, lim in self.limiters.items()}
+        if current and current != self.published_limits:
+            self.published_limits = current
+            self.journal.emit("run", None, {"engine_limits": current})
+
+    def admission_change(self, change: str, reason: str) -> None:
+        assert self.load_monitor is not None
+        waiting = sum(1 for r in self.queue if not r.host)
+        self.admission_log.append(
+            {
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "action": change,
+                "reason": reason,
+                "sample": self.load_monitor.last,
+                "running": len(self.active_runs),
+                "queued": waiting,
+            }
+        )
+        del self.admission_log[: -host_load.MAX_DECISIONS]
+        self.journal.emit(
+            "run",
+            None,
+            {
+                "admission": {
+                    "policy": {k: v for k, v in self.admission.items() if k != "enabled"},
+                    "held": self.load_monitor.held,
+                    "holds": sum(1 for d in self.admission_log if d["action"] == "hold"),
+                    "decisions": self.admission_log,
+                }
+            },
+        )
+        if change == "hold":
+            print(f"[LOAD] host saturated ({reason}); holding local lanes")
+        elif sum(1 for r in self.active_runs.values() if not r.host) < self.admission["min_running"]:
+            print(f"[LOAD] fewer than {self.admission['min_running']} local lanes running; admitting again")
+        else:
+            print(f"[LOAD] host recovered ({json.dumps(self.load_monitor.last, separators=(',', ':'))}); admitting again")
+
+    def host_pin(self, run: WorkerRun) -> str:
+        # Worktrees live in the local repository, so isolated lanes never leave this machine.
+        return "local" if run.worktree else str(run.worker.get("host", "") or "").strip()
+
+    def place(self, run: WorkerRun) -> str | None:
+        """Host for `run` ("" = this machine), or None while every eligible host is full.
+        Unpinned lanes go to the host with the most free slots; this machine takes them
+        only when `local_slots` is set, or when no remote host is up."""
+        if not self.hosts:
+            return ""
+        pin = self.host_pin(run)
+        local_free = math.inf if self.local_slots is None else self.local_slots - self.local_running
+        if pin == "local":
+            return "" if local_free > 0 else None
+        if pin:
+            host = self.hosts[pin]
+            return pin if host.up and host.running < host.slots else None
+        up = [h for h in self.hosts.values() if h.up]
+        if not up:
+            return "" if local_free > 0 else None
+        options = [(h.slots - h.running, -idx, h.name) for idx, h in enumerate(up)]
+        if self.local_slots is not None:
+            options.append((local_free, 1, ""))
+        free, _, name = max(options)
+        return name if free > 0 else None
+
+    def hold_host(self, run: WorkerRun, delta: int) -> None:
+        if run.host:
+            self.hosts[run.host].running += delta
+        elif self.hosts:
+            self.local_running += delta
+
+    def publish_hosts(self) -> None:
+        current = {name: h.snapshot() for name, h in self.hosts.items()}
+        if current and current != self.published_hosts:
+            self.published_hosts = current
+            self.journal.emit("run", None, {"hosts": current, "local_running": self.local_running})
+
+    def entry_for(self, run: WorkerRun) -> dict[str, Any]:
+        return {
+            "task_id": run.task_id,
+            "owner": run.owner,
+            "role": run.role,
+            "engine": run.engine,
+            "priority": f"P{run.priority}",
+            "command": run.command,
+            "log_file": str(run.log_file),
+            "workspace": run.workspace,
+            "prompt_file": run.prompt_file,
+            "repo": run.repo,
+            "pid": None,
+            **({"limits": run.limits} if run.limits else {}),
+            **({"budget_limits": run.budget} if run.budget else {}),
+            **({"host": run.host or "local"} if self.hosts else {}),
+            **({"isolation": run.worktree} if run.worktree else {}),
+            **({"depends_on": run.depends_on} if run.depends_on else {}),
+        }
+
+    def queue_row(self, run: WorkerRun, reason: str = "") -> dict[str, Any]:
+        row = {"task_id": run.task_id, "owner": run.owner, "role": run.role, "engine": run.engine, "priority": f"P{run.priority}"}
+        if run.depends_on:
+            row["depends_on"] = run.depends_on
+        if reason:
+            row["waiting_on"] = reason
+        return row
+
+    def start_remote(self, run: WorkerRun) -> remote_runner.RemoteProcess:
+        """Launch `run` on its host; its output is appended to the lane's log."""
+        host = self.hosts[run.host]
+        sink_fd = os.open(str(run.log_file), os.O_WRONLY | os.O_APPEND)
+        root = str(Path(self.workspace).resolve())
+        try:
+            return remote_runner.RemoteProcess.start(
+                host,
+                run.task_id,
+                [remote_runner.map_path(arg, root, host.workspace) for arg in run.command],
+                remote_runner.map_path(run.workspace, root, host.workspace),
+                run.stdin_text,
+                sink_fd,
+            )
+        except BaseException as exc:
+            os.close(sink_fd)
+            if isinstance(exc, OSError):
+                # Unreachable: stop placing lanes there for the rest of the run.
+                host.up, host.error = False, str(exc)
+            raise
+
+    def launch(self, run: WorkerRun) -> bool:
+        first = not run.entry
+        entry = self.entry_for(run) if first else run.entry
+        run.attempt += 1
+        try:
+            if first:
+                log_handle = run.log_file.open("w", encoding="utf-8", errors="replace")
+            else:
+                # Retries append to the same log so the whole lane history stays in one file.
+                log_handle = run.log_file.open("a", encoding="utf-8", errors="replace")
+                log_handle.write(f"\n===== [ORCH] attempt {run.attempt} =====\n")
+                log_handle.flush()
+            run.log_offset = run.log_file.stat().st_size
+            # Strip CLAUDECODE env var so nested claude sessions can launch
+            child_env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
+            # Each lane writes its outcome to its own file; merged into results.md at the end.
+            result_file = lane_results.result_path(self.run_dir, run.task_id)
+            if first:
+                result_file.parent.mkdir(exist_ok=True)
+                result_file.unlink(missing_ok=True)
+            child_env[lane_results.ENV_VAR] = str(result_file)
+            # With -o text, gemini no longer needs a real console (node-pty bypassed).
+            # Each worker leads its own process group so a stop reaches all of its children.
+            flags = _no_window_flags() | int(getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0) or 0)
+            if self.stream_output and first:
+                stream_events.sidecar_path(run.log_file).write_bytes(b"")
+            try:
+                if run.host:
+                    log_handle.close()
+                    proc = self.start_remote(run)
+                else:
+                    proc = subprocess.Popen(
+                        run.command,
+                        cwd=run.workspace,
+                        stdout=log_handle,
+                        stderr=subprocess.STDOUT,
+                        stdin=subprocess.PIPE if run.stdin_text else None,
+                        text=True,
+                        encoding="utf-8",
+                        errors="replace",
+                        creationflags=flags,
+                        start_new_session=os.name != "nt",
+                        env=child_env,
+                    )
+            finally:
+                log_handle.close()
+            run.stream_usage = None
+            run.stream_result = None
+            if self.stream_output:
+                # The worker writes its log itself; events are parsed from it, never piped.
+                if self.supervised:
+                    run.pump = stream_events.LogFollower(
+                        run.log_file,
+                        run.engine,
+                        name=f"orch-events-{run.task_id}",
+                        offset=run.log_offset,
+                        tag={"attempt": run.attempt},
+                        on_event=lambda ev, run=run: self.on_stream_event(run, ev),
+                    )
+                    run.pump.start()
+                else:
+                    _spawn_stream_tap(run, proc.pid)
+            if run.stdin_text and proc.stdin:
+                # Feed the prompt from a writer thread so a child that is slow to read stdin
+                # does not hold up the launches behind it.
+                threading.Thread(
+                    target=_feed_stdin, args=(proc, run.stdin_text), name=f"orch-stdin-{run.task_id}", daemon=True
+                ).start()
+            if run.limits and run.host:
+                entry["limit_errors"] = ["resource limits are not applied on remote hosts"]
+            elif run.limits:
+                applied, limit_errors = resource_limits.apply(proc.pid, run.limits)
+                entry["limits"] = applied
+                if limit_errors:
+                    entry["limit_errors"] = limit_errors
+                    print(f"[WARN] {run.task_id}: resource limits not fully applied: {'; '.join(limit_errors)}")
+                else:
+                    entry.pop("limit_errors", None)
+            run.process = proc
+            run.started_at = time.time()
+            run.stop_requested = 0.0
+            run.entry = entry
+            # A remote pid means nothing on this machine; readers go by `host` and exit_code.
+            entry["pid"] = None if run.host else proc.pid
+            entry["pgid"] = proc.pid if not run.host and os.name != "nt" else None
+            entry["kill_grace"] = run.kill_grace
+            if self.hosts:
+                entry["host"] = run.host or "local"
+                entry["remote_pid"] = proc.pid if run.host else None
+            entry["started_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run.started_at))
+            entry["attempt"] = run.attempt
+            for stale in ("retry_at", "state", "exit_code", "ended_at", "duration_sec", "stop_sec"):
+                entry.pop(stale, None)
+            if run.stall.get("enabled"):
+                cpu_probe = (lambda p=proc: p.cpu_seconds) if run.host else (lambda pid=proc.pid: proc_tree.cpu_seconds(pid))
+                run.watch = lane_watchdog.StallWatch(run.log_file, cpu_probe, run.stall, time.monotonic())
+            else:
+                run.watch = None
+            entry.setdefault("attempts", []).append(
+                {"attempt": run.attempt, "pid": proc.pid, "started_at": entry["started_at"], **({"host": entry["host"]} if self.hosts else {})}
+            )
+            if self.watcher is not None:
+                self.watcher.watch(run)
+            self.journal.emit("launched", run.task_id, entry)
+            self.journal.snapshot()
+            where = f" host={run.host}" if run.host else ""
+            print(f"[START] {run.task_id} ({run.engine}) pid={proc.pid}{where} attempt={run.attempt} log={run.log_file}")
+            return True
+        except Exception as exc:
+            if first:
+                entry["error"] = str(exc)
+                self.journal.emit("failed", run.task_id, entry)
+            else:
+                self.journal.emit("updated", run.task_id, {"error": str(exc)})
+            self.journal.snapshot()
+            print(f"[FAIL] {run.task_id}: {exc}")
+            return False
+
+    def on_stream_event(self, run: WorkerRun, event: dict[str, Any]) -> None:
+        # Called on the follower thread; the exit handler reads it after finishing the follower.
+        if event.get("kind") == "tokens" and isinstance(event.get("usage"), dict):
+            run.stream_usage = event["usage"]
+        elif event.get("kind") == "result":
+            run.stream_result = event
+
+    def memo_lookup(self, run: WorkerRun) -> dict[str, Any] | None:
+        return _memo_lookup(run, self.memo, self.workspace)
+
+    def use_cached(self, run: WorkerRun) -> None:
+        """Record a memo hit as a CACHED lane: restore its log, result and diff, replay its files."""
+        hit = run.memo["hit"]
+        entry = self.entry_for(run)
+        entry.update({"pid": None, "state": "CACHED", "exit_code": hit.get("exit_code", 0), "duration_sec": 0.0})
+        try:
+            written = memo_cache.MemoCache.replay(hit, Path(self.workspace), run.worktree)
+            diff_file = memo_cache.MemoCache.restore_logs(
+                hit, run.log_file, stream_events.sidecar_path(run.log_file), lane_results.result_path(self.run_dir, run.task_id)
+            )
+        except OSError as exc:
+            written, diff_file = [], None
+            entry["error"] = f"memo replay failed: {exc}"
+        usage = hit.get("token_usage") or {}
+        entry["cached"] = {
+            "key": run.memo["key"][:16],
+            "from_run": hit.get("run"),
+            "stored_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(float(hit.get("stored_at", 0)))),
+            "replayed_files": written,
+            "tokens_saved": usage.get("total_tokens"),
+            "duration_saved_sec": hit.get("duration_sec"),
+        }
+        if diff_file is not None:
+            entry["diff_file"] = str(diff_file)
+        run.entry = entry
+        self.journal.emit("launched", run.task_id, entry)
+        if run.worktree:
+            lane = worktree_isolation.finish(run.worktree, run.task_id)
+            self.merge_lanes[run.task_id] = lane
+            run.entry["merge"] = lane
+            self.journal.emit("updated", run.task_id, {"merge": lane})
+        print(
+            f"[CACHED] {run.task_id} ({run.engine}) reused run {hit.get('run', '?')}: "
+            f"{len(written)} files replayed, ~{usage.get('total_tokens') or '?'} tokens saved log={run.log_file}"
+        )
+
+    def memo_store(self, run: WorkerRun, usage: dict[str, Any] | None) -> None:
+        """Memoize a lane that exited 0, under its before-state and after-state keys."""
+        before = run.memo["before"]
+        after = memo_cache.snapshot(Path(self.workspace), run.memo["patterns"], run.worktree)
+        if after is None:
+            return
+        changed = {rel: after.get(rel) for rel in set(before) | set(after) if before.get(rel) != after.get(rel)}
+        diff_text = memo_cache.unified_diff(before, after)
+        keys = {run.memo["key"]: True}
+        keys.setdefault(memo_cache.cache_key(run.command, run.stdin_text, after), False)
+        record = {
+            "task_id": run.task_id,
+            "orch_id": self.orch_id,
+            "engine": run.engine,
+            "run": self.stamp,
+            "exit_code": run.entry.get("exit_code"),
+            "duration_sec": run.entry.get("duration_sec"),
+            "token_usage": usage,
+        }
+        try:
+            self.memo.store(
+                keys,
+                record,
+                run.log_file,
+                stream_events.sidecar_path(run.log_file),
+                diff_text,
+                changed,
+                lane_results.result_path(self.run_dir, run.task_id),
+            )
+            if diff_text:
+                run.log_file.with_suffix(".diff").write_text(diff_text, encoding="utf-8")
+                run.entry["diff_file"] = str(run.log_file.with_suffix(".diff"))
+            run.entry["memo_key"] = run.memo["key"][:16]
+            self.journal.emit("updated", run.task_id, {"memo_key": run.entry["memo_key"], **({"diff_file": run.entry["diff_file"]} if diff_text else {})})
+        except OSError as exc:
+            print(f"[WARN] {run.task_id}: result not memoized: {exc}")
+
+    def check_stalls(self) -> None:
+        """Mark lanes without output or CPU progress (or parked on a prompt) STALLED and kill
+        their process trees; the exit event then decides between restart and failure."""
+        now = time.monotonic()
+        for run in list(self.active_runs.values()):
+            if run.watch is None or run.process is None or run.entry.get("state") == "STALLED":
+                continue
+            reason = run.watch.check(now)
+            if not reason:
+                continue
+            stall = {
+                "reason": reason,
+                "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "attempt": run.attempt,
+                "engine": run.engine,
+            }
+            run.entry["state"] = "STALLED"
+            run.entry.setdefault("stalls", []).append(stall)
+            self.journal.emit("updated", run.task_id, {"state": "STALLED", "stalls": run.entry["stalls"]})
+            print(f"[STALL] {run.task_id} ({run.engine}) pid={run.process.pid}: {reason}; killing process tree")
+            self.terminate(run)
+
+    def terminate(self, run: WorkerRun) -> None:
+        """Kill the lane's process tree off the main loop; its exit arrives as a normal event."""
+        assert run.process is not None
+        run.stop_requested = run.stop_requested or time.time()
+        if isinstance(run.process, remote_runner.RemoteProcess):
+            run.process.terminate_tree(run.kill_grace)
+            return
+        threading.Thread(
+            target=proc_tree.terminate_tree,
+            args=(run.process.pid, run.kill_grace, run.entry.get("pgid")),
+            name=f"orch-kill-{run.task_id}",
+            daemon=True,
+        ).start()
+
+    def live_tokens(self, run: WorkerRun) -> int | None:
+        used = (run.stream_usage or {}).get("total_tokens")
+        return int(used) if used is not None else None
+
+    def over_budget(self, run: WorkerRun, hit: dict[str, Any], scope: str) -> None:
+        run.entry["state"] = "BUDGET_EXCEEDED"
+        run.entry["budget"] = {**hit, "scope": scope, "at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        self.journal.emit("updated", run.task_id, {"state": "BUDGET_EXCEEDED", "budget": run.entry["budget"]})
+        print(f"[BUDGET] {run.task_id} ({run.engine}) {scope} {lane_budget.describe(hit)}; terminating")
+        self.terminate(run)
+
+    def check_budgets(self) -> None:
+        """Stop lanes past their own budget, and everything once the run budget is used up."""
+        now = time.time()
+        live = [r for r in self.active_runs.values() if r.process is not None and r.entry.get("state") not in _SUPERVISOR_STATES]
+        for run in live:
+            hit = lane_budget.exceeded(run.budget, now - run.started_at, self.live_tokens(run)) if run.budget else None
+            if hit is not None:
+                self.over_budget(run, hit, "lane")
+        if not self.run_budget or self.run_budget_hit is not None:
+            return
+        tokens = self.spent_tokens + sum(self.live_tokens(r) or 0 for r in self.active_runs.values())
+        self.run_budget_hit = lane_budget.exceeded(self.run_budget, time.monotonic() - self.run_started, tokens)
+        if self.run_budget_hit is None:
+            return
+        self.journal.emit("run", None, {"run_budget": {**self.run_budget_hit, "at": time.strftime("%Y-%m-%d %H:%M:%S")}})
+        print(f"[BUDGET] run {lane_budget.describe(self.run_budget_hit)}; stopping {len(live)} lanes, dropping {len(self.queue)} queued")
+        for run in live:
+            if run.entry.get("state") not in _SUPERVISOR_STATES:
+                self.over_budget(run, self.run_budget_hit, "run")
+        for run in list(self.queue):
+            self.queue.remove(run)
+            self.waiting_on.pop(run.task_id, None)
+            self.dep_state[run.task_id] = "FAILED"
+            self.journal.emit("dequeued", run.task_id)
+            if run.entry:
+                # Waiting for a retry or restart: its row is already in `started`.
+                run.entry.update(state="BUDGET_EXCEEDED", error="run budget used up")
+                run.entry.pop("retry_at", None)
+                self.journal.emit("updated", run.task_id, {"state": "BUDGET_EXCEEDED", "error": "run budget used up", "retry_at": None})
+            else:
+                self.journal.emit("failed", run.task_id, {**self.queue_row(run), "state": "BUDGET_EXCEEDED", "error": "run budget used up"})
+
+    def publish_hedges(self) -> None:
+        self.journal.emit(
+            "run",
+            None,
+            {"hedges": {gid: {k: v for k, v in group.items() if k != "started_at"} for gid, group in self.hedge_groups.items()}},
+        )
+
+    def cancel_leg(self, leg_id: str, winner: WorkerRun) -> None:
+        lost = {"group": winner.worker["hedge_of"], "lost_to": winner.task_id}
+        leg = self.active_runs.get(leg_id)
+        if leg is not None and leg.process is not None:
+            leg.entry.update(state="CANCELLED", hedge=lost)
+            self.journal.emit("updated", leg_id, {"state": "CANCELLED", "hedge": lost})
+            self.terminate(leg)
+            return
+        leg = next((r for r in self.queue if r.task_id == leg_id), None)
+        if leg is None:
+            return
+        self.queue.remove(leg)
+        self.waiting_on.pop(leg_id, None)
+        self.dep_state[leg_id] = "FAILED"
+        self.journal.emit("dequeued", leg_id)
+        if leg.entry:
+            # Waiting for a retry or restart: its row is already in `started`.
+            leg.entry.update(state="CANCELLED", hedge=lost)
+            self.journal.emit("updated", leg_id, {"state": "CANCELLED", "hedge": lost, "retry_at": None})
+        else:
+            self.journal.emit("failed", leg_id, {**self.queue_row(leg), "state": "CANCELLED", "hedge": lost})
+
+    def hedge_exit(self, run: WorkerRun, code: int, killed: bool, tail: str) -> None:
+        """A leg exited: the first one that exits 0 and reports success wins the task, the
+        other legs are cancelled and its branch is merged into the main checkout before
+        dependents are released.  Failed legs are settled in settle_hedges."""
+        group_id = str(run.worker["hedge_of"])
+        group = self.hedge_groups[group_id]
+        if "state" in group or killed or code != 0:
+            return
+        if not hedge.succeeded(run.stream_result, tail):
+            # Exit 0 alone proves nothing; the leg lost, and the race goes on without it.
+            self.dep_state[run.task_id] = "FAILED"
+            run.entry["hedge"] = {"group": group_id, "won": False, "error": "no success reported"}
+            self.journal.emit("updated", run.task_id, {"hedge": run.entry["hedge"]})
+            print(f"[HEDGE] {run.task_id} exited 0 without reporting {hedge.DONE_LINE}; not counted as a win")
+            return
+        ended = time.time()
+        win_sec = round(ended - float(group.get("started_at", run.started_at)), 3)
+        group.update(state="WON", winner=run.task_id, winner_engine=run.engine, win_sec=win_sec)
+        run.entry["hedge"] = {"group": group_id, "won": True, "win_sec": win_sec}
+        losers = [leg for leg in group["legs"] if leg != run.task_id and self.dep_state.get(leg) is None]
+        for leg_id in losers:
+            self.cancel_leg(leg_id, run)
+        applied = worktree_isolation.apply(run.worktree, self.merge_lanes.get(run.task_id, {}), group_id)
+        run.entry["hedge"]["applied"] = applied
+        self.journal.emit("updated", run.task_id, {"hedge": run.entry["hedge"]})
+        self.dep_state[group_id] = "DONE" if applied["applied"] else "FAILED"
+        if not applied["applied"]:
+            group["apply_error"] = applied["error"]
+        self.publish_hedges()
+        if self.hedge_stats is not None:
+            self.hedge_stats.record(group["role"], group["engines"], _engine_family(run.engine), win_sec)
+        print(
+            f"[HEDGE] {group_id} won by {run.engine} ({run.task_id}) after {win_sec}s"
+            + (f"; cancelling {', '.join(losers)}" if losers else "")
+        )
+        if applied["applied"]:
+            print(f"[HEDGE] {group_id}: {run.worktree.get('branch')} merged into {run.worktree.get('target')}")
+        else:
+            print(f"[WARN] {group_id}: winner not merged ({applied['error']}); dependents are skipped")
+
+    def settle_hedges(self) -> None:
+        """Fail hedged tasks whose every leg has failed (or never ran)."""
+        for group_id in _failed_hedge_groups(self.hedge_groups, self.dep_state):
+            group = self.hedge_groups[group_id]
+            self.publish_hedges()
+            if self.hedge_stats is not None and not self.args.simulate:
+                self.hedge_stats.record(group["role"], group["engines"], "", None)
+            print(f"[HEDGE] {group_id}: every leg failed ({', '.join(group['legs'])})")
+
+    def settle_shards(self) -> None:
+        """Journal and report the sharded tasks _settle_shard_groups settles."""
+        for group_id in _settle_shard_groups(self.shard_groups, self.dep_state):
+            group = self.shard_groups[group_id]
+            self.journal.emit("run", None, {"shards": self.shard_groups})
+            if not self.args.dry_run or self.args.simulate:
+                print(f"[SHARD] {group_id}: {group['state']} ({', '.join(group['members'])})")
+
+    def stop_all(self, reason: str) -> None:
+        """Stop every running lane at once (grace, then force), record the exits with
+        their stop latency and drop the queue."""
+        live = [r for r in self.active_runs.values() if r.process is not None]
+        print(f"[STOP] {reason}; stopping {len(live)} lanes, dropping {len(self.queue)} queued")
+        now = time.time()
+        for run in live:
+            run.stop_requested = now
+            if isinstance(run.process, remote_runner.RemoteProcess):
+                run.process.terminate_tree(run.kill_grace)
+        rows = proc_tree.stop_trees(
+            [
+                {"task_id": r.task_id, "pid": r.process.pid, "pgid": r.entry.get("pgid"), "grace": r.kill_grace}
+                for r in live
+                if not isinstance(r.process, remote_runner.RemoteProcess)
+            ]
+        )
+        stop_sec = {row["task_id"]: row["stop_sec"] for row in rows}
+        for run in live:
+            assert run.process is not None
+            try:
+                code = run.process.wait(timeout=run.kill_grace + 5.0)
+            except subprocess.TimeoutExpired:
+                code = None
+            ended_at = now + stop_sec[run.task_id] if run.task_id in stop_sec else time.time()
+            run.entry["state"] = "STOPPED"
+            fields = _record_exit(run, -1 if code is None else code, ended_at)
+            self.journal.emit("exited", run.task_id, {**fields, "state": "STOPPED", "error": reason})
+            print(f"[STOP] {run.task_id} exit={code} stopped in {fields['stop_sec']}s")
+        for run in list(self.queue):
+            self.queue.remove(run)
+            self.journal.emit("dequeued", run.task_id)
+            if run.entry:
+                self.journal.emit("updated", run.task_id, {"state": "STOPPED", "error": reason, "retry_at": None})
+            else:
+                self.journal.emit("failed", run.task_id, {**self.queue_row(run), "state": "STOPPED", "error": reason})
+
+    def failover(self, run: WorkerRun, engine: str) -> str:
+        """Point a stalled lane at another engine, keeping its workspace and log; returns an error."""
+        if engine not in _HEADLESS_ENGINES:
+            return f"unsupported engine '{engine}'"
+        worker = {**run.worker, "engine": engine}
+        result_file = str(lane_results.result_path(self.run_dir, run.task_id))
+        prompt = _with_global_prompt(_resolve_prompt(Path(run.prompt_file), worker, result_file), self.defaults, worker)
+        lane_workspace = Path(run.workspace)
+        command, stdin_text, err = self.engine_command(
+            engine, worker, lane_workspace, not (lane_workspace / ".git").exists(), prompt
+        )
+        if err or not command:
+            return err or "empty command"
+        engine_cfg = self.engines_cfg.get(_engine_family(engine))
+        run.retry = _retry_policy(engine_cfg if isinstance(engine_cfg, dict) else {}, worker)
+        run.engine, run.command, run.stdin_text = engine, command, stdin_text
+        # The memo key was taken for the original command.
+        run.memo = {}
+        run.entry.update(engine=engine, command=command)
+        return ""
+
+    def dep_fail(self, run: WorkerRun, reason: str) -> None:
+        self.queue.remove(run)
+        self.waiting_on.pop(run.task_id, None)
+        self.dep_state[run.task_id] = "FAILED"
+        self.journal.emit("dequeued", run.task_id)
+        self.journal.emit("failed", run.task_id, {**self.queue_row(run), "state": "DEP_FAILED", "error": reason})
+        print(f"[SKIP] {run.task_id}: {reason}")
+
+    def propagate_dep_failures(self) -> None:
+        """Drop queued lanes whose dependency failed, transitively."""
+        changed = True
+        while changed:
+            changed = False
+            for run in list(self.queue):
+                if run.task_id in self.dep_cycle:
+                    self.dep_fail(run, "dependency cycle")
+                    changed = True
+                    continue
+                bad = next((d for d in run.depends_on if self.dep_state.get(d) in {"FAILED", "MISSING"}), "")
+                if bad:
+                    what = "was not dispatched" if self.dep_state[bad] == "MISSING" else "failed"
+                    self.dep_fail(run, f"dependency {bad} {what}")
+                    changed = True
+
+    def clock(self) -> float:
+        return self.sim_now if self.args.simulate else time.monotonic()
+
+    def sim_launch(self, run: WorkerRun) -> bool:
+        pred = self.sim_predictions[run.task_id]
+        run.attempt += 1
+        run.started_at = self.sim_now
+        heapq.heappush(self.sim_exits, (self.sim_now + pred["duration"], len(self.sim_rows), run))
+        self.sim_rows.append(
+            {
+                "task_id": run.task_id,
+                "engine": run.engine,
+                "start": round(self.sim_now, 3),
+                "end": round(self.sim_now + pred["duration"], 3),
+                "tokens": pred["tokens"],
+                "cost_usd": pred["cost_usd"],
+                "source": pred["source"],
+                **({"host": run.host or "local"} if self.hosts else {}),
+            }
+        )
+        return True
+
+    def scope_blocker(self, run: WorkerRun) -> str:
+        """A running lane, or one queued ahead, whose scope overlaps `run`'s."""
+        mine = self.conflicts.get(run.task_id)
+        if not mine:
+            return ""
+        for other in mine:
+            if other in self.active_runs:
+                return other
+        for other in self.queue:
+            if other.task_id in mine and self.plan_rank[other.task_id] < self.plan_rank[run.task_id]:
+                return other.task_id
+        return ""
+
+    def admit(self) -> float | None:
+        """Launch queued tasks that fit; return seconds until a deferred one may fit."""
+        wake: float | None = None
+        reused = False
+        if self.hedge_groups:
+            self.settle_hedges()
+        if self.shard_groups:
+            self.settle_shards()
+        if self.deps:
+            self.propagate_dep_failures()
+        for run in list(self.queue):
+            if 0 < self.max_concurrent <= self.running:
+                break
+            pending = [d for d in run.depends_on if self.dep_state.get(d) != "DONE"]
+            if pending:
+                reason = f"depends on {', '.join(pending)}"
+                if self.waiting_on.get(run.task_id) != reason:
+                    self.waiting_on[run.task_id] = reason
+                    self.journal.emit("queued", run.task_id, self.queue_row(run, reason))
+                continue
+            blocker = self.scope_blocker(run)
+            if blocker:
+                reason = f"scope overlap with {blocker}"
+                if self.waiting_on.get(run.task_id) != reason:
+                    self.waiting_on[run.task_id] = reason
+                    self.journal.emit("queued", run.task_id, self.queue_row(run, reason))
+                continue
+            if run.memo and run.attempt == 0 and not self.args.dry_run and self.memo_lookup(run):
+                self.queue.remove(run)
+                self.waiting_on.pop(run.task_id, None)
+                self.journal.emit("dequeued", run.task_id)
+                self.use_cached(run)
+                self.dep_state[run.task_id] = "DONE"
+                reused = True
+                continue
+            now = self.clock()
+            if run.not_before > now:
+                wake = run.not_before - now if wake is None else min(wake, run.not_before - now)
+                continue
+            pin = self.host_pin(run)
+            if pin and pin != "local" and not self.hosts[pin].up:
+                self.queue.remove(run)
+                self.waiting_on.pop(run.task_id, None)
+                self.dep_state[run.task_id] = "FAILED"
+                self.journal.emit("dequeued", run.task_id)
+                self.journal.emit("failed", run.task_id, {**self.queue_row(run), "error": f"host {pin} is unavailable: {self.hosts[pin].error}"})
+                print(f"[FAIL] {run.task_id}: host {pin} is unavailable")
+                continue
+            host = self.place(run)
+            if host is None:
+                reason = f"host {pin} has no free slot" if pin else "no free host slot"
+                if self.waiting_on.get(run.task_id) != reason:
+                    self.waiting_on[run.task_id] = reason
+                    self.journal.emit("queued", run.task_id, self.queue_row(run, reason))
+                continue
+            if self.load_monitor is not None and not host:
+                reason, change = self.load_monitor.check(sum(1 for r in self.active_runs.values() if not r.host))
+                if change:
+                    self.admission_change(change, reason)
+                if reason:
+                    run.deferred_since = run.deferred_since or now
+                    reason = f"host busy: {reason}" if self.load_monitor.held else reason
+                    if self.waiting_on.get(run.task_id) != reason:
+                        self.waiting_on[run.task_id] = reason
+                        self.journal.emit("queued", run.task_id, self.queue_row(run, reason))
+                    wake = self.admission["sample_sec"] if wake is None else min(wake, self.admission["sample_sec"])
+                    continue
+            run.host = host
+            limiter = self.limiters.get(_engine_family(run.engine))
+            if limiter is not None:
+                delay, reason = limiter.delay(now)
+                if delay > 0:
+                    if not run.deferred_since:
+                        run.deferred_since = now
+                        print(f"[RATE] {run.task_id} ({run.engine}) deferred: {reason}")
+                    if self.waiting_on.get(run.task_id) != reason:
+                        self.waiting_on[run.task_id] = reason
+                        self.journal.emit("queued", run.task_id, self.queue_row(run, reason))
+                    if delay != math.inf:
+                        wake = delay if wake is None else min(wake, delay)
+                    continue
+                run.reserved_tokens = limiter.acquire(now)
+            self.queue.remove(run)
+            self.waiting_on.pop(run.task_id, None)
+            self.journal.emit("dequeued", run.task_id)
+            if self.sim_launch(run) if self.args.simulate else self.launch(run):
+                self.running += 1
+                self.active_runs[run.task_id] = run
+                self.hold_host(run, 1)
+                if self.load_monitor is not None and not run.host:
+                    self.load_monitor.note_start()
+                if run.worker.get("hedge_of"):
+                    self.hedge_groups[run.worker["hedge_of"]].setdefault("started_at", run.started_at)
+                if run.deferred_since:
+                    run.entry["admission_delay_sec"] = round(now - run.deferred_since, 3)
+                    self.journal.emit("updated", run.task_id, {"admission_delay_sec": run.entry["admission_delay_sec"]})
+                    run.deferred_since = 0.0
+            else:
+                self.dep_state[run.task_id] = "FAILED"
+                if limiter is not None:
+                    limiter.release(run.reserved_tokens, None)
+        self.publish_limits()
+        self.publish_hosts()
+        if reused:
+            # A reused lane may have been the last dependency of lanes passed over above.
+            return self.admit()
+        return wake
+
+    def start(self) -> float | None:
+        """Journal the queue and launch what fits; returns seconds until a deferred lane may fit."""
+        for run in self.queue:
+            self.journal.emit("queued", run.task_id, self.queue_row(run))
+        wake = self.admit()
+        if self.queue:
+            print(f"[QUEUE] {len(self.queue)} tasks waiting for a slot or engine budget (max_concurrent={self.max_concurrent or '-'})")
+        return wake
+
+    def plan(self) -> None:
+        """--dry-run: print the plan and journal every lane as it would be launched."""
+        if 0 < self.max_concurrent < len(self.queue):
+            print(f"[DRY] queue mode: {len(self.queue)} tasks, max_concurrent={self.max_concurrent}")
+        for name, lim in self.limiters.items():
+            print(
+                f"[DRY] engine {name}: requests_per_min={lim.requests_per_min or '-'} "
+                f"concurrent_sessions={lim.concurrent_sessions or '-'} tokens_per_hour={lim.tokens_per_hour or '-'}"
+            )
+        for name, ver in self.engine_versions.items():
+            print(f"[DRY] engine {name}: {ver}")
+        if self.run_budget:
+            print(f"[DRY] run budget: {json.dumps(self.run_budget, separators=(',', ':'))}")
+        for name, host in self.hosts.items():
+            print(f"[DRY] host {name}: {host.address} slots={host.slots}" + (f" workspace={host.workspace}" if host.workspace else ""))
+        if self.hosts:
+            print(f"[DRY] local slots: {'pinned lanes only' if self.local_slots is None else self.local_slots}")
+        if self.deps:
+            print(f"[DRY] dag: {len(self.dag_stages)} stages")
+            for idx, stage in enumerate(self.dag_stages, 1):
+                after = [f"{t} after {', '.join(self.deps[t])}" for t in stage if t in self.deps]
+                print(f"[DRY]   stage {idx}: {', '.join(stage)}" + (f"  ({'; '.join(after)})" if after else ""))
+            for task_id in self.dep_cycle:
+                print(f"[DRY]   {task_id}: dependency cycle, would be skipped")
+            for task_id, ds in self.deps.items():
+                for dep in ds:
+                    if self.dep_state.get(dep) == "MISSING":
+                        print(f"[DRY]   {task_id}: dependency {dep} is not dispatched, would be skipped")
+            history = {t: (self.outcomes.get(t) or {}).get("duration_sec") for t in self.plan_order}
+            if any(history.values()):
+                path, total = task_dag.critical_path(self.plan_order, self.deps, history)
+                print(f"[DRY]   critical path: {' -> '.join(path)} (~{total}s from previous runs)")
+            else:
+                path, _ = task_dag.critical_path(self.plan_order, self.deps, dict.fromkeys(self.plan_order, 1.0))
+                print(f"[DRY]   critical path: {' -> '.join(path)} (by stage count; no previous durations)")
+        if self.conflicts:
+            print(f"[DRY] scope plan: {len(self.scope_waves)} waves ({sum(map(len, self.conflicts.values())) // 2} overlapping pairs)")
+            for idx, wave in enumerate(self.scope_waves, 1):
+                after = [
+                    f"{task_id} after {', '.join(sorted(o for o in self.conflicts.get(task_id, {}) if self.plan_rank[o] < self.plan_rank[task_id]))}"
+                    for task_id in wave
+                    if idx > 1 and task_id in self.conflicts
+                ]
+                print(f"[DRY]   wave {idx}: {', '.join(wave)}" + (f"  ({'; '.join(after)})" if after else ""))
+        for run in self.queue:
+            print(f"[DRY] {run.task_id} ({run.engine}) P{run.priority} -> {' '.join(run.command[:8])} ...")
+            if run.limits:
+                print(f"[DRY]   limits: {json.dumps(run.limits, separators=(',', ':'))}")
+            if run.budget:
+                print(f"[DRY]   budget: {json.dumps(run.budget, separators=(',', ':'))}")
+            if self.hosts and self.host_pin(run):
+                print(f"[DRY]   host: {self.host_pin(run)}")
+            if run.worktree:
+                print(f"[DRY]   isolation: worktree on a new orch/{self.orch_id}/{run.task_id}-{self.stamp} branch")
+            if run.worker.get("hedge_of"):
+                group = self.hedge_groups[run.worker["hedge_of"]]
+                print(f"[DRY]   hedge: leg of {run.worker['hedge_of']} ({', '.join(group['engines'])}); first success wins")
+            if run.worker.get("shard_of"):
+                group = self.shard_groups[run.worker["shard_of"]]
+                lane_id = str(run.worker.get("hedge_of") or run.task_id)
+                row = next((r for r in group["shards"] if r["task_id"] == lane_id), None)
+                if row:
+                    print(
+                        f"[DRY]   shard: {group['members'].index(lane_id) + 1}/{len(group['members'])} of "
+                        f"{run.worker['shard_of']} ({row['files']} files, {row['weight']} {'lines' if group['by'] == 'lines' else 'bytes'})"
+                    )
+                else:
+                    print(f"[DRY]   shard: review of {', '.join(group['members'])}")
+            self.journal.emit("launched", run.task_id, self.entry_for(run))
+            if run.memo.get("hit"):
+                print(f"[DRY]   CACHED: identical inputs ran in {run.memo['hit'].get('run', '?')}; would not launch")
+
+    def simulate(self) -> None:
+        """--simulate: drive `admit` with a virtual clock and exits predicted from history."""
+        history = schedule_sim.History.load(
+            self.runs_root, {run.task_id: self.outcomes.get(run.task_id) or {} for run in self.queue}
+        )
+        print(f"[SIM] history: {len(history.samples)} successful lanes from {history.runs} runs")
+        for run in self.queue:
+            pred = history.predict(run.task_id, run.engine, run.role)
+            if run.memo.get("hit"):
+                pred.update(duration=0.0, tokens=0, cost_usd=0.0, source="memo hit")
+            self.sim_predictions[run.task_id] = pred
+        wake = self.admit()
+        while self.running > 0 or self.queue:
+            next_exit = self.sim_exits[0][0] if self.sim_exits else None
+            # Budgets refill in floating point; step at least 1ms so a wake never stalls.
+            next_wake = self.sim_now + max(wake, 0.001) if wake is not None else None
+            if next_exit is None and next_wake is None:
+                print(f"[SIM] {len(self.queue)} queued tasks could never be admitted")
+                break
+            self.sim_now = min(t for t in (next_exit, next_wake) if t is not None)
+            while self.sim_exits and self.sim_exits[0][0] <= self.sim_now:
+                _, row_idx, run = heapq.heappop(self.sim_exits)
+                self.running -= 1
+                self.active_runs.pop(run.task_id, None)
+                self.hold_host(run, -1)
+                self.dep_state[run.task_id] = "DONE"
+                limiter = self.limiters.get(_engine_family(run.engine))
+                if limiter is not None:
+                    limiter.release(run.reserved_tokens, self.sim_predictions[run.task_id]["tokens"])
+                group_id = run.worker.get("hedge_of")
+                if group_id and "state" not in self.hedge_groups[group_id]:
+                    # The predicted-fastest leg wins; the others stop here.
+                    self.hedge_groups[group_id].update(state="WON", winner=run.task_id, winner_engine=run.engine)
+                    self.dep_state[group_id] = "DONE"
+                    self.sim_rows[row_idx]["hedge"] = "won"
+                    for other_at, other_idx, other in list(self.sim_exits):
+                        if other.worker.get("hedge_of") == group_id:
+                            self.sim_exits.remove((other_at, other_idx, other))
+                            row = self.sim_rows[other_idx]
+                            span = row["end"] - row["start"]
+                            if row["tokens"] is not None and span > 0:
+                                row["tokens"] = int(row["tokens"] * (self.sim_now - row["start"]) / span)
+                            row.update(end=round(self.sim_now, 3), hedge="cancelled")
+                            self.running -= 1
+                            self.active_runs.pop(other.task_id, None)
+                            self.hold_host(other, -1)
+                            self.dep_state[other.task_id] = "FAILED"
+                            other_limiter = self.limiters.get(_engine_family(other.engine))
+                            if other_limiter is not None:
+                                other_limiter.release(other.reserved_tokens, None)
+                    heapq.heapify(self.sim_exits)
+                    for other in [r for r in self.queue if r.worker.get("hedge_of") == group_id]:
+                        self.queue.remove(other)
+                        self.dep_state[other.task_id] = "FAILED"
+            wake = self.admit()
+        makespan = max((row["end"] for row in self.sim_rows), default=0.0)
+        by_engine: dict[str, int] = {}
+        for row in self.sim_rows:
+            by_engine[row["engine"]] = by_engine.get(row["engine"], 0) + int(row["tokens"] or 0)
+        costs = [row["cost_usd"] for row in self.sim_rows if row["cost_usd"] is not None]
+        simulation = {
+            "makespan_sec": round(makespan, 3),
+            "peak_concurrency": schedule_sim.peak_concurrency(self.sim_rows),
+            "tokens": sum(by_engine.values()),
+            "tokens_by_engine": by_engine,
+            "cost_usd": round(sum(costs), 4) if costs else None,
+            "unknown_tokens": sorted(row["task_id"] for row in self.sim_rows if row["tokens"] is None),
+            "lanes": self.sim_rows,
+        }
+        self.journal.emit("run", None, {"simulation": simulation})
+        for row in sorted(self.sim_rows, key=lambda r: (r["start"], r["task_id"])):
+            tokens = f"~{row['tokens']:,} tokens" if row["tokens"] is not None else "tokens unknown"
+            print(
+                f"[SIM] {row['task_id']} ({row['engine']}) {schedule_sim.fmt_sec(row['start'])} -> "
+                f"{schedule_sim.fmt_sec(row['end'])} {tokens} [{row['source']}]"
+                + (f" hedge {row['hedge']}" if row.get("hedge") else "")
+            )
+        for line in schedule_sim.timeline_lines(self.sim_rows, makespan):
+            print(f"[SIM]   {line}")
+        engines_text = ", ".join(f"{name} {count:,}" for name, count in sorted(by_engine.items()))
+        print(
+            f"[SIM] makespan {schedule_sim.fmt_sec(makespan)}, peak concurrency {simulation['peak_concurrency']}, "
+            f"tokens ~{simulation['tokens']:,} ({engines_text or '-'})"
+            + (f", cost ~${simulation['cost_usd']}" if simulation["cost_usd"] is not None else "")
+            + (f"; no token history for {len(simulation['unknown_tokens'])} lanes" if simulation["unknown_tokens"] else "")
+        )
+
+    def supervise(self, wake: float | None) -> int:
+        """Block on child exits until the queue drains; each exit lands in the journal as
+        soon as it happens and frees a slot (and engine budget) for the next queued task."""
+        assert self.watcher is not None
+        next_watch = time.monotonic() + (self.watch_interval or 0.0)
+        try:
+            while self.running > 0 or self.queue:
+                if self.running == 0 and wake is None:
+                    print(f"[WARN] {len(self.queue)} queued tasks can never be admitted; giving up")
+                    break
+                timeout = wake
+                if self.journal.dirty:
+                    timeout = self.journal.snapshot_interval if timeout is None else min(timeout, self.journal.snapshot_interval)
+                if self.watch_interval is not None and self.running:
+                    timeout = self.watch_interval if timeout is None else min(timeout, self.watch_interval)
+                event = self.watcher.next_event(timeout=timeout)
+                if self.watch_interval is not None and time.monotonic() >= next_watch:
+                    if self.stall_policies:
+                        self.check_stalls()
+                    self.check_budgets()
+                    next_watch = time.monotonic() + self.watch_interval
+                if event is not None:
+                    _kind, run, code, ended_at = event
+                    self.on_exit(run, code, ended_at)
+                wake = self.admit()
+                self.journal.snapshot()
+        except KeyboardInterrupt:
+            # Workers lead their own process groups, so Ctrl+C reached only the dispatcher.
+            self.stop_all("interrupted")
+            self.journal.close()
+            return 130
+        self.finish()
+        self.journal.close()
+        print("[INFO] all workers finished")
+        return 0
+
+    def on_exit(self, run: WorkerRun, code: int, ended_at: float) -> None:
+        """Record a worker exit, then restart it (stalled), retry it (rate-limited) or settle it."""
+        self.running -= 1
+        self.active_runs.pop(run.task_id, None)
+        self.hold_host(run, -1)
+        self.journal.emit("exited", run.task_id, _record_exit(run, code, ended_at))
+        limiter = self.limiters.get(_engine_family(run.engine))
+        if run.pump is not None:
+            # The child has exited: the follower reads the log to its end and stops.
+            run.pump.finish(timeout=5.0)
+        tail = _tail_text(run.log_file, 64000)
+        usage = run.stream_usage or _parse_token_usage(tail, run.engine)
+        if usage:
+            self.journal.emit("tokens", run.task_id, {"token_usage": usage})
+            self.spent_tokens += int(usage.get("total_tokens") or 0)
+        if limiter is not None:
+            used = usage.get("total_tokens") if usage else None
+            limiter.release(run.reserved_tokens, int(used) if used is not None else None)
+        run.watch = None
+        if run.stop_requested and run.entry.get("state") not in _SUPERVISOR_STATES:
+            # Stopped from outside the loop (the resident daemon's `stop`).
+            run.entry["state"] = "STOPPED"
+            self.journal.emit("updated", run.task_id, {"state": "STOPPED"})
+        killed = run.entry.get("state") in _SUPERVISOR_STATES
+        attempt_text = _read_from_offset(run.log_file, run.log_offset)
+        limited = _exit_rate_limited(code, killed, attempt_text, run.stream_result)
+        if limited:
+            run.entry["attempts"][-1]["rate_limited"] = True
+        if run.entry.get("state") == "STALLED":
+            run.entry["attempts"][-1]["stalled"] = run.entry["stalls"][-1]["reason"]
+        action = _exit_action(run, limited, self.run_budget_hit is not None)
+        if action == "restart":
+            self.restart(run)
+        elif action == "retry":
+            self.retry(run, code, limiter)
+        else:
+            self.settle(run, code, killed, limited, tail, usage)
+
+    def requeue(self, run: WorkerRun, reason: str) -> None:
+        self.queue.append(run)
+        self.queue.sort(key=lambda r: r.priority)
+        self.waiting_on[run.task_id] = reason
+        self.journal.emit("queued", run.task_id, self.queue_row(run, reason))
+
+    def restart(self, run: WorkerRun) -> None:
+        """Queue a stalled lane for another attempt, on its failover engine if it has one."""
+        failover = str(run.stall.get("failover", ""))
+        if failover and failover != run.engine:
+            err = self.failover(run, failover)
+            if err:
+                print(f"[WARN] {run.task_id}: failover to {failover} failed ({err}); restarting on {run.engine}")
+        run.process = None
+        self.journal.emit(
+            "retried",
+            run.task_id,
+            {"attempts": run.entry["attempts"], "engine": run.engine, "command": run.command},
+        )
+        self.requeue(run, "stall_restart")
+        print(
+            f"[RESTART] {run.task_id} stalled; attempt {run.attempt + 1} on {run.engine} "
+            f"(restart {len(run.entry.get('stalls', []))}/{int(run.stall.get('restarts', 0))})"
+        )
+
+    def retry(self, run: WorkerRun, code: int, limiter: _EngineLimiter | None) -> None:
+        """Queue a rate-limited lane after its backoff; the engine cools down meanwhile."""
+        delay = _retry_delay(run.retry, run.attempt)
+        run.not_before = time.monotonic() + delay
+        run.process = None
+        if limiter is not None:
+            limiter.cool_down(run.not_before)
+        run.entry["retry_at"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() + delay))
+        self.journal.emit("retried", run.task_id, {"retry_at": run.entry["retry_at"], "attempts": run.entry["attempts"]})
+        self.requeue(run, "retry_backoff")
+        print(
+            f"[RETRY] {run.task_id} exit={code} rate-limited; attempt {run.attempt + 1}"
+            f"/{int(run.retry.get('max_retries', 0)) + 1} in {delay:.1f}s"
+        )
+
+    def settle(
+        self, run: WorkerRun, code: int, killed: bool, limited: bool, tail: str, usage: dict[str, Any] | None
+    ) -> None:
+        """A lane's last attempt: index its outcome, memoize and collect its worktree, and
+        release its dependents (or decide its hedge race)."""
+        if limited:
+            self.journal.emit("updated", run.task_id, {"attempts": run.entry["attempts"]})
+        self.outcomes.record(run.task_id, _outcome_record(run.entry, tail, run.engine, run.log_file))
+        self.dep_state[run.task_id] = "DONE" if code == 0 and not killed else "FAILED"
+        if code == 0 and not killed and run.memo.get("key"):
+            self.memo_store(run, usage)
+        if run.worktree:
+            lane = worktree_isolation.finish(run.worktree, run.task_id)
+            self.merge_lanes[run.task_id] = lane
+            run.entry["merge"] = lane
+            self.journal.emit("updated", run.task_id, {"merge": lane})
+            print(worktree_isolation.summary_line(run.task_id, lane))
+        print(
+            f"[DONE] {run.task_id} exit={code}{' ' + run.entry['state'] if killed else ''} "
+            f"duration={run.entry['duration_sec']}s log={run.log_file}"
+        )
+        if run.worker.get("hedge_of"):
+            self.hedge_exit(run, code, killed, tail)
+
+    def finish(self) -> None:
+        """After the last exit: critical path, merge report and the merged results file."""
+        if self.deps:
+            # A cancelled hedge leg did not hold anything up; its winner did.
+            durations = {
+                run.task_id: run.entry.get("duration_sec")
+                for run in self.planned
+                if run.entry and run.entry.get("state") != "CANCELLED"
+            }
+            path, total = task_dag.critical_path(self.plan_order, self.deps, durations)
+            self.journal.emit("run", None, {"critical_path": {"tasks": path, "duration_sec": total}})
+            print(f"[DAG] critical path: {' -> '.join(path)} ({total}s)")
+        if self.merge_lanes:
+            merge_report = worktree_isolation.write_report(self.run_dir, self.merge_lanes)
+            self.journal.emit("run", None, {"shared_files": merge_report["shared_files"], "lane_conflicts": merge_report["lane_conflicts"]})
+            for name, ids in merge_report["shared_files"].items():
+                print(f"[MERGE] {name} changed by {', '.join(ids)}")
+            for clash in merge_report["lane_conflicts"]:
+                print(f"[MERGE] {' and '.join(clash['lanes'])} conflict with each other: {', '.join(clash['files'][:5])}")
+            print(f"[INFO] merge report: {self.run_dir / worktree_isolation.REPORT_FILE}")
+        if self.results_file is not None:
+            try:
+                merged = lane_results.merge(self.run_dir, self.journal.manifest, self.results_file)
+                self.journal.emit("run", None, {"results": merged})
+                print(f"[RESULTS] {merged['written']}/{merged['lanes']} lanes wrote a result -> {merged['file']}")
+            except OSError as exc:
+                print(f"[WARN] results not merged: {exc}")
+
+
+def main(argv: list[str] | None = None, report: dict[str, Any] | None = None) -> int:
+    """CLI entry point; the resident daemon calls it per job with `report`, which gets the
+    run dir and planned WorkerRuns, and its "ready" Event set once initial launches are done."""
     parser = argparse.ArgumentParser(description="ORCH parallel worker dispatcher")
     parser.add_argument("--tasks-file", required=True, help="Path to tasks JSON")
     parser.add_argument("--model", default="gpt-5.3-codex")
     parser.add_argument("--reasoning-effort", default="xhigh")
     parser.add_argument("--wait", action="store_true")
     parser.add_argument("--dry-run", action="store_true")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--simulate",
+        action="store_true",
+        help="Dry run that replays the schedule with historical durations and tokens",
+    )
+    parser.add_argument("--max-concurrent", type=int, default=None, help="Queue mode: max workers running at once (0 = all)")
+    args = parser.parse_args(argv)
+    if args.simulate:
+        args.dry_run = True
 
     tasks_file = Path(args.tasks_file).resolve()
     if not tasks_file.exists():
@@ -464,6 +2269,25 @@ def main() -> int:
     if not isinstance(workers, list):
         print("[ERROR] workers must be a list")
         return 2
+    # Sharding first: a sharded worker that is also hedged races each of its shards.
+    workers, shard_groups, shard_notes = shard.expand(workers, workspace)
+    workers, hedge_groups, hedge_notes = hedge.expand(workers, engines_cfg)
+    for line in shard_notes + hedge_notes:
+        print(line)
+    # Legs race in their own worktrees and the winner is merged back: no git, no race.
+    for group_id in hedge_groups:
+        leg = next(w for w in workers if isinstance(w, dict) and w.get("hedge_of") == group_id)
+        leg_workspace = _resolve_worker_workspace(workspace, leg)
+        if worktree_isolation.git_toplevel(leg_workspace) is None:
+            print(f"[ERROR] {group_id}: hedge needs a git repository, and {leg_workspace} is not in one")
+            return 2
+    # Remote runner agents; lanes are placed on them by free slots (see remote_runner.py).
+    try:
+        hosts = remote_runner.load_hosts(config)
+        local_slots = None if defaults.get("local_slots") is None else max(0, int(defaults["local_slots"]))
+    except (TypeError, ValueError) as exc:
+        print(f"[ERROR] hosts: {exc}")
+        return 2
 
     # Engine-specific configs (new engines section takes priority over legacy defaults)
     codex_ecfg = engines_cfg.get("codex", {})
@@ -483,7 +2307,13 @@ def main() -> int:
     codex_dangerously_bypass_default = bool(codex_ecfg.get("dangerously_bypass", defaults.get("codex_dangerously_bypass", False)))
     single_run_dir = bool(defaults.get("single_run_dir", True))
     clean_run_dir = bool(defaults.get("clean_run_dir", True))
+    stream_output = bool(defaults.get("stream_events", True))
     prune_legacy_runs = bool(defaults.get("prune_legacy_runs", True))
+    archive_policy = run_archive.archive_policy(defaults)
+    archive_runs = bool(archive_policy.get("enabled", True))
+    max_concurrent = max(
+        0, int(args.max_concurrent if args.max_concurrent is not None else defaults.get("max_concurrent", 0) or 0)
+    )
 
     # Claude engine defaults from engines config
     claude_cmd_from_engines = str(claude_ecfg.get("cmd", "")).strip()
@@ -495,86 +2325,72 @@ def main() -> int:
     runs_root = tasks_file.parents[1] / "runs"
     runs_root.mkdir(parents=True, exist_ok=True)
     stamp = time.strftime("%Y%m%d_%H%M%S")
+    outcomes = OutcomeIndex(index_path(runs_root, orch_id))
+    memo = memo_cache.MemoCache(runs_root)
+    default_memo = memo_cache.memo_policy(defaults, {})
+    if default_memo["enabled"] and not args.dry_run:
+        memo.prune(float(default_memo["ttl_hours"] or 0))
     if single_run_dir:
         run_dir = runs_root / orch_id
+        if not args.dry_run:
+            _backfill_outcomes(run_dir, outcomes)
+        set_aside = 0
         if clean_run_dir:
-            _clear_run_dir(run_dir)
+            # Archiving renames the previous run away; the old clear is the fallback when
+            # archiving is off or the rename is refused.
+            if archive_runs and run_archive.set_aside(run_dir, runs_root) is not None:
+                set_aside += 1
+            else:
+                _clear_run_dir(run_dir)
         run_dir.mkdir(parents=True, exist_ok=True)
         if prune_legacy_runs:
-            _prune_legacy_run_dirs(runs_root, orch_id, run_dir)
+            set_aside += _prune_legacy_run_dirs(runs_root, orch_id, run_dir, archive=archive_runs)
+        if set_aside:
+            _spawn_archiver(runs_root, archive_policy)
     else:
         run_dir = runs_root / f"{orch_id}_{stamp}"
         run_dir.mkdir(parents=True, exist_ok=True)
 
-    started: list[WorkerRun] = []
-    manual_workers: list[dict[str, Any]] = []
+    raw_results = str(defaults.get("results_file", lane_results.DEFAULT_RESULTS_FILE) or "").strip()
+    results_file = (tasks_file.parents[1] / raw_results) if raw_results else None
 
-    for worker in workers:
-        if not isinstance(worker, dict):
-            continue
-        if not bool(worker.get("enabled", True)):
-            continue
-
-        task_id = str(worker.get("task_id", "UNKNOWN"))
-        owner = str(worker.get("owner", "UNKNOWN"))
-        role = str(worker.get("role", ""))
-        engine = str(worker.get("engine", "codex")).lower()
-
-        if engine in {"manual", "claude-manual"}:
-            manual_workers.append(worker)
-            continue
-
-        worker_workspace = _resolve_worker_workspace(workspace, worker)
-        skip_git_check = not (worker_workspace / ".git").exists()
-
-        # Token guard: skip auto-run if this lane repeatedly fails under policy/quota prompts.
-        read_only_guard = bool(worker.get("read_only_guard", read_only_guard_default))
-        if engine == "codex" and read_only_guard and not args.dry_run:
-            can_write, write_msg = _workspace_write_probe(worker_workspace)
-            if not can_write:
-                worker = dict(worker)
-                worker["engine"] = "manual"
-                worker["_manual_reason"] = f"workspace write probe failed: {write_msg}"
-                manual_workers.append(worker)
-                print(f"[GUARD] {task_id}: switched to manual ({worker['_manual_reason']})")
-                continue
-
-        history_guard = bool(worker.get("history_readonly_guard", history_readonly_guard_default))
-        if history_guard and not args.dry_run:
-            hint = _latest_task_log_hint(runs_root, task_id)
-            if _looks_like_readonly_policy(hint) and not bool(worker.get("allow_readonly_retry", False)):
-                worker = dict(worker)
-                worker["engine"] = "manual"
-                worker["_manual_reason"] = "previous run indicates read-only/policy block; skipped to avoid token waste"
-                manual_workers.append(worker)
-                print(f"[GUARD] {task_id}: switched to manual ({worker['_manual_reason']})")
-                continue
-            if (
-                engine in {"claude", "claude-cli"}
-                and _looks_like_claude_quota_or_prompt_block(hint)
-                and not bool(worker.get("allow_token_retry", False))
-            ):
-                worker = dict(worker)
-                worker["engine"] = "manual"
-                worker["_manual_reason"] = "previous run indicates quota/approval block; skipped to avoid token waste"
-                manual_workers.append(worker)
-                print(f"[GUARD] {task_id}: switched to manual ({worker['_manual_reason']})")
-                continue
-
-        prompt_rel = str(worker.get("prompt_file", "")).strip()
-        if not prompt_rel:
-            print(f"[WARN] {task_id}: prompt_file missing, skipped")
-            continue
-
-        prompt_file = Path(prompt_rel)
-        if not prompt_file.is_absolute():
-            prompt_file = (tasks_file.parents[2] / prompt_file).resolve()
-        if not prompt_file.exists():
-            print(f"[WARN] {task_id}: prompt file not found: {prompt_file}")
-            continue
+    planned: list[WorkerRun] = []
+    manual_workers: list[dict[str, Any]] = []
 
-        prompt = _resolve_prompt(prompt_file, worker)
-        prompt = _with_global_prompt(prompt, defaults, worker)
+    # Fallback for tasks missing from the outcome index; listed lazily, once.
+    history_dirs: list[Path] | None = None
+    history_lock = threading.Lock()
+
+    def _history_block(task_id: str) -> str:
+        """The index answers unless a newer log of the task exists than the one it was
+        built from (timestamped run dirs, or a run nobody supervised); that log is then
+        classified and indexed, so a stale block never shadows a later success."""
+        nonlocal history_dirs
+        with history_lock:
+            if history_dirs is None:
+                history_dirs = _recent_run_dirs(runs_root)
+        log_file, log_mtime = _latest_task_log(task_id, history_dirs)
+        known = outcomes.get(task_id)
+        if known is not None and float(known.get("log_mtime", 0) or 0) >= log_mtime:
+            return str(known.get("block", ""))
+        if log_file is None:
+            return ""
+        row = next(
+            (
+                r
+                for r in (read_manifest(log_file.parent) or {}).get("started") or []
+                if isinstance(r, dict) and r.get("task_id") == task_id
+            ),
+            {},
+        )
+        record = _outcome_record(row, _tail_text(log_file, 64000), str(row.get("engine", "")), log_file)
+        outcomes.record(task_id, record)
+        return str(record["block"])
+
+    def _engine_command(
+        engine: str, worker: dict[str, Any], worker_workspace: Path, skip_git_check: bool, prompt: str
+    ) -> tuple[list[str] | None, str | None, str]:
+        """(command, stdin_text, error) running `prompt` on a headless engine in `worker_workspace`."""
         command: list[str] | None = None
         stdin_text: str | None = None
 
@@ -618,25 +2434,120 @@ def main() -> int:
                 claude_defaults["claude_auto_approve"] = claude_ecfg["auto_approve"]
             if claude_ecfg.get("permission_mode"):
                 claude_defaults["claude_permission_mode"] = claude_ecfg["permission_mode"]
-            command, stdin_text, err = _build_claude_command(prompt=prompt, worker=worker, defaults=claude_defaults)
-            if err:
-                print(f"[WARN] {task_id}: {err}; switched to manual")
-                worker = dict(worker)
-                worker["engine"] = "claude-manual"
-                manual_workers.append(worker)
-                continue
+            return _build_claude_command(prompt=prompt, worker=worker, defaults=claude_defaults)
         else:
-            print(f"[WARN] {task_id}: unsupported engine '{engine}', switched to manual")
+            return None, None, f"unsupported engine '{engine}'"
+        return command, stdin_text, ""
+
+    def _prepare(worker: dict[str, Any]) -> tuple[WorkerRun | None, dict[str, Any] | None, list[str]]:
+        """Preflight one worker: write probe, history guard, executable lookup, prompt render.
+        Runs on a thread pool; messages are returned so output keeps the config order."""
+        notes: list[str] = []
+        task_id = str(worker.get("task_id", "UNKNOWN"))
+        owner = str(worker.get("owner", "UNKNOWN"))
+        role = str(worker.get("role", ""))
+        engine = str(worker.get("engine", "codex")).lower()
+
+        if engine in {"manual", "claude-manual"}:
+            return None, worker, notes
+
+        worker_workspace = _resolve_worker_workspace(workspace, worker)
+        skip_git_check = not (worker_workspace / ".git").exists()
+
+        # Token guard: skip auto-run if this lane repeatedly fails under policy/quota prompts.
+        read_only_guard = bool(worker.get("read_only_guard", read_only_guard_default))
+        if engine == "codex" and read_only_guard and not args.dry_run:
+            can_write, write_msg = _workspace_write_probe(worker_workspace)
+            if not can_write:
+                worker = dict(worker)
+                worker["engine"] = "manual"
+                worker["_manual_reason"] = f"workspace write probe failed: {write_msg}"
+                notes.append(f"[GUARD] {task_id}: switched to manual ({worker['_manual_reason']})")
+                return None, worker, notes
+
+        history_guard = bool(worker.get("history_readonly_guard", history_readonly_guard_default))
+        if history_guard and not args.dry_run:
+            block = _history_block(task_id)
+            if block == "readonly_policy" and not bool(worker.get("allow_readonly_retry", False)):
+                worker = dict(worker)
+                worker["engine"] = "manual"
+                worker["_manual_reason"] = "previous run indicates read-only/policy block; skipped to avoid token waste"
+                notes.append(f"[GUARD] {task_id}: switched to manual ({worker['_manual_reason']})")
+                return None, worker, notes
+            if (
+                engine in {"claude", "claude-cli"}
+                and block == "quota_or_prompt"
+                and not bool(worker.get("allow_token_retry", False))
+            ):
+                worker = dict(worker)
+                worker["engine"] = "manual"
+                worker["_manual_reason"] = "previous run indicates quota/approval block; skipped to avoid token waste"
+                notes.append(f"[GUARD] {task_id}: switched to manual ({worker['_manual_reason']})")
+                return None, worker, notes
+
+        prompt_rel = str(worker.get("prompt_file", "")).strip()
+        if not prompt_rel:
+            notes.append(f"[WARN] {task_id}: prompt_file missing, skipped")
+            return None, None, notes
+
+        prompt_file = Path(prompt_rel)
+        if not prompt_file.is_absolute():
+            prompt_file = (tasks_file.parents[2] / prompt_file).resolve()
+        if not prompt_file.exists():
+            notes.append(f"[WARN] {task_id}: prompt file not found: {prompt_file}")
+            return None, None, notes
+
+        try:
+            isolation = worktree_isolation.isolation_mode(defaults, worker)
+        except ValueError as exc:
+            notes.append(f"[WARN] {task_id}: {exc}; skipped")
+            return None, None, notes
+        pin = str(worker.get("host", "") or "").strip()
+        if pin and pin != "local" and pin not in hosts:
+            notes.append(f"[WARN] {task_id}: unknown host '{pin}'; skipped")
+            return None, None, notes
+        if pin and pin != "local" and isolation == "worktree":
+            notes.append(f"[WARN] {task_id}: worktree lanes run locally; host '{pin}' ignored")
+        worktree: dict[str, Any] = {}
+        if isolation == "worktree":
+            if args.dry_run:
+                worktree = {"mode": "worktree", "planned": True}
+            else:
+                try:
+                    worktree = worktree_isolation.create(worker_workspace, orch_id, task_id, stamp)
+                except (OSError, RuntimeError, ValueError) as exc:
+                    notes.append(f"[WARN] {task_id}: worktree isolation failed ({exc}); skipped")
+                    return None, None, notes
+                worker_workspace = Path(worktree["workspace"])
+                skip_git_check = False
+
+        if engine not in _HEADLESS_ENGINES:
+            notes.append(f"[WARN] {task_id}: unsupported engine '{engine}', switched to manual")
             worker = dict(worker)
             worker["engine"] = "manual"
-            manual_workers.append(worker)
-            continue
+            return None, worker, notes
+        prompt = _resolve_prompt(prompt_file, worker, str(lane_results.result_path(run_dir, task_id)))
+        prompt = _with_global_prompt(prompt, defaults, worker)
+        command, stdin_text, err = _engine_command(engine, worker, worker_workspace, skip_git_check, prompt)
+        if err:
+            notes.append(f"[WARN] {task_id}: {err}; switched to manual")
+            worker = dict(worker)
+            worker["engine"] = "claude-manual"
+            return None, worker, notes
 
         if not command:
-            print(f"[WARN] {task_id}: empty command; skipped")
-            continue
+            notes.append(f"[WARN] {task_id}: empty command; skipped")
+            return None, None, notes
 
         log_file = run_dir / f"{task_id}.log"
+        engine_cfg = engines_cfg.get(_engine_family(engine))
+        engine_cfg = engine_cfg if isinstance(engine_cfg, dict) else {}
+        try:
+            limits = resource_limits.resolve_limits(engine_cfg, worker)
+        except (TypeError, ValueError) as exc:
+            notes.append(f"[WARN] {task_id}: invalid resource limit ({exc}), skipped")
+            return None, None, notes
+
         run = WorkerRun(
             task_id=task_id,
             owner=owner,
@@ -648,8 +2559,56 @@ def main() -> int:
             prompt_file=str(prompt_file),
             repo=str(worker.get("repo", "")),
             stdin_text=stdin_text,
+            priority=_priority_rank(worker.get("priority")),
+            retry=_retry_policy(engine_cfg, worker),
+            limits=limits,
+            worktree=worktree,
+            # A lane in its own worktree cannot collide with others on scope.
+            scope=[] if worktree else scope_plan.scope_patterns(worker),
+            depends_on=task_dag.dependencies(worker),
+            worker=worker,
+            stall=lane_watchdog.stall_policy(defaults, engine_cfg, worker),
+            budget=lane_budget.lane_budget(defaults, engine_cfg, worker),
+            kill_grace=_kill_grace(defaults, engine_cfg, worker),
         )
-        started.append(run)
+        memo_policy = memo_cache.memo_policy(defaults, worker)
+        patterns = scope_plan.scope_patterns(worker)
+        if memo_policy["enabled"] and patterns:
+            # The key is taken when the lane is admitted, after its dependencies have
+            # written their files; a dry run can only predict lanes without dependencies.
+            run.memo = {"patterns": patterns, "ttl_hours": float(memo_policy["ttl_hours"] or 0)}
+            if args.dry_run and not run.depends_on:
+                _memo_lookup(run, memo, workspace)
+        return run, None, notes
+
+    enabled_workers = [w for w in workers if isinstance(w, dict) and bool(w.get("enabled", True))]
+    with ThreadPoolExecutor(max_workers=max(1, min(16, len(enabled_workers)))) as pool:
+        prepared = list(pool.map(_prepare, enabled_workers))
+    for run, manual_worker, notes in prepared:
+        for line in notes:
+            print(line)
+        if manual_worker is not None:
+            manual_workers.append(manual_worker)
+        if run is not None:
+            planned.append(run)
+
+    # One `--version` probe per distinct CLI binary, skipped while the cached answer is current.
+    engine_exes = {_engine_family(run.engine): _command_executable(run.command) for run in planned}
+    engine_versions: dict[str, str] = {}
+    if engine_exes:
+        with ThreadPoolExecutor(max_workers=len(engine_exes)) as pool:
+            for name, ver in zip(engine_exes, pool.map(exe_cache.version, engine_exes.values())):
+                if ver:
+                    engine_versions[name] = ver
+    exe_cache.save()
+    if hosts and not args.dry_run:
+        with ThreadPoolExecutor(max_workers=len(hosts)) as pool:
+            list(pool.map(remote_runner.probe, hosts.values()))
+        for host in hosts.values():
+            if host.up:
+                print(f"[HOST] {host.name} {host.address} slots={host.slots} ({host.info.get('hostname', '?')})")
+            else:
+                print(f"[WARN] host {host.name} {host.address} unavailable: {host.error}")
 
     manifest: dict[str, Any] = {
         "orch_id": orch_id,
@@ -661,102 +2620,78 @@ def main() -> int:
         "approval_note": f"ignored by current codex exec cli: {approval}",
         "search_note": f"ignored by current codex exec cli: {search}",
         "dry_run": bool(args.dry_run),
+        "max_concurrent": max_concurrent,
+        "engine_versions": engine_versions,
         "started": [],
         "manual": [],
         "failed": [],
+        "queued": [],
     }
     manifest_file = run_dir / "manifest.json"
-
-    def _touch_manifest() -> None:
-        manifest["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
-        _write_manifest(manifest_file, manifest)
+    # Every change is appended to events.jsonl; manifest.json is a throttled atomic snapshot.
+    journal = RunJournal(run_dir, manifest, snapshot_interval=float(defaults.get("manifest_snapshot_sec", 1.0)))
+    journal.emit("run", None, {"orch_id": orch_id, "timestamp": stamp, "dry_run": bool(args.dry_run)})
 
     # Write initial manifest first so dashboard can discover the run immediately.
-    _touch_manifest()
-
-    for run in started:
-        entry = {
-            "task_id": run.task_id,
-            "owner": run.owner,
-            "role": run.role,
-            "engine": run.engine,
-            "command": run.command,
-            "log_file": str(run.log_file),
-            "workspace": run.workspace,
-            "prompt_file": run.prompt_file,
-            "repo": run.repo,
-            "pid": None,
-        }
-        if args.dry_run:
-            print(f"[DRY] {run.task_id} ({run.engine}) -> {' '.join(run.command[:8])} ...")
-            manifest["started"].append(entry)
-            _touch_manifest()
-            continue
-
-        try:
-            log_handle = run.log_file.open("w", encoding="utf-8", errors="replace")
-            # Strip CLAUDECODE env var so nested claude sessions can launch
-            child_env = {k: v for k, v in os.environ.items() if k != "CLAUDECODE"}
-            # With -o text, gemini no longer needs a real console (node-pty bypassed)
-            flags = _no_window_flags()
-            proc = subprocess.Popen(
-                run.command,
-                cwd=run.workspace,
-                stdout=log_handle,
-                stderr=subprocess.STDOUT,
-                stdin=subprocess.PIPE if run.stdin_text else None,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                creationflags=flags,
-                env=child_env,
-            )
-            if run.stdin_text and proc.stdin:
-                proc.stdin.write(run.stdin_text)
-                proc.stdin.close()
-            run.process = proc
-            entry["pid"] = proc.pid
-            manifest["started"].append(entry)
-            _touch_manifest()
-            print(f"[START] {run.task_id} ({run.engine}) pid={proc.pid} log={run.log_file}")
-        except Exception as exc:
-            entry["error"] = str(exc)
-            manifest["failed"].append(entry)
-            _touch_manifest()
-            print(f"[FAIL] {run.task_id}: {exc}")
+    journal.snapshot(force=True)
+
+    sched = _Scheduler(
+        args,
+        journal,
+        planned,
+        workspace=workspace,
+        defaults=defaults,
+        engines_cfg=engines_cfg,
+        hosts=hosts,
+        local_slots=local_slots,
+        hedge_groups=hedge_groups,
+        shard_groups=shard_groups,
+        runs_root=runs_root,
+        run_dir=run_dir,
+        orch_id=orch_id,
+        stamp=stamp,
+        outcomes=outcomes,
+        memo=memo,
+        max_concurrent=max_concurrent,
+        stream_output=stream_output,
+        results_file=results_file,
+        engine_versions=engine_versions,
+        engine_command=_engine_command,
+    )
+    wake = None
+    if args.dry_run:
+        sched.plan()
+        if args.simulate:
+            sched.simulate()
+    else:
+        wake = sched.start()
 
     for worker in manual_workers:
-        manifest["manual"].append(worker)
-        _touch_manifest()
+        journal.emit("manual", str(worker.get("task_id", "UNKNOWN")), worker)
         print(
             f"[MANUAL] {worker.get('task_id', 'UNKNOWN')} "
             f"owner={worker.get('owner', 'UNKNOWN')} engine={worker.get('engine', 'manual')} "
             f"reason={worker.get('_manual_reason', '-')}"
         )
 
-    _touch_manifest()
+    journal.snapshot(force=True)
     print(f"[INFO] manifest: {manifest_file}")
+    if report is not None:
+        report["run_dir"] = str(run_dir)
+        report["runs"] = planned
+        if report.get("ready") is not None:
+            report["ready"].set()
 
     if args.dry_run:
+        journal.close()
         return 0
 
-    if args.wait:
-        pending = [r for r in started if r.process is not None]
-        while pending:
-            time.sleep(1.0)
-            next_pending: list[WorkerRun] = []
-            for run in pending:
-                assert run.process is not None
-                code = run.process.poll()
-                if code is None:
-                    next_pending.append(run)
-                    continue
-                print(f"[DONE] {run.task_id} exit={code} log={run.log_file}")
-                _touch_manifest()
-            pending = next_pending
-        print("[INFO] all workers finished")
-        return 0
+    if sched.supervised:
+        return sched.supervise(wake)
 
+    journal.close()
+    if results_file is not None and journal.manifest.get("started"):
+        _spawn_results_merger(run_dir, results_file)
     print("[INFO] dispatcher exited without wait; workers continue in background")
     latest = _latest_run_dir(runs_root)
     if latest is not None:
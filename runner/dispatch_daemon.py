@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""Optional resident dispatcher: one long-lived process that owns every worker.
+
+    python runner/dispatch_daemon.py serve [--port 0]
+    python runner/dispatch_daemon.py submit --tasks-file ... [-- --model ... --max-concurrent 4]
+    python runner/dispatch_daemon.py status [--job ID]
+    python runner/dispatch_daemon.py stop --job ID
+    python runner/dispatch_daemon.py shutdown
+
+The daemon listens on 127.0.0.1 and runs each submitted job as `dispatch.main(...)` on
+its own thread, always supervised (--wait), so imports, the executable/version cache and
+the run journal stay warm and every worker has one owner that outlives the clients.
+Its address and a per-start token are kept in runs/.dispatchd.json (owner-only); the
+protocol is one JSON request line and one JSON reply line per connection.
+Callers use `try_submit` and fall back to spawning dispatch.py when no daemon answers.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable
+
+import proc_tree
+
+STATE_FILE = Path(__file__).resolve().parents[1] / "runs" / ".dispatchd.json"
+_CONNECT_TIMEOUT = 0.5
+_OUTPUT_LINES = 400
+_KEEP_FINISHED = 50
+
+
+class _ThreadOutput(io.TextIOBase):
+    """sys.stdout replacement that routes each job thread's prints to that job's buffer."""
+
+    def __init__(self, fallback: Any) -> None:
+        self._fallback = fallback
+        self._local = threading.local()
+
+    def bind(self, sink: Callable[[str], None] | None) -> None:
+        self._local.sink = sink
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        sink = getattr(self._local, "sink", None)
+        if sink is None:
+            return self._fallback.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self) -> None:
+        self._fallback.flush()
+
+
+class _Job:
+    def __init__(self, job_id: str, tasks_file: Path, orch_id: str, argv: list[str]) -> None:
+        self.job_id = job_id
+        self.tasks_file = tasks_file
+        self.orch_id = orch_id
+        self.argv = argv
+        self.state = "STARTING"
+        self.exit_code: int | None = None
+        self.submitted_at = time.time()
+        self.output: deque[str] = deque(maxlen=_OUTPUT_LINES)
+        self._partial = ""
+        self.report: dict[str, Any] = {"ready": threading.Event()}
+
+    def sink(self, text: str) -> None:
+        self._partial += text
+        *lines, self._partial = self._partial.split("\n")
+        self.output.extend(lines)
+
+    def workers(self) -> list[dict[str, Any]]:
+        out = []
+        for run in self.report.get("runs") or []:
+            proc = run.process
+            out.append(
+                {
+                    "task_id": run.task_id,
+                    "engine": run.engine,
+                    "pid": proc.pid if proc is not None else None,
+                    "running": proc is not None and proc.poll() is None,
+                    "attempt": run.attempt,
+                }
+            )
+        return out
+
+    def to_dict(self, output_tail: int = 20) -> dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "orch_id": self.orch_id,
+            "tasks_file": str(self.tasks_file),
+            "state": self.state,
+            "exit_code": self.exit_code,
+            "submitted_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.submitted_at)),
+            "run_dir": self.report.get("run_dir", ""),
+            "workers": self.workers(),
+            "output": list(self.output)[-output_tail:] if output_tail else [],
+        }
+
+
+class DispatchDaemon:
+    def __init__(self, token: str) -> None:
+        self.token = token
+        self._lock = threading.Lock()
+        self._jobs: dict[str, _Job] = {}
+        self._seq = 0
+        self._output = _ThreadOutput(sys.stdout)
+        self.server: socketserver.ThreadingTCPServer | None = None
+
+    def install_output(self) -> None:
+        sys.stdout = self._output  # type: ignore[assignment]
+
+    def _active(self, orch_id: str) -> _Job | None:
+        for job in self._jobs.values():
+            if job.orch_id == orch_id and job.state in {"STARTING", "RUNNING"}:
+                return job
+        return None
+
+    def submit(self, req: dict[str, Any]) -> dict[str, Any]:
+        import dispatch
+
+        tasks_file = Path(str(req.get("tasks_file", ""))).resolve()
+        if not tasks_file.exists():
+            return {"ok": False, "error": f"tasks file not found: {tasks_file}"}
+        try:
+            config = json.loads(tasks_file.read_text(encoding="utf-8-sig"))
+        except Exception as exc:
+            return {"ok": False, "error": f"tasks file unreadable: {exc}"}
+        orch_id = str(config.get("orch_id", "AGENT")).strip().upper() or "AGENT"
+        extra = [str(a) for a in (req.get("args") or [])]
+        argv = ["--tasks-file", str(tasks_file), *extra]
+        if "--wait" not in argv:
+            # The daemon owns the workers: it always supervises them to completion.
+            argv.append("--wait")
+        with self._lock:
+            busy = self._active(orch_id)
+            if busy is not None:
+                return {"ok": False, "error": f"{orch_id} already has an active job", "job": busy.to_dict()}
+            finished = [j for j in self._jobs.values() if j.state in {"DONE", "FAILED"}]
+            for old in finished[: max(0, len(finished) - _KEEP_FINISHED)]:
+                self._jobs.pop(old.job_id, None)
+            self._seq += 1
+            job = _Job(f"{orch_id}-{time.strftime('%H%M%S')}-{self._seq}", tasks_file, orch_id, argv)
+            self._jobs[job.job_id] = job
+
+        def _run() -> None:
+            self._output.bind(job.sink)
+            job.state = "RUNNING"
+            try:
+                job.exit_code = dispatch.main(argv, report=job.report)
+                job.state = "DONE" if job.exit_code == 0 else "FAILED"
+            except BaseException as exc:  # a job must never take the daemon down
+                job.output.append(f"[ERROR] {type(exc).__name__}: {exc}")
+                job.state = "FAILED"
+            finally:
+                job.report["ready"].set()
+                self._output.bind(None)
+
+        threading.Thread(target=_run, name=f"orch-job-{job.job_id}", daemon=True).start()
+        wait = max(0.0, min(60.0, float(req.get("wait_started", 10.0) or 0.0)))
+        if wait:
+            job.report["ready"].wait(wait)
+        return {"ok": job.state != "FAILED", "job": job.to_dict()}
+
+    def status(self, req: dict[str, Any]) -> dict[str, Any]:
+        job_id = str(req.get("job") or "")
+        tail = int(req.get("output_tail", 20) or 0)
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if job_id:
+            job = next((j for j in jobs if j.job_id == job_id), None)
+            if job is None:
+                return {"ok": False, "error": f"unknown job {job_id}"}
+            return {"ok": True, "job": job.to_dict(tail)}
+        return {"ok": True, "pid": os.getpid(), "jobs": [j.to_dict(0) for j in jobs]}
+
+    def stop(self, req: dict[str, Any]) -> dict[str, Any]:
+        """Stop a job's running workers, every process tree in parallel (grace, then force);
+        the job thread records the exits as STOPPED.  Replies with per-lane stop latency."""
+        job_id = str(req.get("job") or "")
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return {"ok": False, "error": f"unknown job {job_id}"}
+        only = set(req.get("tasks") or [])
+        live = [
+            r
+            for r in job.report.get("runs") or []
+            if r.process is not None and r.process.poll() is None and (not only or r.task_id in only)
+        ]
+        grace = {r.task_id: float(req["grace"]) if req.get("grace") is not None else r.kill_grace for r in live}
+        started = time.time()
+        remote = [r for r in live if getattr(r.process, "remote", False)]
+        for run in live:
+            run.stop_requested = started
+        for run in remote:
+            run.process.terminate_tree(grace[run.task_id])
+        rows = proc_tree.stop_trees(
+            [
+                {"task_id": r.task_id, "pid": r.process.pid, "pgid": r.entry.get("pgid"), "grace": grace[r.task_id]}
+                for r in live
+                if r not in remote
+            ]
+        )
+        for run in remote:
+            try:
+                run.process.wait(timeout=grace[run.task_id] + 5.0)
+                result = "terminated"
+            except Exception:
+                result = "pending"
+            rows.append({"task_id": run.task_id, "host": run.host, "result": result, "stop_sec": round(time.time() - started, 3)})
+        return {"ok": True, "stopped": rows, "elapsed_sec": round(time.time() - started, 3)}
+
+    def handle(self, req: dict[str, Any]) -> dict[str, Any]:
+        if not secrets.compare_digest(str(req.get("token", "")), self.token):
+            return {"ok": False, "error": "bad token"}
+        op = str(req.get("op", ""))
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "submit":
+            return self.submit(req)
+        if op == "status":
+            return self.status(req)
+        if op == "stop":
+            return self.stop(req)
+        if op == "shutdown":
+            with self._lock:
+                active = [j.job_id for j in self._jobs.values() if j.state in {"STARTING", "RUNNING"}]
+            if active and not req.get("force"):
+                return {"ok": False, "error": "jobs still running", "jobs": active}
+            if self.server is not None:
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        daemon: DispatchDaemon = self.server.daemon_ref  # type: ignore[attr-defined]
+        try:
+            req = json.loads(self.rfile.readline(1_000_000).decode("utf-8"))
+            reply = daemon.handle(req) if isinstance(req, dict) else {"ok": False, "error": "bad request"}
+        except Exception as exc:
+            reply = {"ok": False, "error": str(exc)}
+        self.wfile.write((json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+def _write_state(port: int, token: str) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_name(f"{STATE_FILE.name}.{os.getpid()}.tmp")
+    fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump({"host": "127.0.0.1", "port": port, "token": token, "pid": os.getpid()}, f)
+    os.replace(tmp, STATE_FILE)
+
+
+def serve(port: int = 0) -> int:
+    token = secrets.token_hex(16)
+    daemon = DispatchDaemon(token)
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port), _Handler)
+    server.daemon_threads = True
+    server.daemon_ref = daemon  # type: ignore[attr-defined]
+    daemon.server = server
+    _write_state(server.server_address[1], token)
+    # Warm the imports a job needs before the first submission arrives.
+    import dispatch  # noqa: F401
+
+    print(f"[DAEMON] listening on 127.0.0.1:{server.server_address[1]} pid={os.getpid()} state={STATE_FILE}")
+    sys.stdout.flush()
+    daemon.install_output()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+            if state.get("pid") == os.getpid():
+                STATE_FILE.unlink()
+        except Exception:
+            pass
+    return 0
+
+
+def request(op: str, timeout: float = 70.0, **fields: Any) -> dict[str, Any] | None:
+    """One round trip to the running daemon; None when there is no daemon to talk to."""
+    try:
+        state = json.loads(STATE_FILE.read_text(encoding="utf-8"))
+        sock = socket.create_connection((state["host"], int(state["port"])), timeout=_CONNECT_TIMEOUT)
+    except Exception:
+        return None
+    try:
+        sock.settimeout(timeout)
+        payload = {"op": op, "token": state.get("token", ""), **fields}
+        sock.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as f:
+            line = f.readline()
+        return json.loads(line.decode("utf-8")) if line else None
+    except Exception:
+        return None
+    finally:
+        sock.close()
+
+
+def try_submit(tasks_file: Path, args: list[str] | None = None, wait_started: float = 10.0) -> dict[str, Any] | None:
+    return request("submit", tasks_file=str(tasks_file), args=list(args or []), wait_started=wait_started)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Resident ORCH dispatcher")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--port", type=int, default=0)
+    p_submit = sub.add_parser("submit")
+    p_submit.add_argument("--tasks-file", required=True)
+    p_submit.add_argument("dispatch_args", nargs=argparse.REMAINDER, help="extra dispatch.py args after --")
+    p_status = sub.add_parser("status")
+    p_status.add_argument("--job", default="")
+    p_stop = sub.add_parser("stop")
+    p_stop.add_argument("--job", required=True)
+    p_stop.add_argument("--grace", type=float, default=None, help="seconds before force-kill (default: each lane's kill_grace)")
+    p_shutdown = sub.add_parser("shutdown")
+    p_shutdown.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    if args.cmd == "serve":
+        return serve(args.port)
+    if args.cmd == "submit":
+        extra = [a for a in args.dispatch_args if a != "--"]
+        reply = try_submit(Path(args.tasks_file).resolve(), extra)
+    elif args.cmd == "status":
+        reply = request("status", job=args.job, output_tail=40)
+    elif args.cmd == "stop":
+        reply = request("stop", job=args.job, grace=args.grace)
+    else:
+        reply = request("shutdown", force=args.force)
+    if reply is None:
+        print("[ERROR] dispatcher daemon is not running")
+        return 2
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Persistent executable-resolution cache shared by the dispatcher and the dashboard.
+
+`which(*candidates)` returns the first candidate found on PATH, like a loop over
+shutil.which, but remembers every lookup per (name, PATH, PATHEXT).  A hit is
+re-validated with a single stat of the resolved binary (a changed mtime or a missing
+file forces a fresh lookup); a miss is trusted for NEGATIVE_TTL seconds so a freshly
+installed CLI is picked up quickly.  `version(exe)` runs `<exe> --version` once per
+binary mtime.  Both tables are persisted to runner/.exe_cache.json between runs.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+CACHE_FILE = Path(__file__).resolve().parent / ".exe_cache.json"
+NEGATIVE_TTL = 60.0
+VERSION_TIMEOUT = 15.0
+_MAX_PATH_SETS = 8
+_MAX_VERSIONS = 64
+
+# Names probed for each engine CLI after the configured command, in order.
+ENGINE_CANDIDATES: dict[str, tuple[str, ...]] = {
+    "codex": ("codex", "codex.cmd", "codex.exe", "codex.ps1"),
+    "claude": (
+        "claude-code",
+        "claude-code.cmd",
+        "claude-code.ps1",
+        "claude-code.exe",
+        "claude",
+        "claude.cmd",
+        "claude.ps1",
+        "claude.exe",
+    ),
+    "gemini": ("gemini", "gemini.cmd", "gemini.exe", "gemini.ps1"),
+}
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _path_key() -> str:
+    raw = os.environ.get("PATH", "") + "\0" + os.environ.get("PATHEXT", "")
+    return hashlib.sha1(raw.encode("utf-8", errors="replace")).hexdigest()[:16]
+
+
+def _version_command(exe: str) -> list[str]:
+    if exe.lower().endswith(".ps1"):
+        return ["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", exe, "--version"]
+    return [exe, "--version"]
+
+
+class ExecutableCache:
+    def __init__(self, path: Path | None = CACHE_FILE) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._paths: dict[str, dict[str, Any]] = {}
+        self._versions: dict[str, dict[str, Any]] = {}
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path is None:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if isinstance(data, dict):
+            if isinstance(data.get("paths"), dict):
+                self._paths = data["paths"]
+            if isinstance(data.get("versions"), dict):
+                self._versions = data["versions"]
+
+    def _lookup(self, name: str) -> str:
+        if os.path.isabs(name) or os.sep in name or (os.altsep and os.altsep in name):
+            # Relative paths depend on the cwd, absolute ones need no PATH walk.
+            return shutil.which(name) or ""
+        now = time.time()
+        key = _path_key()
+        with self._lock:
+            self._load()
+            table = self._paths.setdefault(key, {"names": {}})
+            table["used"] = now
+            hit = table["names"].get(name)
+        if isinstance(hit, dict):
+            exe = str(hit.get("exe", ""))
+            if exe and _mtime(exe) == hit.get("mtime"):
+                return exe
+            if not exe and now - float(hit.get("checked", 0) or 0) < NEGATIVE_TTL:
+                return ""
+        exe = shutil.which(name) or ""
+        with self._lock:
+            table["names"][name] = {"exe": exe, "mtime": _mtime(exe) if exe else None, "checked": now}
+            if len(self._paths) > _MAX_PATH_SETS:
+                oldest = min(self._paths, key=lambda k: float(self._paths[k].get("used", 0) or 0))
+                self._paths.pop(oldest, None)
+            self._dirty = True
+        return exe
+
+    def which(self, *candidates: str) -> str:
+        """First candidate that resolves on PATH, or ""; duplicate names are probed once."""
+        seen: set[str] = set()
+        for name in candidates:
+            name = str(name or "").strip()
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            found = self._lookup(name)
+            if found:
+                return found
+        return ""
+
+    def version(self, exe: str) -> str:
+        """First line of `<exe> --version`, cached until the binary changes; "" if unknown."""
+        if not exe:
+            return ""
+        mtime = _mtime(exe)
+        if mtime is None:
+            return ""
+        with self._lock:
+            self._load()
+            hit = self._versions.get(exe)
+            if isinstance(hit, dict) and hit.get("mtime") == mtime:
+                return str(hit.get("version", ""))
+        try:
+            proc = subprocess.run(
+                _version_command(exe),
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                timeout=VERSION_TIMEOUT,
+                stdin=subprocess.DEVNULL,
+            )
+            text = (proc.stdout or "").strip() or (proc.stderr or "").strip()
+            found = text.splitlines()[0].strip()[:200] if text else ""
+        except Exception:
+            found = ""
+        with self._lock:
+            self._versions[exe] = {"mtime": mtime, "version": found, "checked": time.time()}
+            if len(self._versions) > _MAX_VERSIONS:
+                oldest = min(self._versions, key=lambda k: float(self._versions[k].get("checked", 0) or 0))
+                self._versions.pop(oldest, None)
+            self._dirty = True
+        return found
+
+    def save(self) -> None:
+        """Persist if anything changed; concurrent writers simply last-write-win."""
+        with self._lock:
+            if not self._dirty or self.path is None:
+                return
+            body = json.dumps({"paths": self._paths, "versions": self._versions}, ensure_ascii=False)
+            self._dirty = False
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(body, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception:
+            try:
+                tmp.unlink(missing_ok=True)
+            except Exception:
+                pass
+
+
+_DEFAULT = ExecutableCache()
+
+
+def which(*candidates: str) -> str:
+    return _DEFAULT.which(*candidates)
+
+
+def version(exe: str) -> str:
+    return _DEFAULT.version(exe)
+
+
+def save() -> None:
+    _DEFAULT.save()
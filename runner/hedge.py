@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Hedged tasks (`hedge`): race one task on several engines and keep the first success.
+
+A worker with `"hedge": ["codex", "gemini"]` (or `"hedge": 2`: its own engine plus the
+next enabled ones, in codex, claude, gemini order) is expanded into one leg per engine,
+`<task>~<engine>`.  Each leg runs in its own git worktree, so the workspace must be a git
+repository.  The first leg that exits 0 and reports success explicitly wins: a stream
+result that is not an error, or a `STATUS: DONE` line in its output (each leg's goal asks
+for one).  The dispatcher cancels the other legs, merges the winner's branch into the
+main checkout and then starts dependents of `<task>`.  If every leg fails, or the
+winner's changes cannot be merged, the task fails.
+
+Races are summed per role in runs/.hedges.json, so the winning engine per task type is
+visible across runs (`python runner/hedge.py`).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+LEG_SEP = "~"
+HEDGE_ENGINES = ("codex", "claude", "gemini")
+STATS_FILE = ".hedges.json"
+DONE_LINE = "STATUS: DONE"
+_DONE_LINE_RE = re.compile(r"^\s*STATUS:\s*DONE\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def _family(engine: str) -> str:
+    e = (engine or "").strip().lower()
+    return "claude" if e in {"claude", "claude-cli"} else e
+
+
+def hedge_engines(worker: dict[str, Any], engines_cfg: dict[str, Any]) -> list[str]:
+    """Engines to race this worker on; [] when it is not hedged.  Raises ValueError."""
+    raw = worker.get("hedge")
+    if raw is True:
+        raw = 2
+    if not raw:
+        return []
+    own = _family(str(worker.get("engine", "codex")))
+    if isinstance(raw, (int, float)) or isinstance(raw, str) and raw.strip().isdigit():
+        enabled = [
+            e
+            for e in HEDGE_ENGINES
+            if not isinstance(engines_cfg.get(e), dict) or engines_cfg[e].get("enabled", True)
+        ]
+        out = ([own] + [e for e in enabled if e != own])[: int(raw)]
+    elif isinstance(raw, list):
+        out = []
+        for item in raw:
+            engine = _family(str(item))
+            if engine not in HEDGE_ENGINES:
+                raise ValueError(f"hedge engine must be one of {', '.join(HEDGE_ENGINES)}, not {item!r}")
+            if engine not in out:
+                out.append(engine)
+    else:
+        raise ValueError(f"hedge must be a count or a list of engines, not {raw!r}")
+    return out if len(out) > 1 else []
+
+
+def succeeded(stream_result: dict[str, Any] | None, log_text: str) -> bool:
+    """Whether a leg that exited 0 said it finished: a non-error stream result, or a
+    `STATUS: DONE` line of its own (the goal only mentions it mid-sentence)."""
+    if stream_result:
+        return not stream_result.get("is_error")
+    return bool(_DONE_LINE_RE.search(log_text or ""))
+
+
+def expand(workers: list[Any], engines_cfg: dict[str, Any]) -> tuple[list[Any], dict[str, dict[str, Any]], list[str]]:
+    """(workers, groups, notes): hedged workers replaced by their legs, and one group per
+    hedged task {"legs": [leg ids], "engines": [...], "role"}."""
+    out: list[Any] = []
+    groups: dict[str, dict[str, Any]] = {}
+    notes: list[str] = []
+    for worker in workers:
+        if not isinstance(worker, dict) or not worker.get("hedge") or not bool(worker.get("enabled", True)):
+            out.append(worker)
+            continue
+        task_id = str(worker.get("task_id", "UNKNOWN"))
+        try:
+            engines = hedge_engines(worker, engines_cfg)
+        except ValueError as exc:
+            notes.append(f"[WARN] {task_id}: {exc}; running unhedged")
+            engines = []
+        if not engines:
+            out.append(worker)
+            continue
+        legs = []
+        for engine in engines:
+            leg = {
+                **worker,
+                "task_id": f"{task_id}{LEG_SEP}{engine}",
+                "engine": engine,
+                "goal": (
+                    f"{worker.get('goal', '')}\n(When the task is complete, end your reply with the line {DONE_LINE}.)"
+                ).strip(),
+                "hedge_of": task_id,
+                # Legs must not see each other's edits, and a replayed memo would not race.
+                "isolation": "worktree",
+                "memo": False,
+            }
+            leg.pop("hedge", None)
+            legs.append(leg["task_id"])
+            out.append(leg)
+        groups[task_id] = {"legs": legs, "engines": engines, "role": str(worker.get("role", ""))}
+    return out, groups, notes
+
+
+def stats_path(runs_root: Path) -> Path:
+    return Path(runs_root) / STATS_FILE
+
+
+class HedgeStats:
+    """Race counts per role and engine: {"roles": {role: {"races", "no_winner",
+    "engines": {engine: {"entered", "wins", "win_sec_total"}}}}}."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._roles: dict[str, dict[str, Any]] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(data, dict) and isinstance(data.get("roles"), dict):
+                self._roles = data["roles"]
+        except Exception:
+            pass
+
+    def record(self, role: str, engines: list[str], winner: str, win_sec: float | None) -> None:
+        with self._lock:
+            row = self._roles.setdefault(role or "-", {"races": 0, "no_winner": 0, "engines": {}})
+            row["races"] += 1
+            if not winner:
+                row["no_winner"] += 1
+            for engine in engines:
+                cell = row["engines"].setdefault(engine, {"entered": 0, "wins": 0, "win_sec_total": 0.0})
+                cell["entered"] += 1
+                if engine == winner:
+                    cell["wins"] += 1
+                    cell["win_sec_total"] = round(cell["win_sec_total"] + float(win_sec or 0.0), 3)
+            body = json.dumps({"roles": self._roles}, ensure_ascii=False, indent=1)
+        # Daemon jobs run on threads of one process, each with its own HedgeStats.
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_text(body, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception as exc:
+            print(f"[WARN] hedge stats not saved: {exc}")
+            try:
+                tmp.unlink(missing_ok=True)
+            except Exception:
+                pass
+
+    def summary_lines(self) -> list[str]:
+        with self._lock:
+            roles = json.loads(json.dumps(self._roles))
+        out: list[str] = []
+        for role, row in sorted(roles.items()):
+            cells = []
+            for engine, cell in sorted(row["engines"].items(), key=lambda kv: -kv[1]["wins"]):
+                avg = f", avg {cell['win_sec_total'] / cell['wins']:.0f}s" if cell["wins"] else ""
+                cells.append(f"{engine} {cell['wins']}/{cell['entered']}{avg}")
+            out.append(f"{role}: {row['races']} races, no winner {row['no_winner']}; " + "; ".join(cells))
+        return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Hedged-task wins per role and engine")
+    parser.add_argument("--runs-root", default=str(Path(__file__).resolve().parents[1] / "runs"))
+    args = parser.parse_args()
+    lines = HedgeStats(stats_path(Path(args.runs_root))).summary_lines()
+    print("\n".join(lines) if lines else "[HEDGE] no hedged races recorded yet")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""Adaptive admission (`defaults.adaptive_admission`): hold queued lanes while this machine
+is saturated.
+
+The dispatcher samples the host before it starts a local lane:
+
+  cpu   busy share of all cores since the previous sample (/proc/stat, else psutil,
+        else the 1-minute load average per core)
+  mem   available memory (/proc/meminfo MemAvailable, else psutil)
+  io    share of time some task waited on I/O over the last 10s (/proc/pressure/io),
+        else the iowait share of CPU time
+
+A lane is held while cpu >= cpu_max, available memory < mem_min_mb or mem_min_pct, or
+io >= io_max, as long as at least `min_running` local lanes are running, so a run never
+stalls on a busy machine.  Held lanes are released once every signal is back under its
+limit less `hysteresis`.  Above `min_running`, local lanes start one per `sample_sec`, so
+each start shows up in the next sample before another one is let in.  Lanes on remote hosts are never held.  Metrics a platform
+cannot provide are skipped; with none available, admission is not limited.
+
+`true` turns it on with the defaults below; a dict overrides them; false (the default)
+leaves admission to max_concurrent and the engine budgets.
+"""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Any
+
+try:
+    import psutil  # type: ignore
+except ImportError:  # optional
+    psutil = None  # type: ignore[assignment]
+
+DEFAULTS: dict[str, Any] = {
+    "cpu_max": 0.9,
+    "mem_min_mb": 1024,
+    "mem_min_pct": 10.0,
+    "io_max": 0.4,
+    "hysteresis": 0.1,
+    "min_running": 1,
+    "sample_sec": 2.0,
+}
+MAX_DECISIONS = 50
+
+
+def admission_policy(defaults: dict[str, Any]) -> dict[str, Any]:
+    raw = defaults.get("adaptive_admission", False)
+    policy = {**DEFAULTS, "enabled": bool(raw)}
+    if isinstance(raw, dict):
+        policy["enabled"] = bool(raw.get("enabled", True))
+        for key, default in DEFAULTS.items():
+            try:
+                policy[key] = max(0.0, float(raw.get(key, default)))
+            except (TypeError, ValueError):
+                pass
+    policy["min_running"] = int(policy["min_running"])
+    policy["sample_sec"] = max(0.5, float(policy["sample_sec"]))
+    return policy
+
+
+def _proc_cpu_times() -> tuple[float, float, float] | None:
+    """(total, idle, iowait) jiffies from the aggregate /proc/stat line."""
+    try:
+        with open("/proc/stat", "rb") as f:
+            fields = f.readline().split()
+    except OSError:
+        return None
+    if not fields or fields[0] != b"cpu":
+        return None
+    values = [float(v) for v in fields[1:9]]
+    iowait = values[4] if len(values) > 4 else 0.0
+    return sum(values), values[3] + iowait, iowait
+
+
+def _proc_mem() -> tuple[float, float] | None:
+    """(available MB, total MB) from /proc/meminfo."""
+    info: dict[str, float] = {}
+    try:
+        for line in Path("/proc/meminfo").read_text(encoding="ascii", errors="replace").splitlines():
+            key, _, rest = line.partition(":")
+            if key in ("MemTotal", "MemAvailable"):
+                info[key] = float(rest.split()[0]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        return None
+    if "MemTotal" not in info or "MemAvailable" not in info:
+        return None
+    return info["MemAvailable"], info["MemTotal"]
+
+
+def _io_pressure() -> float | None:
+    """`some avg10` of /proc/pressure/io as a 0..1 share, or None without PSI."""
+    try:
+        line = Path("/proc/pressure/io").read_text(encoding="ascii").splitlines()[0]
+        avg10 = next(part for part in line.split() if part.startswith("avg10="))
+        return float(avg10.split("=", 1)[1]) / 100.0
+    except (OSError, IndexError, StopIteration, ValueError):
+        return None
+
+
+class HostMonitor:
+    """Cached host samples and the hold/release decision for local lanes."""
+
+    def __init__(self, policy: dict[str, Any]) -> None:
+        self.policy = policy
+        self.held = False
+        self.reason = ""
+        self.last: dict[str, Any] = {}
+        self._at = 0.0
+        self._started = -float("inf")
+        self._cpu_prev = _proc_cpu_times()
+        if psutil is not None:
+            try:
+                psutil.cpu_percent(interval=None)  # primes the next non-blocking call
+            except Exception:
+                pass
+
+    def sample(self, now: float | None = None) -> dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        if self.last and now - self._at < self.policy["sample_sec"]:
+            return self.last
+        out: dict[str, Any] = {}
+        cpu_now = _proc_cpu_times()
+        if cpu_now is not None and self._cpu_prev is not None and cpu_now[0] > self._cpu_prev[0]:
+            total = cpu_now[0] - self._cpu_prev[0]
+            out["cpu"] = round(1.0 - (cpu_now[1] - self._cpu_prev[1]) / total, 3)
+            out["iowait"] = round((cpu_now[2] - self._cpu_prev[2]) / total, 3)
+        elif psutil is not None:
+            try:
+                out["cpu"] = round(psutil.cpu_percent(interval=None) / 100.0, 3)
+            except Exception:
+                pass
+        elif hasattr(os, "getloadavg"):
+            out["cpu"] = round(os.getloadavg()[0] / max(1, os.cpu_count() or 1), 3)
+        self._cpu_prev = cpu_now
+        mem = _proc_mem()
+        if mem is None and psutil is not None:
+            try:
+                vm = psutil.virtual_memory()
+                mem = (vm.available / 1048576.0, vm.total / 1048576.0)
+            except Exception:
+                mem = None
+        if mem is not None:
+            out["mem_avail_mb"] = round(mem[0])
+            out["mem_avail_pct"] = round(100.0 * mem[0] / max(1.0, mem[1]), 1)
+        io = _io_pressure()
+        if io is None:
+            io = out.get("iowait")
+        if io is not None:
+            out["io"] = round(io, 3)
+        self.last = out
+        self._at = now
+        return out
+
+    def _over(self, sample: dict[str, Any], slack: float) -> str:
+        """Why the host counts as saturated, with limits eased by `slack` (0 when
+        checking for saturation, the hysteresis when checking for recovery)."""
+        p = self.policy
+        if p["cpu_max"] and sample.get("cpu") is not None and sample["cpu"] >= p["cpu_max"] - slack:
+            return f"cpu {sample['cpu']:.0%} >= {p['cpu_max'] - slack:.0%}"
+        if sample.get("mem_avail_mb") is not None:
+            scale = 1.0 + slack
+            if p["mem_min_mb"] and sample["mem_avail_mb"] < p["mem_min_mb"] * scale:
+                return f"available memory {sample['mem_avail_mb']}MB < {p['mem_min_mb'] * scale:.0f}MB"
+            if p["mem_min_pct"] and sample["mem_avail_pct"] < p["mem_min_pct"] * scale:
+                return f"available memory {sample['mem_avail_pct']}% < {p['mem_min_pct'] * scale:.0f}%"
+        if p["io_max"] and sample.get("io") is not None and sample["io"] >= p["io_max"] - slack:
+            return f"io pressure {sample['io']:.0%} >= {p['io_max'] - slack:.0%}"
+        return ""
+
+    def note_start(self, now: float | None = None) -> None:
+        self._started = time.monotonic() if now is None else now
+
+    def check(self, local_running: int, now: float | None = None) -> tuple[str, str]:
+        """(reason to hold the next local lane or "", "hold" | "release" | "" on a change)."""
+        now = time.monotonic() if now is None else now
+        if local_running < self.policy["min_running"]:
+            reason = ""
+        elif not self.held and now - self._started < self.policy["sample_sec"]:
+            # Not a hold: the last start is not in a sample yet.
+            return "ramping up; waiting for the next host sample", ""
+        else:
+            sample = self.sample(now)
+            reason = self._over(sample, self.policy["hysteresis"] if self.held else 0.0)
+        change = ""
+        if bool(reason) != self.held:
+            change = "hold" if reason else "release"
+            self.held = bool(reason)
+        self.reason = reason
+        return reason, change
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Wall-clock and token budgets (`max_wall_seconds`, `max_tokens`), enforced while lanes run.
+
+Lane budgets are read from the worker, then engines.<name>, then defaults.  The run
+budget is `defaults.run_budget` ({"max_wall_seconds": N, "max_tokens": N}) and covers
+every lane of the dispatch together.  Tokens are the usage the worker has streamed so
+far (claude stream-json turns, gemini JSON stats, codex "tokens used" lines); a CLI
+that only reports usage at exit can only be caught by the wall-clock budget.  0 or a
+missing key means no limit.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+CHECK_INTERVAL = 1.0
+
+
+def _number(raw: Any) -> float:
+    try:
+        value = max(0.0, float(raw or 0))
+    except (TypeError, ValueError):
+        return 0.0
+    return int(value) if value.is_integer() else value
+
+
+def lane_budget(defaults: dict[str, Any], engine_cfg: dict[str, Any], worker: dict[str, Any]) -> dict[str, float]:
+    out: dict[str, float] = {}
+    for key in ("max_wall_seconds", "max_tokens"):
+        value = _number(worker.get(key, engine_cfg.get(key, defaults.get(key, 0))))
+        if value:
+            out[key] = value
+    return out
+
+
+def run_budget(defaults: dict[str, Any]) -> dict[str, float]:
+    raw = defaults.get("run_budget")
+    if not isinstance(raw, dict):
+        return {}
+    return {key: _number(raw.get(key)) for key in ("max_wall_seconds", "max_tokens") if _number(raw.get(key))}
+
+
+def exceeded(budget: dict[str, float], elapsed: float, tokens: int | None) -> dict[str, Any] | None:
+    """{"limit", "value", "used"} for the first budget that is used up, else None."""
+    wall = budget.get("max_wall_seconds")
+    if wall and elapsed >= wall:
+        return {"limit": "max_wall_seconds", "value": wall, "used": round(elapsed, 1)}
+    cap = budget.get("max_tokens")
+    if cap and tokens is not None and tokens >= cap:
+        return {"limit": "max_tokens", "value": int(cap), "used": int(tokens)}
+    return None
+
+
+def describe(hit: dict[str, Any]) -> str:
+    return f"{hit['limit']} {hit['value']:g} reached ({hit['used']:g})"
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Per-lane result files, merged into results.md when a run ends.
+
+Every lane writes its outcome to its own file, runs/<ORCH_ID>/results/<task>.md.  The
+path is in the lane's environment as ORCH_RESULT_FILE and in its prompt as
+{{RESULT_FILE}}.  No two lanes share a file, so concurrent lanes cannot interleave or
+lose each other's writes.
+
+When the run ends the dispatcher merges the files into results.md (`defaults.results_file`,
+relative to the orchestrator folder; "" turns merging off) as one block per run, lanes
+in natural task order (T2 before T10).  Merging the same run again replaces its block,
+so the result is the same however often it runs.  A lane that wrote nothing still gets a
+heading with its state.  A run nobody supervises (no --wait) is merged by a detached
+`lane_results.py --wait` the dispatcher leaves behind, once every lane has exited; a lane
+with no recorded exit then takes its state from its log.  `python runner/lane_results.py
+--run-dir runs/AGENT` merges by hand.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import proc_tree
+from lane_state import classify_state
+from run_journal import read_manifest
+
+RESULTS_DIR = "results"
+ENV_VAR = "ORCH_RESULT_FILE"
+DEFAULT_RESULTS_FILE = "results.md"
+MAX_LANE_CHARS = 20000
+LOCK_TIMEOUT = 10.0
+STALE_LOCK_SEC = 60.0
+WAIT_POLL_SEC = 5.0
+
+
+def result_path(run_dir: Path, task_id: str) -> Path:
+    return Path(run_dir) / RESULTS_DIR / f"{task_id}.md"
+
+
+def _natural_key(task_id: str) -> list[Any]:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", task_id)]
+
+
+def _lane_running(row: dict[str, Any]) -> bool:
+    try:
+        return bool(row.get("pid")) and proc_tree.running(int(row["pid"]))
+    except (TypeError, ValueError):
+        return False
+
+
+def _lane_state(row: dict[str, Any]) -> str:
+    if row.get("state"):
+        return str(row["state"])
+    if row.get("exit_code") is None:
+        if _lane_running(row):
+            return "RUNNING"
+        # Nobody recorded the exit (run without --wait): go by the log, as the dashboard does.
+        try:
+            with open(str(row.get("log_file", "")), "rb") as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 9000))
+                tail = f.read().decode("utf-8", errors="replace")
+        except OSError:
+            tail = ""
+        return classify_state(running=False, log_text=tail)
+    return "DONE" if int(row["exit_code"]) == 0 else "FAILED"
+
+
+def _markers(manifest: dict[str, Any]) -> tuple[str, str]:
+    run_id = f"{manifest.get('orch_id', 'AGENT')} {manifest.get('timestamp', '')}".strip()
+    return f"<!-- orch-run {run_id} -->", f"<!-- /orch-run {run_id} -->"
+
+
+def render_block(run_dir: Path, manifest: dict[str, Any]) -> tuple[str, int, int]:
+    """(markdown block for this run, lanes, lanes that wrote a result)."""
+    rows: dict[str, dict[str, Any]] = {}
+    for key in ("started", "failed"):
+        for row in manifest.get(key, []):
+            if isinstance(row, dict) and row.get("task_id"):
+                rows.setdefault(str(row["task_id"]), row)
+    begin, end = _markers(manifest)
+    lines = [begin, f"## {manifest.get('orch_id', 'AGENT')} run {manifest.get('timestamp', '')}".rstrip(), ""]
+    written = 0
+    for task_id in sorted(rows, key=_natural_key):
+        row = rows[task_id]
+        head = [task_id, str(row.get("engine", "") or "-"), _lane_state(row)]
+        if row.get("exit_code") is not None:
+            head.append(f"exit {row['exit_code']}")
+        if row.get("duration_sec") is not None:
+            head.append(f"{row['duration_sec']}s")
+        lines.append(f"### {' · '.join(head)}")
+        try:
+            text = result_path(run_dir, task_id).read_text(encoding="utf-8", errors="replace").strip()
+        except OSError:
+            text = ""
+        if text:
+            written += 1
+            if len(text) > MAX_LANE_CHARS:
+                text = text[:MAX_LANE_CHARS].rstrip() + f"\n\n_(truncated; see {RESULTS_DIR}/{task_id}.md)_"
+            lines.append(text)
+        else:
+            lines.append("_No result file written._" + (f" {row['error']}" if row.get("error") else ""))
+        lines.append("")
+    lines.append(end)
+    return "\n".join(lines) + "\n", len(rows), written
+
+
+def _acquire(lock: Path) -> bool:
+    deadline = time.time() + LOCK_TIMEOUT
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > STALE_LOCK_SEC:
+                    lock.unlink(missing_ok=True)
+                    continue
+            except OSError:
+                pass
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+
+
+def merge(run_dir: Path, manifest: dict[str, Any], results_file: Path) -> dict[str, Any]:
+    """Write this run's block into results_file, replacing an earlier merge of the same
+    run.  Returns {"file", "lanes", "written"}; raises OSError when the file is busy."""
+    block, lanes, written = render_block(run_dir, manifest)
+    begin, end = _markers(manifest)
+    results_file = Path(results_file)
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    # Two dispatchers can finish at the same time; the lock keeps their merges serial.
+    lock = results_file.with_name(results_file.name + ".lock")
+    if not _acquire(lock):
+        raise OSError(f"{results_file} is locked by another merge ({lock})")
+    try:
+        try:
+            current = results_file.read_text(encoding="utf-8-sig")
+        except FileNotFoundError:
+            current = ""
+        start = current.find(begin)
+        stop = current.find(end, start) if start >= 0 else -1
+        if start >= 0 and stop >= 0:
+            body = current[:start] + block.rstrip("\n") + current[stop + len(end) :]
+        else:
+            body = current.rstrip("\n") + ("\n\n" if current.strip() else "") + block
+        tmp = results_file.with_name(f"{results_file.name}.{os.getpid()}.tmp")
+        tmp.write_text(body, encoding="utf-8")
+        os.replace(tmp, results_file)
+    finally:
+        lock.unlink(missing_ok=True)
+    return {"file": str(results_file), "lanes": lanes, "written": written}
+
+
+def wait_for_lanes(run_dir: Path, manifest: dict[str, Any], poll: float = WAIT_POLL_SEC) -> dict[str, Any] | None:
+    """Block until no lane of this run is running; returns the latest manifest, or None
+    when the run dir was removed or reused by a later run in the meantime."""
+    stamp = manifest.get("timestamp")
+    while True:
+        rows = [r for r in manifest.get("started", []) if isinstance(r, dict) and r.get("exit_code") is None]
+        if not any(_lane_running(r) for r in rows):
+            return manifest
+        time.sleep(poll)
+        manifest = read_manifest(run_dir) or {}
+        if manifest.get("timestamp") != stamp:
+            return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Merge a run's per-lane result files into results.md")
+    parser.add_argument("--run-dir", required=True)
+    parser.add_argument("--results-file", default=str(Path(__file__).resolve().parents[1] / DEFAULT_RESULTS_FILE))
+    parser.add_argument("--wait", action="store_true", help="merge once every lane of the run has exited")
+    args = parser.parse_args()
+    run_dir = Path(args.run_dir)
+    manifest = read_manifest(run_dir)
+    if not manifest:
+        print(f"[ERROR] manifest not found in {run_dir}")
+        return 2
+    if args.wait:
+        manifest = wait_for_lanes(run_dir, manifest)
+        if manifest is None:
+            print(f"[INFO] {run_dir} was replaced by a later run; not merged")
+            return 0
+    try:
+        merged = merge(run_dir, manifest, Path(args.results_file))
+    except OSError as exc:
+        print(f"[ERROR] {exc}")
+        return 1
+    print(f"[RESULTS] {merged['written']}/{merged['lanes']} lanes wrote a result -> {merged['file']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Lane state from a worker's log, shared by the dashboard and the results merger.
+
+The dashboard shows it for every lane, and lane_results falls back to it for lanes the
+manifest has no exit code for.  The dispatcher does not use it: hedge winners are picked
+by hedge.succeeded from the engine's result plus the explicit STATUS: DONE line.
+"""
+from __future__ import annotations
+
+
+def classify_state(*, running: bool, log_text: str) -> str:
+    """RUNNING, or the outcome a finished lane's log tail suggests: DONE, BLOCKED, FAILED or EXITED."""
+    if running:
+        return "RUNNING"
+    text = (log_text or "").strip()
+    if not text:
+        return "EXITED"
+    t = text.lower()
+    # Check the tail (last ~2000 chars) for final outcome signals
+    tail = t[-2000:] if len(t) > 2000 else t
+    fail_tokens = [
+        "traceback (most recent call last)",
+        "i can't find any task definition file",
+        "cannot find any task definition file",
+        "[fail]",
+        "fatal:",
+    ]
+    done_tokens = [
+        "updated the following files",
+        "apply_patch",
+        "compile check passed",
+        "done",
+        "completed",
+        "success",
+        "changed files",
+        "residual risk",
+        "runtime risk is low",
+        "implemented for this",
+        "validation run",
+        "tokens used",
+    ]
+    blocked_tokens = [
+        "rejected: blocked by policy",
+        "read-only policy",
+        "[guard]",
+        "switched to manual",
+    ]
+    # Tail-first: if the ending looks successful, trust it even if mid-log had errors
+    if any(token in tail for token in done_tokens):
+        return "DONE"
+    if any(token in tail for token in blocked_tokens):
+        return "BLOCKED"
+    if any(token in t for token in fail_tokens):
+        return "FAILED"
+    return "DONE"
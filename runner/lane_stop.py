@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""Stop a run's workers from outside the dispatcher (dashboard, MCP, stop_workers.ps1).
+
+    python runner/lane_stop.py [--run NAME] [--task ID ...] [--grace SEC]
+
+Every lane's process group/tree is signalled at once, given its grace period (`--grace`,
+else the lane's recorded `kill_grace`, else 10s) and then force-killed, so stopping N
+lanes takes about one grace period.  A run owned by the resident daemon is stopped
+through it, which also covers lanes on remote hosts; otherwise remote lanes belong to
+their dispatcher's connection and are reported, not stopped.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import dispatch_daemon
+import proc_tree
+from run_journal import read_manifest
+
+RUNS_ROOT = Path(__file__).resolve().parents[1] / "runs"
+DEFAULT_GRACE = 10.0
+
+
+def latest_run_dir(runs_root: Path) -> Path | None:
+    dirs = sorted(p for p in Path(runs_root).iterdir() if p.is_dir() and not p.name.startswith(".")) if Path(runs_root).is_dir() else []
+    return dirs[-1] if dirs else None
+
+
+def _daemon_job(run_dir: Path) -> str:
+    reply = dispatch_daemon.request("status", timeout=5.0)
+    for job in (reply or {}).get("jobs", []):
+        if job.get("state") in {"STARTING", "RUNNING"} and job.get("run_dir"):
+            if Path(job["run_dir"]).resolve() == run_dir.resolve():
+                return str(job["job_id"])
+    return ""
+
+
+def stop_run(run_dir: Path, task_ids: list[str] | None = None, grace: float | None = None) -> dict[str, Any]:
+    """Stop the live lanes of `run_dir` (or only `task_ids`); rows carry "stop_sec"."""
+    run_dir = Path(run_dir)
+    started = time.monotonic()
+    job_id = _daemon_job(run_dir)
+    if job_id:
+        reply = dispatch_daemon.request("stop", job=job_id, tasks=list(task_ids or []), grace=grace)
+        if reply is not None:
+            return {**reply, "run": run_dir.name, "via": f"daemon job {job_id}", "skipped": []}
+    manifest = read_manifest(run_dir)
+    if manifest is None:
+        return {"ok": False, "error": f"manifest not found: {run_dir}"}
+    wanted = set(task_ids or [])
+    lanes: list[dict[str, Any]] = []
+    skipped: list[dict[str, Any]] = []
+    for entry in manifest.get("started", []):
+        if not isinstance(entry, dict) or (wanted and entry.get("task_id") not in wanted):
+            continue
+        if entry.get("exit_code") is not None:
+            # Recorded as exited: its pid may already belong to something else.
+            continue
+        host = str(entry.get("host") or "local")
+        if host != "local":
+            skipped.append({"task_id": entry.get("task_id", ""), "host": host, "reason": "remote lane; stop it through its dispatcher"})
+            continue
+        if not entry.get("pid"):
+            continue
+        lane_grace = grace if grace is not None else entry.get("kill_grace", DEFAULT_GRACE)
+        lanes.append({"task_id": entry.get("task_id", ""), "pid": int(entry["pid"]), "pgid": entry.get("pgid"), "grace": float(lane_grace)})
+    rows = proc_tree.stop_trees(lanes)
+    return {
+        "ok": True,
+        "run": run_dir.name,
+        "stopped": rows,
+        "skipped": skipped,
+        "elapsed_sec": round(time.monotonic() - started, 3),
+    }
+
+
+def report_lines(result: dict[str, Any]) -> list[str]:
+    if not result.get("ok"):
+        return [f"[ORCH] stop failed: {result.get('error', '')}"]
+    lines = []
+    for row in result.get("stopped", []):
+        where = f"host={row['host']}" if row.get("host") else f"pid={row.get('pid')}"
+        if row.get("result") == "not running":
+            lines.append(f"[SKIP] {row['task_id']} {where} already exited")
+        else:
+            lines.append(f"[STOP] {row['task_id']} {where} {row.get('result')} in {row.get('stop_sec', 0):.2f}s")
+    for row in result.get("skipped", []):
+        lines.append(f"[SKIP] {row['task_id']} host={row['host']}: {row['reason']}")
+    via = f" via {result['via']}" if result.get("via") else ""
+    lines.append(f"[ORCH] stop request completed{via} in {result.get('elapsed_sec', 0):.2f}s.")
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stop a run's workers (all trees in parallel)")
+    parser.add_argument("--runs-root", default=str(RUNS_ROOT))
+    parser.add_argument("--run", default="", help="run dir name (default: latest)")
+    parser.add_argument("--task", action="append", default=[], help="task id to stop (repeatable; default: all)")
+    parser.add_argument("--grace", type=float, default=None, help="seconds before force-kill (default: each lane's kill_grace)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    runs_root = Path(args.runs_root)
+    run_dir = runs_root / args.run if args.run else latest_run_dir(runs_root)
+    if run_dir is None or not run_dir.is_dir():
+        print(f"[ORCH] no run to stop under {runs_root}" if run_dir is None else f"[ORCH] run not found: {run_dir}")
+        return 0 if run_dir is None else 1
+    result = stop_run(run_dir, args.task, args.grace)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print("\n".join(report_lines(result)))
+    return 0 if result.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
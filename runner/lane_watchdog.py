@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Stall detection for running lanes (`stall_seconds`, `stall_prompt_seconds`).
+
+A lane is active while its log grows or its process tree burns CPU.  It is stalled when
+
+  inactivity  neither has happened for `stall_seconds`
+  prompt      the end of its log is an interactive prompt (approval, y/n, "press
+              enter") and nothing has been written for `stall_prompt_seconds`
+
+The dispatcher checks every running lane a few times per window, kills the tree of a
+stalled one and may restart it, optionally on the `stall_failover` engine.  Keys are
+read from the worker, then engines.<name>, then defaults; both windows default to 0
+(off).
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable
+
+# Lowercase; matched against the last PROMPT_TAIL_CHARS of the log only, since a CLI
+# blocked on a prompt has just printed it.
+PROMPT_PATTERNS = (
+    "would you like to proceed?",
+    "do you want to proceed",
+    "do you want to allow",
+    "approval required",
+    "waiting for approval",
+    "allow this command?",
+    "press enter to continue",
+    "(y/n)",
+    "[y/n]",
+    "(yes/no)",
+    "you've hit your limit",
+)
+PROMPT_TAIL_CHARS = 600
+CPU_ACTIVITY_SEC = 0.5
+
+
+def stall_policy(defaults: dict[str, Any], engine_cfg: dict[str, Any], worker: dict[str, Any]) -> dict[str, Any]:
+    def pick(key: str, default: Any) -> Any:
+        return worker.get(key, engine_cfg.get(key, defaults.get(key, default)))
+
+    def number(key: str, default: float) -> float:
+        try:
+            return max(0.0, float(pick(key, default)))
+        except (TypeError, ValueError):
+            return default
+
+    policy = {
+        "stall_seconds": number("stall_seconds", 0.0),
+        "prompt_seconds": number("stall_prompt_seconds", 0.0),
+        "restarts": int(number("stall_restarts", 0)),
+        "failover": str(pick("stall_failover", "") or "").strip().lower(),
+    }
+    policy["enabled"] = bool(policy["stall_seconds"] or policy["prompt_seconds"])
+    if policy["failover"]:
+        # Failing over only makes sense with at least one relaunch.
+        policy["restarts"] = max(1, policy["restarts"])
+    return policy
+
+
+def check_interval(policies: list[dict[str, Any]]) -> float:
+    """How often to look at running lanes: a quarter of the shortest window, 0.5s..5s."""
+    windows = [w for p in policies for w in (p["stall_seconds"], p["prompt_seconds"]) if w]
+    return max(0.5, min(5.0, min(windows) / 4.0)) if windows else 5.0
+
+
+def prompt_match(text: str) -> str:
+    tail = (text or "")[-PROMPT_TAIL_CHARS:].lower()
+    return next((p for p in PROMPT_PATTERNS if p in tail), "")
+
+
+class StallWatch:
+    """Activity tracker for one attempt of one lane; `check` returns a stall reason or "".
+    `cpu_probe` returns the CPU seconds of the lane's process tree, or None if unknown."""
+
+    def __init__(
+        self, log_file: Path, cpu_probe: Callable[[], float | None], policy: dict[str, Any], now: float
+    ) -> None:
+        self.log_file = Path(log_file)
+        self.cpu_probe = cpu_probe
+        self.policy = policy
+        self.last_activity = now
+        self.last_output = now
+        self.log_size = self._size()
+        self.cpu = cpu_probe()
+        self.prompt = ""
+
+    def _size(self) -> int:
+        try:
+            return self.log_file.stat().st_size
+        except OSError:
+            return 0
+
+    def _read_tail(self) -> str:
+        try:
+            with self.log_file.open("rb") as f:
+                f.seek(max(0, self.log_size - PROMPT_TAIL_CHARS * 4))
+                return f.read().decode("utf-8", errors="replace")
+        except OSError:
+            return ""
+
+    def check(self, now: float) -> str:
+        size = self._size()
+        if size != self.log_size:
+            self.log_size = size
+            self.last_activity = self.last_output = now
+            self.prompt = prompt_match(self._read_tail()) if self.policy["prompt_seconds"] else ""
+        cpu = self.cpu_probe()
+        if cpu is not None:
+            if self.cpu is None or cpu - self.cpu > CPU_ACTIVITY_SEC:
+                self.cpu = cpu
+                self.last_activity = now
+        quiet = now - self.last_output
+        if self.prompt and quiet >= self.policy["prompt_seconds"]:
+            return f"interactive prompt ({self.prompt!r}), no output for {int(quiet)}s"
+        idle = now - self.last_activity
+        if self.policy["stall_seconds"] and idle >= self.policy["stall_seconds"]:
+            return f"no log output or CPU activity for {int(idle)}s"
+        return ""
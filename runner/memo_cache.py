@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed memo of successful lanes (`defaults.memo`), kept in runs/.memo/.
+
+The key hashes the rendered command and stdin (engine, model, flags and prompt) with
+the content of every file in the lane's `scope_paths`.  When a lane exits 0 its log,
+event sidecar, result file, diff and the scope files it produced are stored under two keys:
+
+  before-state key  same prompt on the same inputs again: the stored files are written
+                    back into the workspace ("replayed") and the lane is not launched
+  after-state key   same prompt on the files it already produced: nothing to replay
+
+Either hit inside the TTL marks the lane CACHED.  Lanes without scope_paths are never
+memoized, since their inputs cannot be checked.
+"""
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+from scope_plan import static_prefix
+
+MEMO_DIRNAME = ".memo"
+_SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv"}
+MAX_FILES = 2000
+MAX_BYTES = 32 * 1024 * 1024
+
+
+def memo_policy(defaults: dict[str, Any], worker: dict[str, Any]) -> dict[str, Any]:
+    """defaults.memo (true or {"ttl_hours": N}) with a per-worker `memo: false` opt-out."""
+    raw = defaults.get("memo", False)
+    policy = {"enabled": bool(raw), "ttl_hours": 24.0}
+    if isinstance(raw, dict):
+        policy.update(raw)
+        policy["enabled"] = bool(raw.get("enabled", True))
+    if worker.get("memo") is False:
+        policy["enabled"] = False
+    return policy
+
+
+def lane_path(base: Path, rel: str, worktree: dict[str, Any] | None = None) -> Path:
+    """Where workspace-relative `rel` lives for a lane (inside its worktree if isolated)."""
+    path = Path(base) / rel
+    if worktree and worktree.get("worktree"):
+        try:
+            return Path(worktree["worktree"]) / path.resolve().relative_to(Path(worktree["repo"]).resolve())
+        except ValueError:
+            pass
+    return path
+
+
+def _walk(root: Path) -> list[Path]:
+    out: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in _SKIP_DIRS)
+        out.extend(Path(dirpath) / name for name in sorted(filenames))
+        if len(out) > MAX_FILES:
+            break
+    return out
+
+
+def scope_files(
+    base: Path, patterns: list[str], worktree: dict[str, Any] | None = None
+) -> Iterator[tuple[str, Path]]:
+    """Yield (scope-relative path, filesystem path) for every file a scope names; a plain
+    path that does not exist yet is yielded too.  Directories stop after MAX_FILES."""
+    seen: set[str] = set()
+    for pattern in patterns:
+        prefix = static_prefix(pattern)
+        rest = pattern[len(prefix) :].lstrip("/")
+        root = lane_path(base, prefix, worktree)
+        if rest:
+            found = sorted(p for p in root.glob(rest) if p.is_file() and not _SKIP_DIRS & set(p.parts))
+        elif root.is_dir():
+            found = _walk(root)
+        else:
+            found = [root]
+        for path in found:
+            rel = "/".join(filter(None, [prefix, path.relative_to(root).as_posix() if path != root else ""]))
+            if rel not in seen:
+                seen.add(rel)
+                yield rel, path
+
+
+def snapshot(
+    base: Path, patterns: list[str], worktree: dict[str, Any] | None = None
+) -> dict[str, bytes | None] | None:
+    """{scope-relative path: content or None if absent} for the lane's scope; None when
+    the scope is larger than MAX_FILES / MAX_BYTES."""
+    files: dict[str, bytes | None] = {}
+    total = 0
+    for rel, path in scope_files(base, patterns, worktree):
+        try:
+            data = path.read_bytes()
+        except OSError:
+            data = None
+        files[rel] = data
+        total += len(data or b"")
+        if len(files) > MAX_FILES or total > MAX_BYTES:
+            return None
+    return files
+
+
+def cache_key(command: list[str], stdin_text: str | None, files: dict[str, bytes | None]) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps({"command": command, "stdin": stdin_text or ""}, ensure_ascii=False).encode("utf-8"))
+    for rel in sorted(files):
+        data = files[rel]
+        h.update(f"\0{rel}\0{hashlib.sha256(data).hexdigest() if data is not None else '-'}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def unified_diff(before: dict[str, bytes | None], after: dict[str, bytes | None]) -> str:
+    chunks: list[str] = []
+    for rel in sorted(set(before) | set(after)):
+        old, new = before.get(rel), after.get(rel)
+        if old == new:
+            continue
+        chunks.extend(
+            difflib.unified_diff(
+                (old or b"").decode("utf-8", errors="replace").splitlines(keepends=True),
+                (new or b"").decode("utf-8", errors="replace").splitlines(keepends=True),
+                fromfile=f"a/{rel}" if old is not None else "/dev/null",
+                tofile=f"b/{rel}" if new is not None else "/dev/null",
+            )
+        )
+    return "".join(chunks)
+
+
+class MemoCache:
+    def __init__(self, runs_root: Path) -> None:
+        self.root = Path(runs_root) / MEMO_DIRNAME
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def lookup(self, key: str, ttl_hours: float) -> dict[str, Any] | None:
+        entry_dir = self._dir(key)
+        try:
+            record = json.loads((entry_dir / "entry.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if ttl_hours and time.time() - float(record.get("stored_at", 0)) > ttl_hours * 3600.0:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        record["dir"] = str(entry_dir)
+        return record
+
+    def store(
+        self,
+        keys: dict[str, bool],
+        record: dict[str, Any],
+        log_file: Path,
+        sidecar: Path,
+        diff_text: str,
+        changed: dict[str, bytes | None],
+        result_file: Path | None = None,
+    ) -> None:
+        """Write one entry per key; `keys` maps key -> whether a hit must replay `changed`."""
+        for key, replay in keys.items():
+            entry_dir = self._dir(key)
+            tmp = entry_dir.with_name(f"{key}.{os.getpid()}.tmp")
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            for src, name in ((log_file, "lane.log"), (sidecar, "lane.events.jsonl"), (result_file, "lane.result.md")):
+                if src is not None and src.exists():
+                    shutil.copyfile(src, tmp / name)
+            (tmp / "lane.diff").write_text(diff_text, encoding="utf-8")
+            files: dict[str, str | None] = {}
+            if replay:
+                for idx, (rel, data) in enumerate(sorted(changed.items())):
+                    if data is None:
+                        files[rel] = None
+                    else:
+                        (tmp / f"file.{idx}").write_bytes(data)
+                        files[rel] = f"file.{idx}"
+            (tmp / "entry.json").write_text(
+                json.dumps({**record, "stored_at": time.time(), "replay": files}, ensure_ascii=False, indent=1),
+                encoding="utf-8",
+            )
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp, entry_dir)
+
+    @staticmethod
+    def replay(record: dict[str, Any], base: Path, worktree: dict[str, Any] | None = None) -> list[str]:
+        """Write the stored result files into the lane's workspace; returns their paths."""
+        entry_dir = Path(record["dir"])
+        written: list[str] = []
+        for rel, blob in sorted((record.get("replay") or {}).items()):
+            target = lane_path(base, rel, worktree)
+            if blob is None:
+                target.unlink(missing_ok=True)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(entry_dir / blob, target)
+            written.append(rel)
+        return written
+
+    @staticmethod
+    def restore_logs(
+        record: dict[str, Any], log_file: Path, sidecar: Path, result_file: Path | None = None
+    ) -> Path | None:
+        """Copy the cached log, sidecar and result file into the run dir; returns the .diff
+        path if any."""
+        entry_dir = Path(record["dir"])
+        for name, dest in (("lane.log", log_file), ("lane.events.jsonl", sidecar), ("lane.result.md", result_file)):
+            if dest is not None and (entry_dir / name).exists():
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(entry_dir / name, dest)
+        diff = entry_dir / "lane.diff"
+        if diff.exists() and diff.stat().st_size:
+            dest = log_file.with_suffix(".diff")
+            shutil.copyfile(diff, dest)
+            return dest
+        return None
+
+    def prune(self, ttl_hours: float) -> int:
+        """Remove entries older than the TTL (and stale temp dirs); returns how many."""
+        if not ttl_hours or not self.root.is_dir():
+            return 0
+        cutoff = time.time() - ttl_hours * 3600.0
+        removed = 0
+        for bucket in self.root.iterdir():
+            if not bucket.is_dir():
+                continue
+            for entry_dir in bucket.iterdir():
+                try:
+                    if entry_dir.stat().st_mtime < cutoff:
+                        shutil.rmtree(entry_dir, ignore_errors=True)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
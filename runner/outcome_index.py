@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Per-orch index of each task's last outcome, kept next to the run dirs.
+
+The dispatcher records one compact row per task when its worker finishes (state, block
+reason, tokens, duration), so the history guards look a task up in O(1) instead of
+re-reading previous logs.  The file lives at runs/.outcomes.<ORCH_ID>.json, outside the
+run dir, so it survives single-run-dir cleanup.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+
+def index_path(runs_root: Path, orch_id: str) -> Path:
+    return Path(runs_root) / f".outcomes.{orch_id}.json"
+
+
+class OutcomeIndex:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # Lanes are prepared on a thread pool, so records flush concurrently; one writer
+        # at a time keeps an older body from replacing a newer one.
+        self._write_lock = threading.Lock()
+        self._rows: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if isinstance(data, dict) and isinstance(data.get("tasks"), dict):
+                self._rows = data["tasks"]
+        except Exception:
+            pass
+
+    def get(self, task_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._rows.get(task_id)
+            return dict(row) if isinstance(row, dict) else None
+
+    def record(self, task_id: str, outcome: dict[str, Any], flush: bool = True) -> None:
+        with self._lock:
+            self._rows[task_id] = dict(outcome)
+            self._dirty = True
+        if flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """Atomic rewrite (temp file + rename); a no-op when nothing changed."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                body = json.dumps({"tasks": self._rows}, ensure_ascii=False, indent=1)
+                self._dirty = False
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                tmp.write_text(body, encoding="utf-8")
+                os.replace(tmp, self.path)
+            except Exception as exc:
+                print(f"[WARN] outcome index not saved: {exc}")
+                try:
+                    tmp.unlink(missing_ok=True)
+                except Exception:
+                    pass
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Worker process trees: descendants, CPU time and tree termination.
+
+Workers are started in their own process group (POSIX session / Windows
+CREATE_NEW_PROCESS_GROUP), so a stop reaches grandchildren that were re-parented after
+their parent exited.  psutil is used when it is installed.  Without it, Linux reads
+/proc; on Windows, `taskkill /T` finds the tree itself and CPU time is not available.
+"""
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any
+
+try:
+    import psutil  # type: ignore
+except ImportError:  # optional
+    psutil = None  # type: ignore[assignment]
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") and "SC_CLK_TCK" in getattr(os, "sysconf_names", {}) else 100
+
+
+def _proc_stat(pid: int) -> list[str] | None:
+    try:
+        raw = open(f"/proc/{pid}/stat", "rb").read().decode("ascii", errors="replace")
+    except OSError:
+        return None
+    # Fields after the command name, which is wrapped in parentheses and may contain spaces.
+    return raw[raw.rfind(")") + 2 :].split()
+
+
+def descendants(pid: int) -> list[int]:
+    """All live descendants of `pid` (children first in breadth order); [] if unknown."""
+    if psutil is not None:
+        try:
+            return [p.pid for p in psutil.Process(pid).children(recursive=True)]
+        except Exception:
+            return []
+    if not sys.platform.startswith("linux"):
+        return []
+    children: dict[int, list[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for name in entries:
+        if not name.isdigit():
+            continue
+        fields = _proc_stat(int(name))
+        if fields and len(fields) > 1:
+            children.setdefault(int(fields[1]), []).append(int(name))
+    out: list[int] = []
+    frontier = [pid]
+    while frontier:
+        nxt: list[int] = []
+        for parent in frontier:
+            for child in children.get(parent, []):
+                if child not in out:
+                    out.append(child)
+                    nxt.append(child)
+        frontier = nxt
+    return out
+
+
+def cpu_seconds(pid: int) -> float | None:
+    """User+system CPU time of `pid` and its live descendants; None where unavailable."""
+    pids = [pid, *descendants(pid)]
+    total = 0.0
+    seen = False
+    for p in pids:
+        if psutil is not None:
+            try:
+                t = psutil.Process(p).cpu_times()
+                total += float(t.user + t.system)
+                seen = True
+            except Exception:
+                continue
+        else:
+            fields = _proc_stat(p)
+            if fields and len(fields) > 12:
+                total += (int(fields[11]) + int(fields[12])) / float(_CLK_TCK)
+                seen = True
+    return total if seen else None
+
+
+def group_alive(pgid: int | None) -> bool:
+    """True while process group `pgid` has a member that is not a zombie."""
+    if not pgid or os.name == "nt":
+        return False
+    try:
+        os.killpg(pgid, 0)
+    except OSError:
+        return False
+    if not sys.platform.startswith("linux"):
+        return True
+    # killpg also succeeds for unreaped zombies, which a stop cannot do anything about.
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return True
+    for name in entries:
+        if name.isdigit():
+            fields = _proc_stat(int(name))
+            if fields and len(fields) > 2 and fields[2] == str(pgid) and fields[0] != "Z":
+                return True
+    return False
+
+
+def _signal_group(pgid: int | None, sig: int) -> None:
+    # Never signal our own group: old manifests recorded workers that shared it.
+    if not pgid or os.name == "nt" or pgid == os.getpgrp():
+        return
+    try:
+        os.killpg(pgid, sig)
+    except OSError:
+        pass
+
+
+def _alive(pid: int) -> bool:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+        except Exception:
+            return False
+    if os.name == "nt":
+        return False
+    fields = _proc_stat(pid)
+    if fields is not None:
+        return fields[0] != "Z"
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def running(pid: int) -> bool:
+    if os.name == "nt" and psutil is None:
+        return _win_alive(pid)
+    return _alive(pid)
+
+
+def terminate_tree(pid: int, grace: float = 10.0, pgid: int | None = None) -> str:
+    """Ask the tree (and process group `pgid`, if given) to exit, then kill whatever is
+    left after `grace` seconds.  Returns "terminated" or "killed"."""
+    if os.name == "nt":
+        # Without /F taskkill posts WM_CLOSE, which console CLIs ignore; /F is the escalation.
+        subprocess.run(["taskkill", "/PID", str(pid), "/T"], capture_output=True)
+        deadline = time.monotonic() + grace
+        while time.monotonic() < deadline and _win_alive(pid):
+            time.sleep(0.2)
+        if not _win_alive(pid):
+            return "terminated"
+        subprocess.run(["taskkill", "/PID", str(pid), "/T", "/F"], capture_output=True)
+        return "killed"
+    tree = [pid, *descendants(pid)]
+    _signal_group(pgid, signal.SIGTERM)
+    for p in tree:
+        try:
+            os.kill(p, signal.SIGTERM)
+        except OSError:
+            pass
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline:
+        if not any(_alive(p) for p in tree) and not group_alive(pgid):
+            return "terminated"
+        time.sleep(0.1)
+    # Children the worker spawned after the first pass are caught here too.
+    _signal_group(pgid, signal.SIGKILL)
+    for p in [*tree, *descendants(pid)]:
+        try:
+            os.kill(p, signal.SIGKILL)
+        except OSError:
+            pass
+    return "killed"
+
+
+def stop_trees(lanes: list[dict[str, Any]], grace: float = 10.0) -> list[dict[str, Any]]:
+    """Stop several lanes at once.  Each lane is {"task_id", "pid", "pgid"?, "grace"?};
+    every tree is signalled in parallel, so the whole stop takes about one grace period.
+    Returns one row per lane with "result" ("terminated", "killed" or "not running")
+    and "stop_sec", the time until its tree was gone or force-killed."""
+    rows: list[dict[str, Any]] = []
+    threads: list[threading.Thread] = []
+
+    def _one(lane: dict[str, Any], row: dict[str, Any]) -> None:
+        started = time.monotonic()
+        try:
+            row["result"] = terminate_tree(int(lane["pid"]), float(lane.get("grace", grace)), lane.get("pgid"))
+        except Exception as exc:  # one lane must not take down the others' stops
+            row["result"] = "error"
+            row["error"] = str(exc)
+        row["stop_sec"] = round(time.monotonic() - started, 3)
+
+    for lane in lanes:
+        pid = int(lane.get("pid") or 0)
+        pgid = lane.get("pgid")
+        row = {"task_id": lane.get("task_id", ""), "pid": pid}
+        rows.append(row)
+        if not pid or not (running(pid) or group_alive(pgid)):
+            row.update(result="not running", stop_sec=0.0)
+            continue
+        t = threading.Thread(target=_one, args=(lane, row), name=f"orch-stop-{row['task_id']}", daemon=True)
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    return rows
+
+
+def _win_alive(pid: int) -> bool:
+    p = subprocess.run(
+        ["tasklist", "/FI", f"PID eq {pid}", "/FO", "CSV", "/NH"], capture_output=True, text=True, errors="replace"
+    )
+    return f'"{pid}"' in (p.stdout or "")
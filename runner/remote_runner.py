@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""Remote lanes: a small runner agent, and the dispatcher's handle on the lanes it runs.
+
+    python runner/remote_runner.py serve --port 7711 --slots 4 [--bind 0.0.0.0] [--token T]
+    python runner/remote_runner.py ping --address host:7711 [--token T]
+
+The agent runs worker commands on its own machine for a dispatcher that lists it under
+`hosts` in the tasks file.  Every message is one frame: a 4-byte big-endian length and
+a UTF-8 JSON object.  One connection carries one lane:
+
+  dispatcher -> {"op": "run", "token", "task_id", "command", "cwd", "stdin"}
+  agent      -> {"type": "started", "pid"} | {"ok": false, "error"}
+  agent      -> {"type": "output", "data"}   worker stdout+stderr, as it arrives
+  agent      -> {"type": "stat", "cpu"}      CPU seconds of the worker's tree, every few seconds
+  dispatcher -> {"op": "kill", "grace"}      terminate the tree, force-kill after `grace`
+  agent      -> {"type": "exit", "code"}     last frame
+
+`{"op": "ping"}` answers with the agent's slots and running lanes.  If the dispatcher
+goes away mid-lane the agent kills the lane, since nobody is left to record it.  The
+token comes from --token or ORCH_RUNNER_TOKEN; the agent prints a fresh one when
+neither is set.
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import json
+import os
+import secrets
+import shutil
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import proc_tree
+
+_HEADER = struct.Struct(">I")
+MAX_FRAME = 16 * 1024 * 1024
+STAT_INTERVAL = 2.0
+_CONNECT_TIMEOUT = 5.0
+
+
+def send_frame(sock: socket.socket, obj: dict[str, Any]) -> None:
+    body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = b""
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise EOFError("connection closed")
+        buf += chunk
+    return buf
+
+
+def recv_frame(sock: socket.socket) -> dict[str, Any]:
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_FRAME:
+        raise ValueError(f"frame of {size} bytes exceeds {MAX_FRAME}")
+    obj = json.loads(_recv_exact(sock, size).decode("utf-8"))
+    if not isinstance(obj, dict):
+        raise ValueError("frame is not a JSON object")
+    return obj
+
+
+def _split_address(address: str) -> tuple[str, int]:
+    host, _, port = str(address).strip().rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"address must be host:port, not {address!r}")
+    return host.strip("[]"), int(port)
+
+
+def request(address: str, token: str, op: str, timeout: float = _CONNECT_TIMEOUT, **fields: Any) -> dict[str, Any]:
+    """One request/reply round trip (ping); raises OSError/ValueError when the agent is unusable."""
+    with socket.create_connection(_split_address(address), timeout=timeout) as sock:
+        send_frame(sock, {"op": op, "token": token, **fields})
+        return recv_frame(sock)
+
+
+# --- dispatcher side ------------------------------------------------------------------
+
+
+@dataclass
+class Host:
+    name: str
+    address: str
+    slots: int
+    token: str = ""
+    workspace: str = ""
+    running: int = 0
+    up: bool = True
+    error: str = ""
+    info: dict[str, Any] = field(default_factory=dict)
+
+    def snapshot(self) -> dict[str, Any]:
+        out = {"address": self.address, "slots": self.slots, "running": self.running, "up": self.up}
+        if self.error:
+            out["error"] = self.error
+        if self.info.get("hostname"):
+            out["hostname"] = self.info["hostname"]
+        return out
+
+
+def load_hosts(config: dict[str, Any]) -> dict[str, Host]:
+    """The tasks file's `hosts` list; raises ValueError on a malformed entry."""
+    raw = config.get("hosts") or []
+    if not isinstance(raw, list):
+        raise ValueError("hosts must be a list")
+    hosts: dict[str, Host] = {}
+    for item in raw:
+        if not isinstance(item, dict) or item.get("enabled", True) is False:
+            continue
+        name = str(item.get("name", "")).strip()
+        if not name or name == "local" or name in hosts:
+            raise ValueError(f"host names must be unique and not 'local': {name!r}")
+        address = str(item.get("address", "")).strip()
+        _split_address(address)
+        token = str(item.get("token", "") or os.environ.get(str(item.get("token_env", "") or "ORCH_RUNNER_TOKEN"), ""))
+        hosts[name] = Host(
+            name=name,
+            address=address,
+            slots=max(1, int(item.get("slots", 1) or 1)),
+            token=token,
+            workspace=str(item.get("workspace", "") or ""),
+        )
+    return hosts
+
+
+def probe(host: Host) -> None:
+    """Ping the agent; marks the host down (with the reason) when it cannot take lanes."""
+    try:
+        reply = request(host.address, host.token, "ping")
+    except (OSError, ValueError, EOFError) as exc:
+        host.up, host.error = False, str(exc) or type(exc).__name__
+        return
+    if not reply.get("ok"):
+        host.up, host.error = False, str(reply.get("error", "refused"))
+        return
+    host.up, host.error, host.info = True, "", reply
+    # The agent's own limit wins over a larger count in the tasks file.
+    if int(reply.get("slots", 0) or 0):
+        host.slots = min(host.slots, int(reply["slots"]))
+
+
+def map_path(value: str, local_root: str, remote_root: str) -> str:
+    """Rewrite a path under the local workspace onto the host's workspace root."""
+    if not remote_root or not local_root:
+        return value
+    local = local_root.rstrip("/\\")
+    if value == local or value.startswith(local + "/") or value.startswith(local + "\\"):
+        return remote_root.rstrip("/\\") + value[len(local) :].replace("\\", "/")
+    return value
+
+
+class RemoteProcess:
+    """The Popen subset the dispatcher uses, for a lane running on an agent.  Output is
+    written to `sink_fd` (the lane's log), which is closed at exit."""
+
+    remote = True
+
+    def __init__(self, host: Host, sock: socket.socket, pid: int, sink_fd: int) -> None:
+        self.host = host
+        self.pid = pid
+        self.returncode: int | None = None
+        self.stdin = None
+        self.cpu_seconds: float | None = None
+        self._sock = sock
+        self._sink_fd = sink_fd
+        self._send_lock = threading.Lock()
+        self._done = threading.Event()
+        threading.Thread(target=self._reader, name=f"orch-remote-{host.name}-{pid}", daemon=True).start()
+
+    @classmethod
+    def start(
+        cls, host: Host, task_id: str, command: list[str], cwd: str, stdin_text: str | None, sink_fd: int
+    ) -> "RemoteProcess":
+        sock = socket.create_connection(_split_address(host.address), timeout=_CONNECT_TIMEOUT)
+        try:
+            send_frame(
+                sock,
+                {"op": "run", "token": host.token, "task_id": task_id, "command": command, "cwd": cwd, "stdin": stdin_text or ""},
+            )
+            reply = recv_frame(sock)
+            if reply.get("type") != "started":
+                raise RuntimeError(f"{host.name}: {reply.get('error', 'launch refused')}")
+        except BaseException:
+            sock.close()
+            raise
+        sock.settimeout(None)
+        return cls(host, sock, int(reply.get("pid") or 0), sink_fd)
+
+    def _reader(self) -> None:
+        code = -1
+        try:
+            while True:
+                frame = recv_frame(self._sock)
+                kind = frame.get("type")
+                if kind == "output":
+                    os.write(self._sink_fd, str(frame.get("data", "")).encode("utf-8"))
+                elif kind == "stat":
+                    self.cpu_seconds = frame.get("cpu")
+                elif kind == "exit":
+                    code = int(frame.get("code", -1))
+                    break
+        except (OSError, ValueError, EOFError) as exc:
+            try:
+                os.write(self._sink_fd, f"\n[ORCH] lost connection to host {self.host.name}: {exc}\n".encode("utf-8"))
+            except OSError:
+                pass
+        finally:
+            try:
+                os.close(self._sink_fd)
+            except OSError:
+                pass
+            self._sock.close()
+            self.returncode = code
+            self._done.set()
+
+    def poll(self) -> int | None:
+        return self.returncode if self._done.is_set() else None
+
+    def wait(self, timeout: float | None = None) -> int:
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(f"remote:{self.host.name}", timeout or 0)
+        return int(self.returncode if self.returncode is not None else -1)
+
+    def terminate_tree(self, grace: float = 10.0) -> None:
+        with self._send_lock:
+            try:
+                send_frame(self._sock, {"op": "kill", "grace": grace})
+            except OSError:
+                pass
+
+    def terminate(self) -> None:
+        self.terminate_tree()
+
+    def kill(self) -> None:
+        self.terminate_tree(0.0)
+
+
+# --- agent side -----------------------------------------------------------------------
+
+
+class RunnerAgent:
+    def __init__(self, token: str, slots: int) -> None:
+        self.token = token
+        self.slots = max(1, slots)
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._running: dict[int, str] = {}
+
+    def _claim(self) -> bool:
+        with self._lock:
+            if self._busy >= self.slots:
+                return False
+            self._busy += 1
+            return True
+
+    def _release(self, pid: int = 0) -> None:
+        with self._lock:
+            self._busy -= 1
+            self._running.pop(pid, None)
+
+    def ping(self) -> dict[str, Any]:
+        with self._lock:
+            lanes = sorted(self._running.values())
+        return {"ok": True, "hostname": socket.gethostname(), "pid": os.getpid(), "slots": self.slots, "running": lanes}
+
+    def run(self, sock: socket.socket, req: dict[str, Any]) -> None:
+        task_id = str(req.get("task_id", "?"))
+        command = [str(a) for a in (req.get("command") or [])]
+        if not command:
+            send_frame(sock, {"ok": False, "error": "empty command"})
+            return
+        if not self._claim():
+            send_frame(sock, {"ok": False, "error": f"no free slot ({self.slots} busy)"})
+            return
+        if not Path(command[0]).exists():
+            # The dispatcher resolved the CLI on its own machine; find ours.
+            command[0] = shutil.which(Path(command[0]).name) or command[0]
+        try:
+            proc = subprocess.Popen(
+                command,
+                cwd=str(req.get("cwd") or None) or None,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.PIPE if req.get("stdin") else subprocess.DEVNULL,
+                env={k: v for k, v in os.environ.items() if k != "CLAUDECODE"},
+                start_new_session=os.name != "nt",
+                creationflags=int(getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0) or 0),
+            )
+        except Exception as exc:
+            self._release()
+            send_frame(sock, {"ok": False, "error": f"launch failed: {exc}"})
+            return
+        with self._lock:
+            self._running[proc.pid] = task_id
+        print(f"[AGENT] {task_id} pid={proc.pid} cwd={req.get('cwd')}")
+        send_lock = threading.Lock()
+
+        def send(obj: dict[str, Any]) -> bool:
+            with send_lock:
+                try:
+                    send_frame(sock, obj)
+                    return True
+                except OSError:
+                    return False
+
+        send({"type": "started", "pid": proc.pid})
+        if req.get("stdin"):
+            threading.Thread(target=_write_stdin, args=(proc, str(req["stdin"])), daemon=True).start()
+        finished = threading.Event()
+        threading.Thread(target=self._control, args=(sock, proc, finished), daemon=True).start()
+        threading.Thread(target=_stats, args=(proc, send, finished), daemon=True).start()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        assert proc.stdout is not None
+        while True:
+            chunk = proc.stdout.read1(65536) if hasattr(proc.stdout, "read1") else proc.stdout.read(65536)
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            if text and not send({"type": "output", "data": text}):
+                # Nobody is left to record this lane.
+                proc_tree.terminate_tree(proc.pid, 5.0, _group(proc))
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            send({"type": "output", "data": tail})
+        code = proc.wait()
+        finished.set()
+        self._release(proc.pid)
+        send({"type": "exit", "code": code})
+        print(f"[AGENT] {task_id} exit={code}")
+
+    @staticmethod
+    def _control(sock: socket.socket, proc: subprocess.Popen[bytes], finished: threading.Event) -> None:
+        try:
+            while not finished.is_set():
+                frame = recv_frame(sock)
+                if frame.get("op") == "kill":
+                    grace = float(frame.get("grace", 10.0) or 0.0)
+                    threading.Thread(
+                        target=proc_tree.terminate_tree, args=(proc.pid, grace, _group(proc)), daemon=True
+                    ).start()
+        except (OSError, ValueError, EOFError):
+            if not finished.is_set() and proc.poll() is None:
+                proc_tree.terminate_tree(proc.pid, 5.0, _group(proc))
+
+
+def _group(proc: subprocess.Popen[bytes]) -> int | None:
+    # Lanes are started as session leaders on POSIX, so their pid is their group id.
+    return proc.pid if os.name != "nt" else None
+
+
+def _write_stdin(proc: subprocess.Popen[bytes], text: str) -> None:
+    assert proc.stdin is not None
+    try:
+        proc.stdin.write(text.encode("utf-8"))
+    except (BrokenPipeError, OSError, ValueError):
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+
+
+def _stats(proc: subprocess.Popen[bytes], send: Any, finished: threading.Event) -> None:
+    while not finished.wait(STAT_INTERVAL):
+        cpu = proc_tree.cpu_seconds(proc.pid)
+        if cpu is not None:
+            send({"type": "stat", "cpu": round(cpu, 3)})
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        agent: RunnerAgent = self.server.agent_ref  # type: ignore[attr-defined]
+        sock: socket.socket = self.request
+        try:
+            req = recv_frame(sock)
+            if not secrets.compare_digest(str(req.get("token", "")), agent.token):
+                send_frame(sock, {"ok": False, "error": "bad token"})
+            elif req.get("op") == "ping":
+                send_frame(sock, agent.ping())
+            elif req.get("op") == "run":
+                agent.run(sock, req)
+            else:
+                send_frame(sock, {"ok": False, "error": f"unknown op {req.get('op')!r}"})
+        except (OSError, ValueError, EOFError):
+            pass
+
+
+def serve(bind: str, port: int, slots: int, token: str) -> int:
+    if not token:
+        token = secrets.token_hex(16)
+        print(f"[AGENT] token: {token}")
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer((bind, port), _Handler)
+    server.daemon_threads = True
+    server.agent_ref = RunnerAgent(token, slots)  # type: ignore[attr-defined]
+    print(f"[AGENT] listening on {bind}:{server.server_address[1]} slots={slots} pid={os.getpid()}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="ORCH remote runner agent")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--bind", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=7711)
+    p_serve.add_argument("--slots", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    p_serve.add_argument("--token", default=os.environ.get("ORCH_RUNNER_TOKEN", ""))
+    p_ping = sub.add_parser("ping")
+    p_ping.add_argument("--address", required=True)
+    p_ping.add_argument("--token", default=os.environ.get("ORCH_RUNNER_TOKEN", ""))
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        return serve(args.bind, args.port, args.slots, args.token)
+    try:
+        reply = request(args.address, args.token, "ping")
+    except (OSError, ValueError, EOFError) as exc:
+        print(f"[ERROR] {args.address}: {exc}")
+        return 2
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""Per-worker resource limits, applied by the dispatcher right after a worker starts.
+
+Keys (engines.<name> level, overridden per worker):
+  cpu_affinity    [0, 1, 2] or "0-3,8"      cores the worker tree may run on
+  nice            -20..19                     POSIX niceness; mapped to a priority class on Windows
+  priority_class  idle | below_normal | normal | above_normal | high   (Windows; overrides nice)
+  max_rss_mb      memory cap for the worker   POSIX: RLIMIT_DATA on Linux, RLIMIT_AS elsewhere
+                                              Windows: job-wide memory limit
+  max_open_files  RLIMIT_NOFILE               POSIX only
+
+Limits are set from the parent (sched_setaffinity / setpriority / prlimit on Linux, a Job
+Object on Windows) instead of a preexec_fn, which is unsafe with the dispatcher's threads.
+Processes the worker spawns inherit them.  `apply` reports what took effect so the
+manifest shows the real state, including settings a platform cannot enforce.
+"""
+from __future__ import annotations
+
+import os
+import sys
+from typing import Any
+
+LIMIT_KEYS = ("cpu_affinity", "nice", "priority_class", "max_rss_mb", "max_open_files")
+
+_PRIORITY_CLASSES = {
+    "idle": 0x00000040,
+    "below_normal": 0x00004000,
+    "normal": 0x00000020,
+    "above_normal": 0x00008000,
+    "high": 0x00000080,
+}
+
+
+def _parse_cpus(raw: Any) -> list[int]:
+    if isinstance(raw, int):
+        return [raw]
+    items = raw if isinstance(raw, list) else str(raw or "").split(",")
+    cpus: set[int] = set()
+    for item in items:
+        text = str(item).strip()
+        if not text:
+            continue
+        if "-" in text:
+            lo, hi = text.split("-", 1)
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(text))
+    return sorted(c for c in cpus if c >= 0)
+
+
+def resolve_limits(engine_cfg: dict[str, Any], worker: dict[str, Any]) -> dict[str, Any]:
+    """Validated limit settings for one worker; invalid values raise ValueError."""
+    out: dict[str, Any] = {}
+    for key in LIMIT_KEYS:
+        raw = worker.get(key, engine_cfg.get(key))
+        if raw is None or raw == "":
+            continue
+        if key == "cpu_affinity":
+            cpus = _parse_cpus(raw)
+            total = os.cpu_count() or 1
+            cpus = [c for c in cpus if c < total]
+            if not cpus:
+                raise ValueError(f"cpu_affinity {raw!r} names no available core (0-{total - 1})")
+            out[key] = cpus
+        elif key == "nice":
+            out[key] = max(-20, min(19, int(raw)))
+        elif key == "priority_class":
+            name = str(raw).strip().lower().replace("-", "_")
+            if name not in _PRIORITY_CLASSES:
+                raise ValueError(f"priority_class must be one of {', '.join(_PRIORITY_CLASSES)}")
+            out[key] = name
+        else:
+            value = int(raw)
+            if value <= 0:
+                raise ValueError(f"{key} must be positive")
+            out[key] = value
+    return out
+
+
+def _priority_from_nice(nice: int) -> str:
+    if nice >= 15:
+        return "idle"
+    if nice >= 5:
+        return "below_normal"
+    if nice <= -15:
+        return "high"
+    if nice <= -5:
+        return "above_normal"
+    return "normal"
+
+
+def apply(pid: int, limits: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+    """Apply `limits` to a running process; returns (applied, errors)."""
+    if not limits:
+        return {}, []
+    if os.name == "nt":
+        return _apply_windows(pid, limits)
+    return _apply_posix(pid, limits)
+
+
+def _apply_posix(pid: int, limits: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+    applied: dict[str, Any] = {}
+    errors: list[str] = []
+    if "cpu_affinity" in limits:
+        if hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(pid, limits["cpu_affinity"])
+                applied["cpu_affinity"] = limits["cpu_affinity"]
+            except OSError as exc:
+                errors.append(f"cpu_affinity: {exc}")
+        else:
+            errors.append(f"cpu_affinity: not supported on {sys.platform}")
+    if "nice" in limits:
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, limits["nice"])
+            applied["nice"] = limits["nice"]
+        except OSError as exc:
+            errors.append(f"nice: {exc}")
+    if "priority_class" in limits:
+        errors.append("priority_class: Windows only (use nice)")
+    rlimits = []
+    if "max_rss_mb" in limits:
+        rlimits.append(("max_rss_mb", "RLIMIT_DATA" if sys.platform.startswith("linux") else "RLIMIT_AS", limits["max_rss_mb"] * 1024 * 1024))
+    if "max_open_files" in limits:
+        rlimits.append(("max_open_files", "RLIMIT_NOFILE", limits["max_open_files"]))
+    if rlimits:
+        try:
+            import resource
+        except ImportError:
+            resource = None  # type: ignore[assignment]
+        prlimit = getattr(resource, "prlimit", None) if resource is not None else None
+        for key, name, value in rlimits:
+            if prlimit is None:
+                errors.append(f"{key}: prlimit not supported on {sys.platform}")
+                continue
+            try:
+                prlimit(pid, getattr(resource, name), (value, value))
+                applied[key] = limits[key]
+            except (OSError, ValueError) as exc:
+                errors.append(f"{key}: {exc}")
+    return applied, errors
+
+
+def _apply_windows(pid: int, limits: dict[str, Any]) -> tuple[dict[str, Any], list[str]]:
+    import ctypes
+    from ctypes import wintypes
+
+    applied: dict[str, Any] = {}
+    errors: list[str] = []
+    if "max_open_files" in limits:
+        errors.append("max_open_files: not supported on Windows")
+    priority = limits.get("priority_class") or (_priority_from_nice(limits["nice"]) if "nice" in limits else "")
+
+    class IO_COUNTERS(ctypes.Structure):
+        _fields_ = [(n, ctypes.c_ulonglong) for n in (
+            "ReadOperationCount", "WriteOperationCount", "OtherOperationCount",
+            "ReadTransferCount", "WriteTransferCount", "OtherTransferCount")]
+
+    class BASIC_LIMIT(ctypes.Structure):
+        _fields_ = [
+            ("PerProcessUserTimeLimit", ctypes.c_int64),
+            ("PerJobUserTimeLimit", ctypes.c_int64),
+            ("LimitFlags", wintypes.DWORD),
+            ("MinimumWorkingSetSize", ctypes.c_size_t),
+            ("MaximumWorkingSetSize", ctypes.c_size_t),
+            ("ActiveProcessLimit", wintypes.DWORD),
+            ("Affinity", ctypes.c_size_t),
+            ("PriorityClass", wintypes.DWORD),
+            ("SchedulingClass", wintypes.DWORD),
+        ]
+
+    class EXTENDED_LIMIT(ctypes.Structure):
+        _fields_ = [
+            ("BasicLimitInformation", BASIC_LIMIT),
+            ("IoInfo", IO_COUNTERS),
+            ("ProcessMemoryLimit", ctypes.c_size_t),
+            ("JobMemoryLimit", ctypes.c_size_t),
+            ("PeakProcessMemoryUsed", ctypes.c_size_t),
+            ("PeakJobMemoryUsed", ctypes.c_size_t),
+        ]
+
+    info = EXTENDED_LIMIT()
+    flags = 0
+    if "cpu_affinity" in limits:
+        flags |= 0x00000010  # JOB_OBJECT_LIMIT_AFFINITY
+        info.BasicLimitInformation.Affinity = sum(1 << c for c in limits["cpu_affinity"])
+    if priority:
+        flags |= 0x00000020  # JOB_OBJECT_LIMIT_PRIORITY_CLASS
+        info.BasicLimitInformation.PriorityClass = _PRIORITY_CLASSES[priority]
+    if "max_rss_mb" in limits:
+        flags |= 0x00000200  # JOB_OBJECT_LIMIT_JOB_MEMORY
+        info.JobMemoryLimit = limits["max_rss_mb"] * 1024 * 1024
+    info.BasicLimitInformation.LimitFlags = flags
+    if not flags:
+        return applied, errors
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    job = kernel32.CreateJobObjectW(None, None)
+    if not job:
+        return applied, errors + [f"job object: error {ctypes.get_last_error()}"]
+    proc = None
+    try:
+        if not kernel32.SetInformationJobObject(job, 9, ctypes.byref(info), ctypes.sizeof(info)):
+            return applied, errors + [f"job limits: error {ctypes.get_last_error()}"]
+        proc = kernel32.OpenProcess(0x0100 | 0x0001, False, pid)  # PROCESS_SET_QUOTA | PROCESS_TERMINATE
+        if not proc or not kernel32.AssignProcessToJobObject(job, proc):
+            return applied, errors + [f"assign job: error {ctypes.get_last_error()}"]
+        for key in ("cpu_affinity", "max_rss_mb"):
+            if key in limits:
+                applied[key] = limits[key]
+        if priority:
+            applied["priority_class"] = priority
+        return applied, errors
+    finally:
+        if proc:
+            kernel32.CloseHandle(proc)
+        # No KILL_ON_JOB_CLOSE: the job (and its limits) lives on with the worker tree
+        # after the dispatcher closes its handle or exits.
+        kernel32.CloseHandle(job)
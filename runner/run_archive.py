@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""Run archive: previous runs are set aside instantly and compressed in the background.
+
+`set_aside` renames a finished run dir to runs/.archive/<name>.<stamp>.pending (a rename
+on the same volume, so starting a run never waits on deleting log trees).  A detached
+`python run_archive.py --runs-root ...` then packs every pending dir into one
+<name>.<stamp>.zip (deflate; members stay individually readable) and applies the
+retention policy (count / age / total size).  `ArchivedRun` reads single members
+lazily for the dashboard, from the zip or from a dir that is still pending.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import zipfile
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from run_journal import EVENTS_FILE, MANIFEST_FILE, apply_event
+
+ARCHIVE_DIRNAME = ".archive"
+PENDING_SUFFIX = ".pending"
+_PACKING_SUFFIX = ".packing"
+_STALE_PACKING_SEC = 3600.0
+
+DEFAULT_POLICY: dict[str, Any] = {"enabled": True, "keep_runs": 20, "max_age_days": 30, "max_total_mb": 2048}
+
+
+def archive_root(runs_root: Path) -> Path:
+    return Path(runs_root) / ARCHIVE_DIRNAME
+
+
+def archive_policy(defaults: dict[str, Any]) -> dict[str, Any]:
+    """defaults.archive merged over DEFAULT_POLICY; `archive: false` disables archiving."""
+    raw = defaults.get("archive", {})
+    policy = dict(DEFAULT_POLICY)
+    if isinstance(raw, dict):
+        policy.update(raw)
+    elif raw is False:
+        policy["enabled"] = False
+    return policy
+
+
+def set_aside(run_dir: Path, runs_root: Path) -> Path | None:
+    """Move `run_dir` into the archive as a pending dir; None if it is missing or empty,
+    or if the rename failed (e.g. Windows refuses while a worker still holds a log)."""
+    run_dir = Path(run_dir)
+    try:
+        if not run_dir.is_dir() or not any(run_dir.iterdir()):
+            return None
+        root = archive_root(runs_root)
+        root.mkdir(parents=True, exist_ok=True)
+        marker = run_dir / MANIFEST_FILE
+        ts = marker.stat().st_mtime if marker.exists() else time.time()
+        stem = f"{run_dir.name}.{time.strftime('%Y%m%d_%H%M%S', time.localtime(ts))}"
+        candidate = stem
+        n = 1
+        while (root / f"{candidate}{PENDING_SUFFIX}").exists() or (root / f"{candidate}.zip").exists():
+            n += 1
+            candidate = f"{stem}-{n}"
+        target = root / f"{candidate}{PENDING_SUFFIX}"
+        os.replace(run_dir, target)
+        return target
+    except OSError:
+        return None
+
+
+def _pack(src: Path, dest: Path) -> None:
+    tmp = dest.with_name(dest.name + ".tmp")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+        for path in sorted(src.rglob("*")):
+            if path.is_file():
+                zf.write(path, path.relative_to(src).as_posix())
+    os.replace(tmp, dest)
+    # Keep the run's own time on the archive: retention and listings sort by it.
+    marker = src / MANIFEST_FILE
+    ts = marker.stat().st_mtime if marker.exists() else src.stat().st_mtime
+    os.utime(dest, (ts, ts))
+    shutil.rmtree(src, ignore_errors=True)
+
+
+def compress_pending(runs_root: Path) -> list[Path]:
+    """Pack every pending dir.  A dir is claimed by renaming it, so concurrent archivers
+    never pack the same run; claims left by a crashed archiver are retaken after an hour."""
+    root = archive_root(runs_root)
+    if not root.is_dir():
+        return []
+    packed: list[Path] = []
+    now = time.time()
+    for child in sorted(root.iterdir()):
+        if not child.is_dir():
+            continue
+        if child.name.endswith(PENDING_SUFFIX):
+            stem = child.name[: -len(PENDING_SUFFIX)]
+        elif f"{_PACKING_SUFFIX}." in child.name and now - child.stat().st_mtime > _STALE_PACKING_SEC:
+            stem = child.name.rpartition(f"{_PACKING_SUFFIX}.")[0]
+        else:
+            continue
+        claimed = root / f"{stem}{_PACKING_SUFFIX}.{os.getpid()}"
+        try:
+            os.replace(child, claimed)
+        except OSError:
+            continue
+        dest = root / f"{stem}.zip"
+        try:
+            _pack(claimed, dest)
+            packed.append(dest)
+        except Exception as exc:
+            print(f"[WARN] archive {stem}: {exc}")
+            try:
+                os.replace(claimed, root / f"{stem}{PENDING_SUFFIX}")
+            except OSError:
+                pass
+    return packed
+
+
+def apply_retention(runs_root: Path, policy: dict[str, Any]) -> list[Path]:
+    """Delete the oldest archives beyond keep_runs, older than max_age_days, or while the
+    total exceeds max_total_mb.  A limit of 0 disables that rule."""
+    root = archive_root(runs_root)
+    if not root.is_dir():
+        return []
+    archives = sorted(root.glob("*.zip"), key=lambda p: p.stat().st_mtime, reverse=True)
+    keep_runs = int(policy.get("keep_runs", 0) or 0)
+    max_age = float(policy.get("max_age_days", 0) or 0) * 86400.0
+    max_bytes = float(policy.get("max_total_mb", 0) or 0) * 1024 * 1024
+    now = time.time()
+    removed: list[Path] = []
+    total = 0
+    for idx, path in enumerate(archives):
+        st = path.stat()
+        total += st.st_size
+        if (
+            (keep_runs and idx >= keep_runs)
+            or (max_age and now - st.st_mtime > max_age)
+            or (max_bytes and total > max_bytes and idx > 0)
+        ):
+            try:
+                path.unlink()
+                removed.append(path)
+                total -= st.st_size
+            except OSError:
+                pass
+    return removed
+
+
+def list_archived(runs_root: Path) -> list[tuple[str, Path]]:
+    """(stem, path) for every archived run, newest first; pending dirs included."""
+    root = archive_root(runs_root)
+    if not root.is_dir():
+        return []
+    out: list[tuple[str, Path]] = []
+    for child in root.iterdir():
+        if child.suffix == ".zip" and child.is_file():
+            out.append((child.stem, child))
+        elif child.name.endswith(PENDING_SUFFIX) and child.is_dir():
+            out.append((child.name[: -len(PENDING_SUFFIX)], child))
+    out.sort(key=lambda item: item[1].stat().st_mtime, reverse=True)
+    return out
+
+
+class ArchivedRun:
+    """Lazy member access for one archived run; nothing is extracted to disk."""
+
+    def __init__(self, runs_root: Path, stem: str) -> None:
+        root = archive_root(runs_root)
+        self.stem = stem
+        self.path: Path | None = None
+        if not self._member_ok(stem) or Path(stem).name != stem:
+            return  # a bare name inside the archive, never a path out of it
+        for candidate in (root / f"{stem}.zip", root / f"{stem}{PENDING_SUFFIX}"):
+            if candidate.exists():
+                self.path = candidate
+                break
+
+    @property
+    def exists(self) -> bool:
+        return self.path is not None
+
+    @staticmethod
+    def _member_ok(name: str) -> bool:
+        return bool(name) and "/" not in name and "\\" not in name and name not in {".", ".."}
+
+    def read(self, name: str) -> bytes | None:
+        if self.path is None or not self._member_ok(name):
+            return None
+        try:
+            if self.path.is_dir():
+                return (self.path / name).read_bytes()
+            with zipfile.ZipFile(self.path) as zf:
+                return zf.read(name)
+        except (KeyError, OSError, zipfile.BadZipFile):
+            return None
+
+    def tail(self, name: str, max_bytes: int = 2_000_000) -> bytes | None:
+        """Last `max_bytes` of a member, streamed so a huge log is never held whole."""
+        if self.path is None or not self._member_ok(name):
+            return None
+        try:
+            if self.path.is_dir():
+                with (self.path / name).open("rb") as f:
+                    f.seek(0, os.SEEK_END)
+                    f.seek(max(0, f.tell() - max_bytes))
+                    return f.read()
+            keep: deque[bytes] = deque()
+            size = 0
+            with zipfile.ZipFile(self.path) as zf, zf.open(name) as f:
+                while True:
+                    chunk = f.read(262144)
+                    if not chunk:
+                        break
+                    keep.append(chunk)
+                    size += len(chunk)
+                    while size - len(keep[0]) >= max_bytes:
+                        size -= len(keep.popleft())
+            return b"".join(keep)[-max_bytes:]
+        except (KeyError, OSError, zipfile.BadZipFile):
+            return None
+
+    def manifest(self) -> dict[str, Any] | None:
+        """Snapshot plus the journal events after its offset, as run_journal.read_manifest."""
+        raw = self.read(MANIFEST_FILE)
+        if raw is None:
+            return None
+        try:
+            manifest = json.loads(raw.decode("utf-8-sig", errors="replace"))
+        except ValueError:
+            return None
+        if not isinstance(manifest, dict):
+            return None
+        events = self.read(EVENTS_FILE) or b""
+        for line in events[int(manifest.get("journal_offset", 0) or 0) :].splitlines():
+            try:
+                apply_event(manifest, json.loads(line))
+            except ValueError:
+                continue
+        return manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compress pending runs and apply archive retention")
+    parser.add_argument("--runs-root", required=True)
+    parser.add_argument("--keep-runs", type=int, default=DEFAULT_POLICY["keep_runs"])
+    parser.add_argument("--max-age-days", type=float, default=DEFAULT_POLICY["max_age_days"])
+    parser.add_argument("--max-total-mb", type=float, default=DEFAULT_POLICY["max_total_mb"])
+    args = parser.parse_args()
+    runs_root = Path(args.runs_root)
+    for path in compress_pending(runs_root):
+        print(f"[ARCHIVE] {path}")
+    policy = {"keep_runs": args.keep_runs, "max_age_days": args.max_age_days, "max_total_mb": args.max_total_mb}
+    for path in apply_retention(runs_root, policy):
+        print(f"[ARCHIVE] expired {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""Append-only run journal (events.jsonl) plus an atomically written manifest snapshot.
+
+The dispatcher appends one JSON line per event (launched, exited, retried, tokens, ...)
+and periodically rewrites manifest.json via temp file + rename.  The snapshot records the
+journal byte offset it already contains, so a reader loads the snapshot and replays only the
+events after that offset.  Readers that poll keep their own offset and consume O(new events).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+EVENTS_FILE = "events.jsonl"
+MANIFEST_FILE = "manifest.json"
+
+# Events that (re)place a whole row in a manifest list, keyed by task_id.
+_ROW_EVENTS = {"launched": "started", "failed": "failed", "manual": "manual", "queued": "queued"}
+
+
+def apply_event(manifest: dict[str, Any], event: dict[str, Any]) -> None:
+    """Fold one journal event into a manifest dict (used by the writer and every reader)."""
+    kind = str(event.get("event", ""))
+    task_id = event.get("task_id")
+    data = event.get("data") if isinstance(event.get("data"), dict) else {}
+    if kind == "run":
+        manifest.update(data)
+        return
+    if kind in _ROW_EVENTS:
+        rows = manifest.setdefault(_ROW_EVENTS[kind], [])
+        for i, row in enumerate(rows):
+            if isinstance(row, dict) and row.get("task_id") == task_id:
+                rows[i] = data
+                break
+        else:
+            rows.append(data)
+        if kind == "launched":
+            manifest["queued"] = [q for q in manifest.get("queued", []) if q.get("task_id") != task_id]
+        return
+    if kind == "dequeued":
+        manifest["queued"] = [q for q in manifest.get("queued", []) if q.get("task_id") != task_id]
+        return
+    # exited / retried / tokens / updated / ...: merge fields into the started row.
+    for row in manifest.get("started", []):
+        if isinstance(row, dict) and row.get("task_id") == task_id:
+            row.update(data)
+            return
+
+
+def read_events(run_dir: Path, offset: int = 0) -> tuple[list[dict[str, Any]], int]:
+    """Complete journal lines after byte `offset`, and the offset to resume from.
+
+    A journal shorter than `offset` belongs to a newer run: ([], 0) tells the caller to
+    start over (and to reload the snapshot if it folds events into one).
+    """
+    path = Path(run_dir) / EVENTS_FILE
+    try:
+        with path.open("rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if offset > size:
+                return [], 0
+            f.seek(offset)
+            data = f.read()
+    except Exception:
+        return [], 0
+    end = data.rfind(b"\n")
+    if end < 0:
+        return [], offset
+    events: list[dict[str, Any]] = []
+    for line in data[: end + 1].splitlines():
+        try:
+            events.append(json.loads(line.decode("utf-8", errors="replace")))
+        except Exception:
+            continue
+    return events, offset + end + 1
+
+
+def read_manifest(run_dir: Path) -> dict[str, Any] | None:
+    """Snapshot + journal replay; None when the run has no manifest yet."""
+    try:
+        manifest = json.loads((Path(run_dir) / MANIFEST_FILE).read_text(encoding="utf-8-sig"))
+    except Exception:
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    events, _offset = read_events(run_dir, int(manifest.get("journal_offset", 0) or 0))
+    for event in events:
+        apply_event(manifest, event)
+    return manifest
+
+
+def _copy_manifest(manifest: dict[str, Any]) -> dict[str, Any]:
+    """Copy deep enough for apply_event: top-level lists and their row dicts are new,
+    nested values (which events only replace, never mutate) are shared."""
+    copied = dict(manifest)
+    for key, value in copied.items():
+        if isinstance(value, list):
+            copied[key] = [dict(row) if isinstance(row, dict) else row for row in value]
+    return copied
+
+
+class ManifestReader:
+    """Cached read_manifest for pollers: re-reads the snapshot only when it changes and
+    otherwise replays just the journal bytes appended since the previous call.
+    New events are folded into a copy that replaces the cached dict, so a manifest
+    returned earlier never changes under its caller; treat it as read-only all the same."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cache: dict[str, tuple[float, int, dict[str, Any]]] = {}
+
+    def read(self, run_dir: Path) -> dict[str, Any] | None:
+        key = str(Path(run_dir).resolve())
+        try:
+            mtime = (Path(run_dir) / MANIFEST_FILE).stat().st_mtime
+        except Exception:
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None or cached[0] != mtime:
+                try:
+                    manifest = json.loads((Path(run_dir) / MANIFEST_FILE).read_text(encoding="utf-8-sig"))
+                except Exception:
+                    return cached[2] if cached else None
+                if not isinstance(manifest, dict):
+                    return None
+                offset = int(manifest.get("journal_offset", 0) or 0)
+            else:
+                _mtime, offset, manifest = cached
+            events, new_offset = read_events(run_dir, offset)
+            if new_offset < offset:
+                # Journal was truncated by a new run; wait for its first snapshot.
+                self._cache.pop(key, None)
+                return manifest
+            if events and cached is not None and manifest is cached[2]:
+                manifest = _copy_manifest(manifest)
+            for event in events:
+                apply_event(manifest, event)
+            self._cache[key] = (mtime, new_offset, manifest)
+            return manifest
+
+
+class RunJournal:
+    """Writer side, owned by the dispatcher.  Every mutation goes through `emit`, which
+    applies the event to the in-memory manifest and appends it to events.jsonl;
+    `snapshot` rewrites manifest.json atomically at most every `snapshot_interval` s."""
+
+    def __init__(self, run_dir: Path, manifest: dict[str, Any], snapshot_interval: float = 1.0) -> None:
+        self.run_dir = Path(run_dir)
+        self.manifest = manifest
+        self.snapshot_interval = max(0.0, float(snapshot_interval))
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._dirty = True
+        self._last_snapshot = 0.0
+        # A new run starts a new journal; readers holding a larger offset start over.
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND | getattr(os, "O_BINARY", 0)
+        self._fd = os.open(str(self.run_dir / EVENTS_FILE), flags, 0o644)
+        self.offset = 0
+
+    def emit(self, kind: str, task_id: str | None = None, data: dict[str, Any] | None = None) -> None:
+        """Row events store `data` itself in the manifest, so callers may keep a reference
+        to it; any later change must be emitted again to reach the journal."""
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "ts": round(time.time(), 3), "event": kind, "task_id": task_id, "data": data or {}}
+            line = (json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+            os.write(self._fd, line)
+            self.offset += len(line)
+            apply_event(self.manifest, event)
+            self._dirty = True
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def snapshot(self, force: bool = False) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if not force and (not self._dirty or now - self._last_snapshot < self.snapshot_interval):
+                return False
+            self.manifest["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            self.manifest["journal_offset"] = self.offset
+            body = json.dumps(self.manifest, ensure_ascii=False, separators=(",", ":"))
+            target = self.run_dir / MANIFEST_FILE
+            tmp = self.run_dir / f".{MANIFEST_FILE}.{os.getpid()}.tmp"
+            tmp.write_text(body, encoding="utf-8")
+            for attempt in range(5):
+                try:
+                    os.replace(tmp, target)
+                    break
+                except PermissionError:
+                    # Windows refuses the rename while a reader holds the file open.
+                    if attempt == 4:
+                        raise
+                    time.sleep(0.05 * (attempt + 1))
+            self._dirty = False
+            self._last_snapshot = now
+            return True
+
+    def close(self) -> None:
+        with self._lock:
+            self.snapshot(force=True)
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
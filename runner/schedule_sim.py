@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""History for `dispatch.py --simulate`: expected duration and tokens of each lane.
+
+Samples come from successful lanes in earlier manifests (current run dirs and the most
+recent archives) and from the orch's outcome index.  A lane is predicted from, in order:
+its own last successful run, the median of its engine+role, the median of its engine,
+the median of everything, or DEFAULT_DURATION_SEC.  The dispatcher replays its real
+admission logic against these numbers on a virtual clock; this module only supplies
+the numbers and renders the result.
+"""
+from __future__ import annotations
+
+import statistics
+from pathlib import Path
+from typing import Any
+
+import run_archive
+from run_journal import read_manifest
+
+DEFAULT_DURATION_SEC = 300.0
+MAX_ARCHIVES = 30
+
+
+def _family(engine: str) -> str:
+    e = (engine or "").strip().lower()
+    return "claude" if e in {"claude", "claude-cli"} else e
+
+
+class History:
+    def __init__(self) -> None:
+        self.samples: list[dict[str, Any]] = []
+        self.runs = 0
+        self.tasks: dict[str, dict[str, Any]] = {}
+
+    def add_manifest(self, manifest: dict[str, Any]) -> None:
+        added = False
+        for row in manifest.get("started", []):
+            if not isinstance(row, dict) or row.get("state") == "CACHED" or manifest.get("dry_run"):
+                continue
+            if row.get("exit_code") != 0 or row.get("duration_sec") is None:
+                continue
+            usage = row.get("token_usage") if isinstance(row.get("token_usage"), dict) else {}
+            self.samples.append(
+                {
+                    "engine": _family(str(row.get("engine", ""))),
+                    "role": str(row.get("role", "")),
+                    "duration": float(row["duration_sec"]),
+                    "tokens": usage.get("total_tokens"),
+                    "cost_usd": usage.get("cost_usd"),
+                }
+            )
+            added = True
+        self.runs += int(added)
+
+    @classmethod
+    def load(cls, runs_root: Path, task_rows: dict[str, dict[str, Any]] | None = None) -> "History":
+        """Samples from every run dir under `runs_root` and its newest archives; `task_rows`
+        are outcome-index rows for the orch being simulated."""
+        hist = cls()
+        runs_root = Path(runs_root)
+        if runs_root.is_dir():
+            for child in sorted(runs_root.iterdir()):
+                if child.is_dir() and not child.name.startswith("."):
+                    hist.add_manifest(read_manifest(child) or {})
+        for stem, _path in run_archive.list_archived(runs_root)[:MAX_ARCHIVES]:
+            hist.add_manifest(run_archive.ArchivedRun(runs_root, stem).manifest() or {})
+        for task_id, row in (task_rows or {}).items():
+            if row and row.get("state") == "DONE" and row.get("duration_sec") is not None:
+                hist.tasks[task_id] = row
+        return hist
+
+    def _median(self, key: str, engine: str = "", role: str = "") -> tuple[float | None, int]:
+        values = [
+            float(s[key])
+            for s in self.samples
+            if s.get(key) is not None and (not engine or s["engine"] == engine) and (not role or s["role"] == role)
+        ]
+        return (statistics.median(values), len(values)) if values else (None, 0)
+
+    def predict(self, task_id: str, engine: str, role: str) -> dict[str, Any]:
+        """{"duration", "tokens", "cost_usd", "source"} for one lane."""
+        family = _family(engine)
+        out: dict[str, Any] = {"duration": None, "tokens": None, "cost_usd": None, "source": ""}
+        own = self.tasks.get(task_id)
+        if own is not None:
+            out.update(duration=float(own["duration_sec"]), tokens=own.get("tokens"), source="task history")
+        levels = ((f"{family}/{role} median", family, role), (f"{family} median", family, ""), ("all-runs median", "", ""))
+        for label, eng, rl in levels:
+            if out["duration"] is None:
+                value, n = self._median("duration", eng, rl)
+                if value is not None:
+                    out.update(duration=value, source=f"{label} of {n}")
+            if out["tokens"] is None:
+                out["tokens"] = self._median("tokens", eng, rl)[0]
+            if out["cost_usd"] is None:
+                out["cost_usd"] = self._median("cost_usd", eng, rl)[0]
+        if out["duration"] is None:
+            out.update(duration=DEFAULT_DURATION_SEC, source="default")
+        if out["tokens"] is not None:
+            out["tokens"] = int(out["tokens"])
+        return out
+
+
+def fmt_sec(value: float) -> str:
+    value = int(round(value))
+    hours, rest = divmod(value, 3600)
+    minutes, sec = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{sec:02d}" if hours else f"{minutes}:{sec:02d}"
+
+
+def timeline_lines(rows: list[dict[str, Any]], makespan: float, width: int = 40) -> list[str]:
+    """One ASCII bar per lane, scaled to the makespan."""
+    if not rows:
+        return []
+    scale = width / makespan if makespan > 0 else 0.0
+    name_w = max(len(r["task_id"]) for r in rows)
+    out: list[str] = []
+    for row in sorted(rows, key=lambda r: (r["start"], r["task_id"])):
+        lo = int(row["start"] * scale)
+        hi = max(lo + 1, int(round(row["end"] * scale))) if row["end"] > row["start"] else lo
+        bar = " " * lo + ("#" * (hi - lo) if hi > lo else "|")
+        out.append(f"{row['task_id']:<{name_w}} {bar:<{width}} {fmt_sec(row['start'])} -> {fmt_sec(row['end'])}")
+    return out
+
+
+def peak_concurrency(rows: list[dict[str, Any]]) -> int:
+    points = sorted([(r["start"], 1) for r in rows if r["end"] > r["start"]] + [(r["end"], -1) for r in rows if r["end"] > r["start"]])
+    peak = level = 0
+    for _, step in points:
+        level += step
+        peak = max(peak, level)
+    return peak
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""Scope-overlap scheduling: lanes whose `scope_paths` overlap never run at the same time.
+
+Scope entries are workspace-relative files, directories or globs ("server/api/*.py").
+Two entries overlap when one path contains the other, or when a glob can match the
+other entry.  The check is conservative: globs whose literal prefixes are nested count
+as overlapping, since the files they match are only known at run time.
+
+The dispatcher admits a lane only when no overlapping lane is running and none ahead of
+it in the queue is still waiting, so conflicting lanes run in plan order and everything
+else stays parallel.  `waves` renders the same rule as a static plan for --dry-run.
+Lanes without scope_paths, and worktree-isolated lanes, are never held back.
+"""
+from __future__ import annotations
+
+import os
+from fnmatch import fnmatchcase
+from typing import Any
+
+_GLOB_CHARS = set("*?[")
+
+
+def _norm(path: str) -> str:
+    text = str(path).strip().replace("\\", "/")
+    while text.startswith("./"):
+        text = text[2:]
+    text = "/".join(part for part in text.split("/") if part and part != ".")
+    return text.lower() if os.name == "nt" else text
+
+
+def scope_patterns(worker: dict[str, Any]) -> list[str]:
+    raw = worker.get("scope_paths") or []
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list):
+        return []
+    return sorted({p for p in (_norm(item) for item in raw) if p})
+
+
+def _is_glob(path: str) -> bool:
+    return any(c in _GLOB_CHARS for c in path)
+
+
+def static_prefix(pattern: str) -> str:
+    parts: list[str] = []
+    for part in pattern.split("/"):
+        if any(c in _GLOB_CHARS for c in part):
+            break
+        parts.append(part)
+    return "/".join(parts)
+
+
+def _nested(a: str, b: str) -> bool:
+    return not a or not b or a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def paths_overlap(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    glob_a, glob_b = _is_glob(a), _is_glob(b)
+    if not glob_a and not glob_b:
+        return _nested(a, b)
+    if glob_a and glob_b:
+        return _nested(static_prefix(a), static_prefix(b))
+    pattern, literal = (a, b) if glob_a else (b, a)
+    prefix = static_prefix(pattern)
+    if not _nested(prefix, literal):
+        return False
+    if prefix and literal != prefix and not literal.startswith(prefix + "/"):
+        return True  # the literal is a directory above the glob: it contains the matches
+    # A literal below the glob's prefix overlaps if it (or, for a directory, a file
+    # inside it) can match.
+    return fnmatchcase(literal, pattern) or "." not in literal.rsplit("/", 1)[-1]
+
+
+def conflict_graph(scopes: dict[str, list[str]]) -> dict[str, dict[str, str]]:
+    """task_id -> {other task_id: "its path <> other path"} for every overlapping pair."""
+    graph: dict[str, dict[str, str]] = {}
+    ids = [task_id for task_id, paths in scopes.items() if paths]
+    for i, a in enumerate(ids):
+        for b in ids[i + 1 :]:
+            hit = next(((pa, pb) for pa in scopes[a] for pb in scopes[b] if paths_overlap(pa, pb)), None)
+            if hit is not None:
+                graph.setdefault(a, {})[b] = f"{hit[0]} <> {hit[1]}"
+                graph.setdefault(b, {})[a] = f"{hit[1]} <> {hit[0]}"
+    return graph
+
+
+def waves(order: list[str], graph: dict[str, dict[str, str]]) -> list[list[str]]:
+    """Group lanes (in plan order) so no wave holds two overlapping lanes; each lane goes
+    one wave after the last overlapping lane ahead of it."""
+    wave_of: dict[str, int] = {}
+    for task_id in order:
+        earlier = [wave_of[other] for other in graph.get(task_id, {}) if other in wave_of]
+        wave_of[task_id] = max(earlier, default=-1) + 1
+    out: list[list[str]] = [[] for _ in range(max(wave_of.values(), default=-1) + 1)]
+    for task_id in order:
+        out[wave_of[task_id]].append(task_id)
+    return out
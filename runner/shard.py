@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Sharded tasks (`shard`): split one large scope over several sibling lanes.
+
+A worker with `"shard": 4` (or `{"count": 4, "by": "lines", "review": true}`) is
+expanded into up to four lanes, `<task>.1` .. `<task>.4`.  The files its `scope_paths`
+name are dealt out so every shard carries about the same bytes ("size", the default) or
+lines ("lines"), largest file first onto the lightest shard.  Each shard renders the
+worker's own prompt template with its files as {{SCOPE_PATHS}} and its id as
+{{TASK_ID}}, and the goal notes which shard it is.  Shards have disjoint scopes, so the
+scope rule lets them run side by side.
+
+`"review": true` (or a dict of worker overrides such as engine or prompt_file) adds
+`<task>.review`, which depends on every shard and covers the whole scope.  Dependents of
+`<task>` wait for the review lane, or for every shard when there is none.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import memo_cache
+import scope_plan
+
+SHARD_SEP = "."
+REVIEW_SUFFIX = "review"
+SHARD_BY = ("size", "lines")
+MAX_SHARDS = 16
+
+
+def shard_policy(worker: dict[str, Any]) -> dict[str, Any]:
+    """{"count", "by", "review"}; count 0 when the worker is not sharded.  Raises ValueError."""
+    raw = worker.get("shard")
+    policy: dict[str, Any] = {"count": 0, "by": "size", "review": False}
+    if isinstance(raw, dict):
+        policy.update({k: raw[k] for k in ("count", "by", "review") if k in raw})
+    elif raw and not isinstance(raw, bool):
+        policy["count"] = raw
+    try:
+        policy["count"] = max(0, min(MAX_SHARDS, int(policy["count"] or 0)))
+    except (TypeError, ValueError):
+        raise ValueError(f"shard count must be a number, not {policy['count']!r}") from None
+    policy["by"] = str(policy["by"] or "size").strip().lower()
+    if policy["by"] not in SHARD_BY:
+        raise ValueError(f"shard by must be one of {', '.join(SHARD_BY)}, not {policy['by']!r}")
+    return policy
+
+
+def _weight(path: Path, by: str) -> int:
+    try:
+        if by == "lines":
+            with path.open("rb") as f:
+                return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 16), b"")) + 1
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def partition(weights: dict[str, int], count: int) -> list[list[str]]:
+    """Split files into at most `count` non-empty shards of similar total weight: largest
+    file first onto the lightest shard (ties by path, so the split is deterministic)."""
+    bins: list[tuple[int, list[str]]] = [(0, []) for _ in range(max(1, min(count, len(weights))))]
+    for rel in sorted(weights, key=lambda r: (-weights[r], r)):
+        idx = min(range(len(bins)), key=lambda i: (bins[i][0], i))
+        total, files = bins[idx]
+        bins[idx] = (total + weights[rel], files + [rel])
+    return [sorted(files) for _, files in bins if files]
+
+
+def expand(
+    workers: list[Any], workspace: str
+) -> tuple[list[Any], dict[str, dict[str, Any]], list[str]]:
+    """(workers, groups, notes): sharded workers replaced by their shard lanes (and review
+    lane), and one group per sharded task {"members", "review", "after", "by", "shards"}."""
+    out: list[Any] = []
+    groups: dict[str, dict[str, Any]] = {}
+    notes: list[str] = []
+    for worker in workers:
+        if not isinstance(worker, dict) or not worker.get("shard") or not bool(worker.get("enabled", True)):
+            out.append(worker)
+            continue
+        task_id = str(worker.get("task_id", "UNKNOWN"))
+        try:
+            policy = shard_policy(worker)
+        except ValueError as exc:
+            notes.append(f"[WARN] {task_id}: {exc}; running unsharded")
+            policy = {"count": 0}
+        patterns = scope_plan.scope_patterns(worker)
+        weights: dict[str, int] = {}
+        if policy["count"] > 1 and patterns:
+            for rel, path in memo_cache.scope_files(Path(workspace), patterns):
+                if path.is_file():
+                    weights[rel] = _weight(path, policy["by"])
+                if len(weights) > memo_cache.MAX_FILES:
+                    break
+        if policy["count"] > 1 and len(weights) > memo_cache.MAX_FILES:
+            notes.append(f"[WARN] {task_id}: scope has over {memo_cache.MAX_FILES} files; running unsharded")
+            weights = {}
+        parts = partition(weights, policy["count"]) if policy["count"] > 1 and weights else []
+        if len(parts) < 2:
+            if policy["count"] > 1 and not weights:
+                notes.append(f"[SHARD] {task_id}: no files found in scope_paths; running unsharded")
+            unsharded = dict(worker)
+            unsharded.pop("shard", None)
+            out.append(unsharded)
+            continue
+        goal = str(worker.get("goal", ""))
+        members: list[str] = []
+        rows: list[dict[str, Any]] = []
+        for idx, files in enumerate(parts, start=1):
+            shard_id = f"{task_id}{SHARD_SEP}{idx}"
+            lane = {
+                **worker,
+                "task_id": shard_id,
+                "scope_paths": files,
+                "goal": (
+                    f"{goal}\n(Shard {idx}/{len(parts)} of {task_id}: change only the files in this scope;"
+                    " sibling lanes cover the rest.)"
+                ).strip(),
+                "shard_of": task_id,
+            }
+            lane.pop("shard", None)
+            out.append(lane)
+            members.append(shard_id)
+            rows.append({"task_id": shard_id, "files": len(files), "weight": sum(weights[f] for f in files)})
+        review_id = ""
+        review = policy["review"]
+        if review:
+            review_id = f"{task_id}{SHARD_SEP}{REVIEW_SUFFIX}"
+            lane = {
+                **worker,
+                "task_id": review_id,
+                "goal": (
+                    f"Review the work of {', '.join(members)} on: {goal}\n"
+                    "Check the shards fit together (shared names, imports, call sites), fix what does not,"
+                    " and verify the whole scope."
+                ),
+                "depends_on": members,
+                "shard_of": task_id,
+                **(review if isinstance(review, dict) else {}),
+            }
+            # The shards already waited for the task's own dependencies; one review, not a race.
+            lane.pop("shard", None)
+            lane.pop("hedge", None)
+            out.append(lane)
+        groups[task_id] = {
+            "members": members,
+            "review": review_id,
+            "after": [review_id] if review_id else list(members),
+            "by": policy["by"],
+            "shards": rows,
+        }
+        notes.append(
+            f"[SHARD] {task_id}: {len(weights)} files in {len(parts)} shards by {policy['by']}"
+            f" ({', '.join(str(r['weight']) for r in rows)})" + (f" + {review_id}" if review_id else "")
+        )
+    return out, groups, notes
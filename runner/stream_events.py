@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""Worker output events: structured facts from <task>.log go to <task>.events.jsonl.
+
+Workers write their log themselves (stdout/stderr are the log file), and `follow` tails
+it from the attempt's offset, either on a `LogFollower` thread (when the dispatcher
+supervises the run) or in a detached tap process (`python stream_events.py --log ...
+--pid ...`) that stops once the worker has exited.  A follower that dies only stops the
+sidecar; the worker never writes into a pipe nobody reads.  Every line is parsed exactly
+once by an engine-aware `StreamExtractor`; consumers read the sidecar with
+`SidecarReader` instead of regex-scanning log tails.
+
+Sidecar lines: {"ts", "kind", ...} with kind one of
+  tool    {"name", "detail"}             a tool / shell call
+  edit    {"path", "op"}                 a file the worker changed
+  tokens  {"usage": {...total_tokens}}   token usage reported by the CLI; "partial": true
+                                         while a claude stream-json run is still going
+  result  {"is_error", "text"}           final result object (claude/gemini JSON)
+  error   {"text"}                       an error line
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import proc_tree
+
+SIDECAR_SUFFIX = ".events.jsonl"
+_MAX_LINE = 8 * 1024 * 1024
+_MAX_JSON_BLOCK = 4 * 1024 * 1024
+_DETAIL_CHARS = 300
+POLL_SEC = 0.25
+
+_ERROR_RX = re.compile(r"^(error\b|error:|fatal:|traceback \(most recent call last\)|\[fail\])", re.IGNORECASE)
+_CODEX_EDIT_RX = re.compile(r"^([AMD])\s+(\S.*)$")
+_STAMP_RX = re.compile(r"^\[\d{4}-\d\d-\d\dT[^\]]*\]\s*")
+_EDIT_TOOLS = {"Edit", "Write", "MultiEdit", "NotebookEdit", "replace", "write_file"}
+
+
+def sidecar_path(log_file: Path) -> Path:
+    log_file = Path(log_file)
+    return log_file.with_name(log_file.stem + SIDECAR_SUFFIX)
+
+
+def _short(text: Any) -> str:
+    s = str(text if text is not None else "").strip().replace("\r", "")
+    return s if len(s) <= _DETAIL_CHARS else s[: _DETAIL_CHARS - 3] + "..."
+
+
+def _usage_from_json(obj: dict[str, Any]) -> dict[str, Any] | None:
+    """Same shapes as dispatch/mcp_server _parse_token_usage, read from a parsed object."""
+    usage = obj.get("usage")
+    if isinstance(usage, dict) and ("input_tokens" in usage or "output_tokens" in usage):
+        input_t = int(usage.get("input_tokens", 0) or 0)
+        output_t = int(usage.get("output_tokens", 0) or 0)
+        cache_read = int(usage.get("cache_read_input_tokens", 0) or 0)
+        cache_create = int(usage.get("cache_creation_input_tokens", 0) or 0)
+        out: dict[str, Any] = {
+            "input_tokens": input_t,
+            "output_tokens": output_t,
+            "cache_read": cache_read,
+            "cache_create": cache_create,
+            "total_tokens": input_t + output_t + cache_read + cache_create,
+        }
+        if obj.get("total_cost_usd") is not None:
+            out["cost_usd"] = obj.get("total_cost_usd")
+        return out
+    stats = obj.get("stats")
+    if isinstance(stats, dict):
+        tokens = stats.get("tokens")
+        if isinstance(tokens, dict) and tokens:
+            return {
+                "input_tokens": int(tokens.get("inputTokens", 0) or 0),
+                "output_tokens": int(tokens.get("outputTokens", 0) or 0),
+                "total_tokens": int(tokens.get("totalTokens", 0) or 0),
+            }
+        # Newer gemini builds report per-model token stats.
+        total = input_t = output_t = 0
+        for model in (stats.get("models") or {}).values():
+            t = model.get("tokens") if isinstance(model, dict) else None
+            if isinstance(t, dict):
+                input_t += int(t.get("prompt", 0) or 0)
+                output_t += int(t.get("candidates", 0) or 0)
+                total += int(t.get("total", 0) or 0)
+        if total:
+            return {"input_tokens": input_t, "output_tokens": output_t, "total_tokens": total}
+    return None
+
+
+class StreamExtractor:
+    """Line-at-a-time event extraction; keeps only the state a multi-line pattern needs."""
+
+    def __init__(self, engine: str) -> None:
+        e = (engine or "").strip().lower()
+        self.family = "claude" if e in {"claude", "claude-cli"} else e
+        self._pending = ""  # codex: "exec" / "tokens used" / "file update" header seen
+        self._json: list[str] = []
+        self._json_size = 0
+        self._turns: dict[str, dict[str, Any]] = {}  # claude stream-json: message id -> usage
+
+    def feed(self, line: str) -> list[dict[str, Any]]:
+        line = line.rstrip("\r\n")
+        if self._json:
+            return self._feed_json_block(line)
+        stripped = line.strip()
+        if stripped.startswith("{"):
+            try:
+                obj = json.loads(stripped)
+            except ValueError:
+                if line.startswith("{"):
+                    # Pretty-printed JSON (gemini -o json): collect until it parses.
+                    self._json = [line]
+                    self._json_size = len(line)
+                return []
+            return self._from_json(obj) if isinstance(obj, dict) else []
+        return self._from_text(stripped)
+
+    def finish(self) -> list[dict[str, Any]]:
+        self._json = []
+        return []
+
+    def _feed_json_block(self, line: str) -> list[dict[str, Any]]:
+        self._json.append(line)
+        self._json_size += len(line)
+        if self._json_size > _MAX_JSON_BLOCK:
+            self._json = []
+            return []
+        if not line.startswith("}"):
+            return []
+        try:
+            obj = json.loads("\n".join(self._json))
+        except ValueError:
+            return []
+        self._json = []
+        return self._from_json(obj) if isinstance(obj, dict) else []
+
+    def _from_json(self, obj: dict[str, Any]) -> list[dict[str, Any]]:
+        out: list[dict[str, Any]] = []
+        kind = str(obj.get("type", ""))
+        if kind == "assistant" and isinstance(obj.get("message"), dict):
+            # claude --output-format stream-json
+            for part in obj["message"].get("content") or []:
+                if not isinstance(part, dict) or part.get("type") != "tool_use":
+                    continue
+                name = str(part.get("name", ""))
+                args = part.get("input") if isinstance(part.get("input"), dict) else {}
+                detail = args.get("command") or args.get("file_path") or args.get("pattern") or args.get("path") or ""
+                out.append({"kind": "tool", "name": name, "detail": _short(detail)})
+                if name in _EDIT_TOOLS and (args.get("file_path") or args.get("notebook_path")):
+                    out.append({"kind": "edit", "path": str(args.get("file_path") or args.get("notebook_path")), "op": name})
+            # Each turn carries its own usage (repeated per content block); their sum is
+            # the spend so far, until the final result reports the total.
+            usage = _usage_from_json(obj["message"])
+            msg_id = str(obj["message"].get("id", ""))
+            if usage and msg_id and self._turns.get(msg_id) != usage:
+                self._turns[msg_id] = usage
+                keys = ("input_tokens", "output_tokens", "cache_read", "cache_create", "total_tokens")
+                running = {k: sum(int(u.get(k, 0) or 0) for u in self._turns.values()) for k in keys}
+                out.append({"kind": "tokens", "usage": running, "partial": True})
+            return out
+        usage = _usage_from_json(obj)
+        if usage:
+            out.append({"kind": "tokens", "usage": usage})
+        if kind == "result" or "response" in obj:
+            text = obj.get("result") if kind == "result" else obj.get("response")
+            is_error = bool(obj.get("is_error")) or bool(obj.get("error"))
+            out.append({"kind": "result", "is_error": is_error, "text": _short(text)})
+        err = obj.get("error")
+        if err:
+            out.append({"kind": "error", "text": _short(err.get("message") if isinstance(err, dict) else err)})
+        return out
+
+    def _from_text(self, line: str) -> list[dict[str, Any]]:
+        pending, self._pending = self._pending, ""
+        line = _STAMP_RX.sub("", line)
+        if not line:
+            self._pending = pending if pending in {"exec", "tokens", "files"} else ""
+            return []
+        low = line.lower()
+        if pending == "tokens":
+            m = re.fullmatch(r"([\d,]+)", line)
+            if m:
+                return [{"kind": "tokens", "usage": {"total_tokens": int(m.group(1).replace(",", ""))}}]
+        if pending == "exec":
+            return [{"kind": "tool", "name": "exec", "detail": _short(line)}]
+        if pending == "files":
+            m = _CODEX_EDIT_RX.match(line)
+            if m:
+                self._pending = "files"
+                op = {"A": "add", "M": "update", "D": "delete"}[m.group(1)]
+                return [{"kind": "edit", "path": m.group(2).strip(), "op": op}]
+        if low == "tokens used":
+            self._pending = "tokens"
+            return []
+        m = re.match(r"tokens used\s*[:=]?\s*([\d,]+)$", low)
+        if m:
+            return [{"kind": "tokens", "usage": {"total_tokens": int(m.group(1).replace(",", ""))}}]
+        if low == "exec":
+            self._pending = "exec"
+            return []
+        if low.startswith("exec "):
+            return [{"kind": "tool", "name": "exec", "detail": _short(line[5:])}]
+        if low in {"file update:", "file update", "apply_patch"} or low.startswith(
+            ("apply_patch(", "updated the following files")
+        ):
+            self._pending = "files"
+            return [{"kind": "tool", "name": "apply_patch", "detail": ""}] if "apply_patch" in low else []
+        if _ERROR_RX.match(line):
+            return [{"kind": "error", "text": _short(line)}]
+        return []
+
+
+def follow(
+    log_file: Path,
+    engine: str,
+    *,
+    done: Callable[[], bool],
+    offset: int = 0,
+    tag: dict[str, Any] | None = None,
+    on_event: Callable[[dict[str, Any]], None] | None = None,
+    poll: float = POLL_SEC,
+) -> None:
+    """Append events extracted from what is written to `log_file` after `offset` to its
+    sidecar.  Returns once `done()` is true and the log has been read to its end."""
+    extractor = StreamExtractor(engine)
+    tag = dict(tag or {})
+    buf = b""
+    with open(log_file, "rb") as log, open(sidecar_path(log_file), "ab") as side:
+        log.seek(offset)
+
+        def _emit(events: list[dict[str, Any]]) -> None:
+            if not events:
+                return
+            ts = round(time.time(), 3)
+            for ev in events:
+                ev = {"ts": ts, **tag, **ev}
+                side.write((json.dumps(ev, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+                if on_event is not None:
+                    try:
+                        on_event(ev)
+                    except Exception:
+                        pass
+            side.flush()
+
+        while True:
+            # Asked before reading, so bytes written just before the exit are still read.
+            finished = done()
+            chunk = log.read(65536)
+            if chunk:
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                for raw in lines:
+                    _emit(extractor.feed(raw.decode("utf-8", errors="replace")))
+                if len(buf) > _MAX_LINE:
+                    buf = b""
+                continue
+            if finished:
+                break
+            time.sleep(poll)
+        if buf:
+            _emit(extractor.feed(buf.decode("utf-8", errors="replace")))
+        _emit(extractor.finish())
+
+
+class LogFollower(threading.Thread):
+    """`follow` on a daemon thread; `finish` reads the rest once the worker has exited."""
+
+    def __init__(self, log_file: Path, engine: str, name: str, **kwargs: Any) -> None:
+        super().__init__(name=name, daemon=True)
+        self._exited = threading.Event()
+        self._args = (Path(log_file), engine)
+        self._kwargs = kwargs
+
+    def run(self) -> None:
+        try:
+            follow(*self._args, done=self._exited.is_set, **self._kwargs)
+        except OSError:
+            pass
+
+    def finish(self, timeout: float = 5.0) -> None:
+        self._exited.set()
+        self.join(timeout)
+
+
+def summarize(events: list[dict[str, Any]], summary: dict[str, Any] | None = None) -> dict[str, Any]:
+    """Fold sidecar events into the per-lane facts the dashboard and MCP status need."""
+    s = summary if summary is not None else {"tool_calls": 0, "edits": [], "errors": 0}
+    for ev in events:
+        kind = ev.get("kind")
+        if kind == "tool":
+            s["tool_calls"] = int(s.get("tool_calls", 0)) + 1
+            s["activity"] = f"{ev.get('name', '')} {ev.get('detail', '')}".strip()
+        elif kind == "edit":
+            path = str(ev.get("path", ""))
+            if path and path not in s["edits"]:
+                s["edits"].append(path)
+            s["activity"] = f"edit {path}"
+        elif kind == "tokens" and isinstance(ev.get("usage"), dict):
+            s["tokens"] = ev["usage"]
+        elif kind == "result":
+            s["result"] = {"is_error": bool(ev.get("is_error")), "text": ev.get("text", "")}
+        elif kind == "error":
+            s["errors"] = int(s.get("errors", 0)) + 1
+            s["last_error"] = ev.get("text", "")
+    return s
+
+
+class SidecarReader:
+    """Cached summaries for pollers: each call folds in only the bytes appended since the
+    last one.  None means the lane has no sidecar (older run, or streaming disabled)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cache: dict[str, tuple[int, dict[str, Any]]] = {}
+
+    def read(self, log_file: Path) -> dict[str, Any] | None:
+        path = sidecar_path(log_file)
+        key = str(path)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            with self._lock:
+                self._cache.pop(key, None)
+            return None
+        with self._lock:
+            offset, summary = self._cache.get(key, (0, None))
+            if summary is None or size < offset:
+                offset, summary = 0, summarize([])
+            if size > offset:
+                with path.open("rb") as f:
+                    f.seek(offset)
+                    data = f.read(size - offset)
+                end = data.rfind(b"\n") + 1
+                events = []
+                for line in data[:end].splitlines():
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue
+                summarize(events, summary)
+                offset += end
+            self._cache[key] = (offset, summary)
+            return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Follow a worker's log into its event sidecar")
+    parser.add_argument("--log", required=True)
+    parser.add_argument("--engine", default="")
+    parser.add_argument("--attempt", type=int, default=0)
+    parser.add_argument("--offset", type=int, default=0, help="where this attempt's output starts in the log")
+    parser.add_argument("--pid", type=int, required=True, help="worker to follow until it exits")
+    args = parser.parse_args()
+    follow(
+        Path(args.log),
+        args.engine,
+        done=lambda: not proc_tree.running(args.pid),
+        offset=args.offset,
+        tag={"attempt": args.attempt} if args.attempt else None,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""Worker dependencies (`depends_on`): ordering, stages and the critical path.
+
+A worker starts once every task it depends on has exited 0.  If one of them fails or
+is never dispatched (manual lane, skipped, unknown id), the worker and everything
+downstream of it is marked DEP_FAILED instead of being launched.  Cycles are rejected
+up front.  The dispatcher owns the run-time state; this module only does graph math.
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Any
+
+
+def dependencies(worker: dict[str, Any]) -> list[str]:
+    raw = worker.get("depends_on") or []
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, list):
+        return []
+    out: list[str] = []
+    for item in raw:
+        text = str(item).strip()
+        if text and text not in out:
+            out.append(text)
+    return out
+
+
+def topo_order(order: list[str], deps: dict[str, list[str]]) -> tuple[list[str], list[str]]:
+    """(order, cyclic): `order` re-sorted so every task follows its dependencies, keeping the
+    given order wherever the graph allows; tasks on or behind a cycle come back in `cyclic`.
+    Dependencies outside `order` are ignored here."""
+    rank = {task_id: idx for idx, task_id in enumerate(order)}
+    pending = {task_id: {d for d in deps.get(task_id, []) if d in rank} for task_id in order}
+    children: dict[str, list[str]] = {task_id: [] for task_id in order}
+    for task_id, parents in pending.items():
+        for parent in parents:
+            children[parent].append(task_id)
+    ready = [(rank[t], t) for t, parents in pending.items() if not parents]
+    heapq.heapify(ready)
+    out: list[str] = []
+    while ready:
+        _, task_id = heapq.heappop(ready)
+        out.append(task_id)
+        for child in children[task_id]:
+            pending[child].discard(task_id)
+            if not pending[child]:
+                heapq.heappush(ready, (rank[child], child))
+    placed = set(out)
+    return out, [t for t in order if t not in placed]
+
+
+def stages(order: list[str], deps: dict[str, list[str]]) -> list[list[str]]:
+    """Tasks grouped by depth: stage N holds tasks whose longest dependency chain is N.
+    `order` must already be topological."""
+    depth: dict[str, int] = {}
+    for task_id in order:
+        depth[task_id] = max((depth[d] + 1 for d in deps.get(task_id, []) if d in depth), default=0)
+    out: list[list[str]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for task_id in order:
+        out[depth[task_id]].append(task_id)
+    return out
+
+
+def critical_path(order: list[str], deps: dict[str, list[str]], durations: dict[str, float]) -> tuple[list[str], float]:
+    """Longest chain by summed duration (tasks without a duration count as 0).
+    `order` must already be topological."""
+    best: dict[str, tuple[float, str]] = {}
+    for task_id in order:
+        parent, start = "", 0.0
+        for d in deps.get(task_id, []):
+            if d in best and best[d][0] > start:
+                parent, start = d, best[d][0]
+        best[task_id] = (start + float(durations.get(task_id) or 0.0), parent)
+    if not best:
+        return [], 0.0
+    tail = max(order, key=lambda t: best[t][0])
+    total = best[tail][0]
+    path: list[str] = []
+    while tail:
+        path.append(tail)
+        tail = best[tail][1]
+    return path[::-1], round(total, 3)
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""Per-worker git worktrees for lanes that share one repository (`isolation: worktree`).
+
+Each isolated lane gets `git worktree add` on a throwaway branch
+orch/<ORCH_ID>/<task>-<stamp>, checked out under <git-common-dir>/orch-worktrees/<ORCH_ID>/<task>
+(inside .git, so it never shows up as untracked in the main checkout, even when the
+orchestrator's runs/ dir lives in that repository).  Worktrees share the repository's
+object store, so creating one costs a checkout, not a clone.  Ignored files
+(node_modules, .env, build output) are not copied.
+
+When a lane exits, `finish` commits whatever the worker left uncommitted onto its
+branch and reports the change against the base commit and whether the branch still
+merges cleanly into the target branch (`git merge-tree`, no checkout touched).
+`write_report` adds the cross-lane view: files touched by more than one lane, and which
+of those lane pairs would conflict when merged one after the other.  `apply` merges a
+finished lane's branch into the main checkout (the winner of a hedged task).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any
+
+from run_journal import read_manifest
+
+WORKTREES_DIRNAME = "orch-worktrees"
+REPORT_FILE = "merge_report.json"
+_ISOLATION_MODES = {"", "none", "shared", "worktree"}
+_SNAPSHOT_ENV = {
+    "GIT_AUTHOR_NAME": "orch",
+    "GIT_AUTHOR_EMAIL": "orch@localhost",
+    "GIT_COMMITTER_NAME": "orch",
+    "GIT_COMMITTER_EMAIL": "orch@localhost",
+}
+
+# `git worktree add` and branch updates take repo-wide locks; lanes are prepared on a
+# thread pool, so calls against the same repository are serialized.
+_repo_locks: dict[str, threading.Lock] = {}
+_repo_locks_guard = threading.Lock()
+
+
+def isolation_mode(defaults: dict[str, Any], worker: dict[str, Any]) -> str:
+    """Worker `isolation` over defaults.isolation; unknown values raise ValueError."""
+    mode = str(worker.get("isolation", defaults.get("isolation", "")) or "").strip().lower()
+    if mode not in _ISOLATION_MODES:
+        raise ValueError(f"isolation must be 'worktree' or 'none', not {mode!r}")
+    return "worktree" if mode == "worktree" else ""
+
+
+def _lock_for(toplevel: str) -> threading.Lock:
+    with _repo_locks_guard:
+        return _repo_locks.setdefault(toplevel, threading.Lock())
+
+
+def _git(cwd: Path | str, *args: str, env: dict[str, str] | None = None) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        ["git", *args],
+        cwd=str(cwd),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        env={**os.environ, **env} if env else None,
+    )
+
+
+def _git_out(cwd: Path | str, *args: str) -> str:
+    proc = _git(cwd, *args)
+    if proc.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)}: {(proc.stderr or proc.stdout).strip()}")
+    return proc.stdout.strip()
+
+
+def _safe_name(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", text).strip("-.") or "lane"
+
+
+def git_toplevel(workspace: Path | str) -> str | None:
+    """The repository `workspace` is in, or None outside a git work tree."""
+    try:
+        proc = _git(workspace, "rev-parse", "--show-toplevel")
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.strip() or None
+
+
+def worktree_path(git_common_dir: Path, orch_id: str, task_id: str) -> Path:
+    return Path(git_common_dir) / WORKTREES_DIRNAME / _safe_name(orch_id) / _safe_name(task_id)
+
+
+def _drop_previous(toplevel: str, path: Path) -> None:
+    """Remove the lane's worktree from an earlier run.  Its branch is deleted only when
+    already merged (`git branch -d`); unmerged work stays reachable on the branch."""
+    if not path.exists():
+        _git(toplevel, "worktree", "prune")
+        return
+    old_branch = ""
+    head = _git(path, "symbolic-ref", "--quiet", "--short", "HEAD")
+    if head.returncode == 0:
+        old_branch = head.stdout.strip()
+    if _git(toplevel, "worktree", "remove", "--force", str(path)).returncode != 0:
+        shutil.rmtree(path, ignore_errors=True)
+        _git(toplevel, "worktree", "prune")
+    if old_branch.startswith("orch/"):
+        _git(toplevel, "branch", "-d", old_branch)
+
+
+def create(workspace: Path, orch_id: str, task_id: str, stamp: str) -> dict[str, Any]:
+    """Check out a fresh worktree for one lane; returns its record for the manifest.
+    `workspace` may be a subdirectory of the repository; the record's `workspace` is the
+    same subdirectory inside the worktree.  Raises RuntimeError when git refuses."""
+    workspace = Path(workspace).resolve()
+    toplevel = _git_out(workspace, "rev-parse", "--show-toplevel")
+    rel = workspace.relative_to(Path(toplevel).resolve())
+    common = Path(toplevel) / _git_out(toplevel, "rev-parse", "--git-common-dir")
+    path = worktree_path(common.resolve(), orch_id, task_id)
+    branch = f"orch/{_safe_name(orch_id)}/{_safe_name(task_id)}-{stamp}"
+    with _lock_for(toplevel):
+        base = _git_out(toplevel, "rev-parse", "HEAD")
+        head = _git(toplevel, "symbolic-ref", "--quiet", "--short", "HEAD")
+        target = head.stdout.strip() if head.returncode == 0 else base
+        _drop_previous(toplevel, path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _git_out(toplevel, "worktree", "add", "--quiet", "-b", branch, str(path), base)
+    return {
+        "mode": "worktree",
+        "repo": toplevel,
+        "worktree": str(path),
+        "workspace": str(path / rel),
+        "branch": branch,
+        "base": base,
+        "target": target,
+    }
+
+
+def _numstat(cwd: str, spec: str) -> tuple[list[str], int, int]:
+    files: list[str] = []
+    added = deleted = 0
+    for line in _git_out(cwd, "diff", "--numstat", "--no-renames", spec).splitlines():
+        parts = line.split("\t", 2)
+        if len(parts) != 3:
+            continue
+        files.append(parts[2])
+        added += int(parts[0]) if parts[0].isdigit() else 0
+        deleted += int(parts[1]) if parts[1].isdigit() else 0
+    return files, added, deleted
+
+
+def _merge_check(toplevel: str, target: str, branch: str, base: str, files: list[str]) -> tuple[bool | None, list[str]]:
+    proc = _git(toplevel, "merge-tree", "--write-tree", "--name-only", "--no-messages", target, branch)
+    if proc.returncode in (0, 1):
+        conflicts = [line for line in proc.stdout.splitlines()[1:] if line.strip()]
+        return proc.returncode == 0, conflicts
+    # git < 2.38: no in-memory merge; report files changed on both sides instead.
+    theirs, _, _ = _numstat(toplevel, f"{base}..{target}")
+    overlap = sorted(set(files) & set(theirs))
+    return (None if overlap else True), overlap
+
+
+def finish(record: dict[str, Any], task_id: str) -> dict[str, Any]:
+    """Snapshot the lane's leftovers onto its branch and describe the result."""
+    path = record["worktree"]
+    toplevel = record["repo"]
+    base = record["base"]
+    branch = record["branch"]
+    out: dict[str, Any] = {"repo": toplevel, "branch": branch, "base": base[:12], "target": record.get("target", "")}
+    try:
+        snapshot = ""
+        if _git_out(path, "status", "--porcelain"):
+            _git_out(path, "add", "-A")
+            proc = _git(path, "commit", "--quiet", "--no-verify", "-m", f"orch: {task_id} worker changes", env=_SNAPSHOT_ENV)
+            if proc.returncode != 0:
+                raise RuntimeError(f"snapshot commit: {(proc.stderr or proc.stdout).strip()}")
+            snapshot = _git_out(path, "rev-parse", "HEAD")
+        head = _git_out(path, "rev-parse", "HEAD")
+        files, added, deleted = _numstat(path, f"{base}..{head}")
+        out.update(
+            {
+                "head": head[:12],
+                "commits": int(_git_out(path, "rev-list", "--count", f"{base}..{head}") or 0),
+                "snapshot": snapshot[:12] if snapshot else None,
+                "files": files,
+                "insertions": added,
+                "deletions": deleted,
+            }
+        )
+        if not files:
+            out["mergeable"] = True
+            out["conflicts"] = []
+        else:
+            with _lock_for(toplevel):
+                out["mergeable"], out["conflicts"] = _merge_check(toplevel, out["target"] or base, branch, base, files)
+    except (OSError, RuntimeError) as exc:
+        out["error"] = str(exc)
+    return out
+
+
+def apply(record: dict[str, Any], lane: dict[str, Any], task_id: str) -> dict[str, Any]:
+    """Merge a finished lane's branch (see `finish`) into the main checkout, so lanes
+    started later see its changes.  Returns {"applied", "head"} or {"applied": False,
+    "error"}; a merge git refuses is aborted and leaves the checkout as it was."""
+    if lane.get("error"):
+        return {"applied": False, "error": lane["error"]}
+    if not lane.get("files"):
+        return {"applied": True, "head": None}
+    toplevel = record["repo"]
+    target = record.get("target", "")
+    with _lock_for(toplevel):
+        head = _git(toplevel, "symbolic-ref", "--quiet", "--short", "HEAD")
+        current = head.stdout.strip() if head.returncode == 0 else ""
+        if not current or current != target:
+            return {"applied": False, "error": f"main checkout is on {current or 'a detached HEAD'}, not {target}"}
+        proc = _git(toplevel, "merge", "--no-edit", "-m", f"orch: apply {task_id}", record["branch"], env=_SNAPSHOT_ENV)
+        if proc.returncode != 0:
+            _git(toplevel, "merge", "--abort")
+            return {"applied": False, "error": f"git merge {record['branch']}: {(proc.stderr or proc.stdout).strip()[:300]}"}
+        return {"applied": True, "head": _git(toplevel, "rev-parse", "HEAD").stdout.strip()[:12]}
+
+
+def write_report(run_dir: Path, lanes: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Write merge_report.json for every isolated lane, with cross-lane file overlaps."""
+    touched: dict[str, list[str]] = {}
+    for task_id, lane in lanes.items():
+        for name in lane.get("files") or []:
+            touched.setdefault(name, []).append(task_id)
+    shared = {name: sorted(ids) for name, ids in sorted(touched.items()) if len(ids) > 1}
+    for task_id, lane in lanes.items():
+        lane["overlaps"] = sorted({other for ids in shared.values() if task_id in ids for other in ids} - {task_id})
+    lane_conflicts: list[dict[str, Any]] = []
+    ids = sorted(lanes)
+    for i, a in enumerate(ids):
+        for b in ids[i + 1 :]:
+            first, second = lanes[a], lanes[b]
+            if b not in first["overlaps"] or first.get("repo") != second.get("repo"):
+                continue
+            both = sorted(set(first["files"]) & set(second["files"]))
+            clean, files = _merge_check(first["repo"], first["branch"], second["branch"], first["base"], both)
+            if clean is not True:
+                lane_conflicts.append({"lanes": [a, b], "files": files})
+    report = {"lanes": lanes, "shared_files": shared, "lane_conflicts": lane_conflicts}
+    path = Path(run_dir) / REPORT_FILE
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return report
+
+
+def summary_line(task_id: str, lane: dict[str, Any]) -> str:
+    if lane.get("error"):
+        return f"[MERGE] {task_id}: report failed: {lane['error']}"
+    if not lane.get("files"):
+        return f"[MERGE] {task_id}: no changes on {lane['branch']}"
+    if lane.get("mergeable") is True:
+        state = f"merges cleanly into {lane['target']}"
+    elif lane.get("mergeable") is False:
+        state = f"CONFLICTS with {lane['target']}: {', '.join(lane['conflicts'][:5])}"
+    else:
+        state = f"touches files also changed on {lane['target']}: {', '.join(lane['conflicts'][:5])}"
+    extra = f"; overlaps {', '.join(lane['overlaps'])}" if lane.get("overlaps") else ""
+    return (
+        f"[MERGE] {task_id}: {len(lane['files'])} files +{lane['insertions']}/-{lane['deletions']} "
+        f"on {lane['branch']}, {state}{extra}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild the worktree merge report of a run")
+    parser.add_argument("--run-dir", required=True)
+    args = parser.parse_args()
+    run_dir = Path(args.run_dir)
+    manifest = read_manifest(run_dir) or {}
+    lanes: dict[str, dict[str, Any]] = {}
+    for row in manifest.get("started", []):
+        record = row.get("isolation") if isinstance(row, dict) else None
+        if isinstance(record, dict) and record.get("mode") == "worktree" and Path(record["worktree"]).is_dir():
+            lanes[row["task_id"]] = finish(record, row["task_id"])
+    report = write_report(run_dir, lanes)
+    for task_id, lane in report["lanes"].items():
+        print(summary_line(task_id, lane))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
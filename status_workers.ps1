@@ -11,7 +11,7 @@ if (-not (Test-Path $runsRoot)) {
     exit 0
 }
 
-$dirs = Get-ChildItem $runsRoot -Directory
+$dirs = Get-ChildItem $runsRoot -Directory | Where-Object { -not $_.Name.StartsWith(".") }
 if ($OrchId -and $OrchId.Trim().Length -gt 0) {
     $want = $OrchId.Trim().ToUpper()
     $exact = $dirs | Where-Object { $_.Name.ToUpper() -eq $want }
@@ -1,48 +1,18 @@
 param(
-    [string]$RunName = ""
+    [string]$RunName = "",
+    [double]$Grace = -1
 )
 
 $ErrorActionPreference = "Stop"
 
-$runsRoot = Join-Path $PSScriptRoot "runs"
-if (-not (Test-Path $runsRoot)) {
-    Write-Host "[ORCH] runs directory not found: $runsRoot"
-    exit 0
+# Every lane's process tree is stopped in parallel: graceful first, forced after the grace period.
+$stopArgs = @("$PSScriptRoot\runner\lane_stop.py", "--runs-root", (Join-Path $PSScriptRoot "runs"))
+if (-not [string]::IsNullOrWhiteSpace($RunName)) {
+    $stopArgs += @("--run", $RunName)
 }
-
-if ([string]::IsNullOrWhiteSpace($RunName)) {
-    $runDir = Get-ChildItem $runsRoot -Directory | Sort-Object Name | Select-Object -Last 1
-} else {
-    $runPath = Join-Path $runsRoot $RunName
-    if (Test-Path $runPath) {
-        $runDir = Get-Item $runPath
-    } else {
-        throw "Run not found: $runPath"
-    }
-}
-
-if ($null -eq $runDir) {
-    Write-Host "[ORCH] no run to stop."
-    exit 0
-}
-
-$manifestPath = Join-Path $runDir.FullName "manifest.json"
-if (-not (Test-Path $manifestPath)) {
-    Write-Host "[ORCH] manifest not found: $manifestPath"
-    exit 0
-}
-
-$manifest = Get-Content $manifestPath -Raw | ConvertFrom-Json
-foreach ($entry in $manifest.started) {
-    $procId = $entry.pid
-    if (-not $procId) { continue }
-    $proc = Get-Process -Id $procId -ErrorAction SilentlyContinue
-    if ($proc) {
-        Write-Host ("[STOP] {0} pid={1}" -f $entry.task_id, $procId)
-        Stop-Process -Id $procId -Force
-    } else {
-        Write-Host ("[SKIP] {0} pid={1} already exited" -f $entry.task_id, $procId)
-    }
+if ($Grace -ge 0) {
+    $stopArgs += @("--grace", $Grace)
 }
 
-Write-Host "[ORCH] stop request completed."
+& python @stopArgs
+exit $LASTEXITCODE
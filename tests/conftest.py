@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""The runner modules import each other by bare name, as dispatch.py runs them."""
+import sys
+from pathlib import Path
+
+RUNNER = Path(__file__).resolve().parents[1] / "runner"
+if str(RUNNER) not in sys.path:
+    sys.path.insert(0, str(RUNNER))
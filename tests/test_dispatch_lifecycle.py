@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from pathlib import Path
+
+import dispatch
+
+
+def _run(**fields):
+    run = dispatch.WorkerRun(
+        task_id="T1",
+        owner="o",
+        role="r",
+        engine="codex",
+        workspace=".",
+        command=[],
+        log_file=Path("T1.log"),
+        prompt_file=Path("T1.md"),
+        repo="",
+    )
+    for key, value in fields.items():
+        setattr(run, key, value)
+    return run
+
+
+def test_failed_exit_is_rate_limited_by_its_output():
+    assert dispatch._exit_rate_limited(1, False, "HTTP 429 Too Many Requests", None)
+    assert not dispatch._exit_rate_limited(1, False, "fatal: bad ref", None)
+    assert not dispatch._exit_rate_limited(1, True, "rate limit reached", None)
+
+
+def test_clean_exit_needs_an_error_result_event():
+    assert not dispatch._exit_rate_limited(0, False, "summary: stayed under the quota", None)
+    assert not dispatch._exit_rate_limited(0, False, "", {"is_error": False, "text": "quota"})
+    assert dispatch._exit_rate_limited(0, False, "", {"is_error": True, "text": "You hit your limit"})
+
+
+def test_exit_action_restarts_a_stalled_lane_while_restarts_remain():
+    run = _run(entry={"state": "STALLED", "stalls": [{"reason": "idle"}]}, stall={"restarts": 1}, attempt=1)
+    assert dispatch._exit_action(run, False, False) == "restart"
+    assert dispatch._exit_action(run, False, True) == "finish"
+    run.entry["stalls"].append({"reason": "idle"})
+    assert dispatch._exit_action(run, False, False) == "finish"
+
+
+def test_exit_action_retries_rate_limits_up_to_max_retries():
+    run = _run(entry={}, retry={"max_retries": 2}, attempt=2)
+    assert dispatch._exit_action(run, True, False) == "retry"
+    run.attempt = 3
+    assert dispatch._exit_action(run, True, False) == "finish"
+    assert dispatch._exit_action(_run(entry={}, attempt=1), False, False) == "finish"
+
+
+def test_dep_lanes_expand_shard_and_hedge_groups():
+    shards = {"S": {"after": ["S.1", "S.2"]}, "R": {"after": ["R.review"]}}
+    hedges = {"H": {"legs": ["H~codex", "H~gemini"]}, "S.2": {"legs": ["S.2~codex", "S.2~gemini"]}}
+    assert dispatch._dep_lanes("T", shards, hedges) == ["T"]
+    assert dispatch._dep_lanes("H", shards, hedges) == ["H~codex", "H~gemini"]
+    assert dispatch._dep_lanes("S", shards, hedges) == ["S.1", "S.2~codex", "S.2~gemini"]
+    assert dispatch._dep_lanes("R", shards, hedges) == ["R.review"]
+
+
+def test_failed_hedge_groups_needs_every_leg_failed():
+    groups = {"H": {"legs": ["H~a", "H~b"]}, "W": {"legs": ["W~a"], "state": "WON"}, "E": {"legs": []}}
+    dep_state = {"H~a": "FAILED", "W~a": "FAILED"}
+    assert dispatch._failed_hedge_groups(groups, dep_state) == []
+    dep_state["H~b"] = "MISSING"
+    assert dispatch._failed_hedge_groups(groups, dep_state) == ["H"]
+    assert dep_state["H"] == "FAILED" and groups["H"]["state"] == "FAILED"
+
+
+def test_settle_shard_groups():
+    groups = {"A": {"after": ["A.1", "A.2"]}, "B": {"after": ["B.1", "B.2"]}, "C": {"after": ["C.1"]}}
+    dep_state = {"A.1": "DONE", "A.2": "DONE", "B.1": "DONE", "B.2": "MISSING"}
+    assert dispatch._settle_shard_groups(groups, dep_state) == ["A", "B"]
+    assert (dep_state["A"], dep_state["B"]) == ("DONE", "FAILED")
+    assert groups["A"]["state"] == "DONE" and "state" not in groups["C"]
+    assert dispatch._settle_shard_groups(groups, dep_state) == []
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""End-to-end dispatches against a stand-in engine CLI."""
+import json
+import sys
+
+import dispatch
+import exe_cache
+import host_load
+
+FAKE_CLI = """#!{python}
+import sys, time
+sys.stdin.read()
+time.sleep({sleep})
+print("tokens used")
+print("1,234")
+"""
+
+
+def _tasks(tmp_path, workers, defaults=None, sleep=0.2):
+    cli = tmp_path / "fake-codex"
+    cli.write_text(FAKE_CLI.format(python=sys.executable, sleep=sleep), encoding="utf-8")
+    cli.chmod(0o755)
+    runner = tmp_path / "orch" / "runner"
+    runner.mkdir(parents=True)
+    (runner / "T.md").write_text("TASK {{TASK_ID}}\n{{GOAL}}\n", encoding="utf-8")
+    config = {
+        "orch_id": "T",
+        "workspace": str(tmp_path),
+        "defaults": {"archive": False, **(defaults or {})},
+        "engines": {"codex": {"cmd": str(cli)}},
+        "workers": [
+            {"engine": "codex", "owner": "o", "role": "r", "goal": "g", "prompt_file": "orch/runner/T.md", **w}
+            for w in workers
+        ],
+    }
+    tasks_file = runner / "tasks.T.json"
+    tasks_file.write_text(json.dumps(config), encoding="utf-8")
+    return tasks_file
+
+
+def _manifest(tmp_path):
+    return json.loads((tmp_path / "orch" / "runs" / "T" / "manifest.json").read_text(encoding="utf-8-sig"))
+
+
+def test_held_lane_is_launched_once_the_host_recovers_without_wait(tmp_path, monkeypatch):
+    monkeypatch.setattr(exe_cache, "_DEFAULT", exe_cache.ExecutableCache(None))
+    samples = iter([{"cpu": 0.99}, {"cpu": 0.99}])
+
+    def sample(self, now=None):
+        # Saturated for two samples, then idle.
+        self.last = next(samples, {"cpu": 0.1})
+        return self.last
+
+    monkeypatch.setattr(host_load.HostMonitor, "sample", sample)
+    tasks_file = _tasks(
+        tmp_path,
+        [{"task_id": "A"}, {"task_id": "B"}],
+        {"adaptive_admission": {"min_running": 1, "sample_sec": 0.5}},
+        sleep=1.5,
+    )
+    assert dispatch.main(["--tasks-file", str(tasks_file)]) == 0
+    manifest = _manifest(tmp_path)
+    rows = {row["task_id"]: row for row in manifest["started"]}
+    assert rows["A"]["exit_code"] == 0 and rows["B"]["exit_code"] == 0
+    assert rows["B"]["admission_delay_sec"] > 0
+    assert not manifest.get("queued")
+    assert [d["action"] for d in manifest["admission"]["decisions"]] == ["hold", "release"]
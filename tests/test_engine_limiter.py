@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import math
+import time
+
+import pytest
+
+from dispatch import _EngineLimiter
+
+
+def _limiter(**cfg):
+    limiter = _EngineLimiter("codex", cfg)
+    return limiter, time.monotonic()
+
+
+def test_unconfigured_engine_is_not_limited():
+    assert not _EngineLimiter("codex", {}).enabled
+    assert _EngineLimiter("codex", {"max_retries": 2}).enabled
+
+
+def test_burst_launches_go_out_at_once_then_wait_for_a_refill():
+    limiter, t0 = _limiter(requests_per_min=60, burst=3)
+    for _ in range(3):
+        assert limiter.delay(t0) == (0.0, "")
+        limiter.acquire(t0)
+    delay, reason = limiter.delay(t0)
+    assert reason == "requests_per_min"
+    assert delay == pytest.approx(1.0, abs=0.05)
+
+
+def test_bucket_refills_at_the_per_minute_rate_up_to_the_burst():
+    limiter, t0 = _limiter(requests_per_min=6, burst=2)
+    limiter.acquire(t0)
+    limiter.acquire(t0)
+    assert limiter.delay(t0 + 5.0)[1] == "requests_per_min"
+    assert limiter.delay(t0 + 10.0) == (0.0, "")
+    assert limiter.snapshot()["requests_available"] == pytest.approx(1.0, abs=0.01)
+    assert limiter.delay(t0 + 3600.0) == (0.0, "")
+    assert limiter.snapshot()["requests_available"] == 2
+
+
+def test_burst_defaults_to_the_per_minute_rate():
+    assert _EngineLimiter("codex", {"requests_per_min": 5}).burst == 5
+
+
+def test_concurrent_sessions_wait_for_an_exit():
+    limiter, t0 = _limiter(concurrent_sessions=1)
+    limiter.acquire(t0)
+    assert limiter.delay(t0) == (math.inf, "concurrent_sessions")
+    limiter.release(0, None)
+    assert limiter.delay(t0) == (0.0, "")
+
+
+def test_token_budget_reserves_the_average_and_reconciles_on_exit():
+    limiter, t0 = _limiter(tokens_per_hour=3600)
+    assert limiter.acquire(t0) == 0
+    limiter.release(0, 3000)
+    assert limiter.estimate() == 3000
+    delay, reason = limiter.delay(t0)
+    assert reason == "tokens_per_hour"
+    assert delay == pytest.approx(2400.0, abs=1.0)
+
+
+def test_cool_down_holds_every_launch():
+    limiter, t0 = _limiter(requests_per_min=60)
+    limiter.cool_down(t0 + 30.0)
+    delay, reason = limiter.delay(t0)
+    assert reason == "rate_limited" and delay == pytest.approx(30.0)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+
+import exe_cache
+from exe_cache import ExecutableCache
+
+
+def _tool(directory, name, version="tool 1.0"):
+    directory.mkdir(exist_ok=True)
+    path = directory / name
+    path.write_text(f"#!{sys.executable}\nprint({version!r})\n", encoding="utf-8")
+    path.chmod(0o755)
+    return path
+
+
+def test_which_returns_the_first_candidate_on_path(tmp_path, monkeypatch):
+    tool = _tool(tmp_path / "bin", "codex")
+    monkeypatch.setenv("PATH", str(tmp_path / "bin"))
+    cache = ExecutableCache(None)
+    assert cache.which("codex.cmd", "codex") == str(tool)
+    assert cache.which("missing") == ""
+
+
+def test_hits_are_reused_and_persisted(tmp_path, monkeypatch):
+    tool = _tool(tmp_path / "bin", "codex")
+    monkeypatch.setenv("PATH", str(tmp_path / "bin"))
+    path = tmp_path / "cache.json"
+    cache = ExecutableCache(path)
+    assert cache.which("codex") == str(tool)
+    cache.save()
+    assert not list(tmp_path.glob("*.tmp"))
+
+    calls = []
+    monkeypatch.setattr(exe_cache.shutil, "which", lambda name: calls.append(name))
+    assert ExecutableCache(path).which("codex") == str(tool)
+    assert calls == []
+
+
+def test_changed_binary_forces_a_fresh_lookup(tmp_path, monkeypatch):
+    tool = _tool(tmp_path / "bin", "codex")
+    monkeypatch.setenv("PATH", str(tmp_path / "bin"))
+    cache = ExecutableCache(None)
+    cache.which("codex")
+    tool.unlink()
+    assert cache.which("codex") == ""
+
+
+def test_a_miss_is_trusted_only_for_the_negative_ttl(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path / "bin"))
+    cache = ExecutableCache(None)
+    assert cache.which("codex") == ""
+    tool = _tool(tmp_path / "bin", "codex")
+    assert cache.which("codex") == ""
+    monkeypatch.setattr(exe_cache, "NEGATIVE_TTL", 0.0)
+    assert cache.which("codex") == str(tool)
+
+
+def test_a_different_path_is_a_different_table(tmp_path, monkeypatch):
+    a = _tool(tmp_path / "a", "codex")
+    b = _tool(tmp_path / "b", "codex")
+    cache = ExecutableCache(None)
+    monkeypatch.setenv("PATH", str(tmp_path / "a"))
+    assert cache.which("codex") == str(a)
+    monkeypatch.setenv("PATH", str(tmp_path / "b"))
+    assert cache.which("codex") == str(b)
+
+
+def test_version_runs_once_per_binary_mtime(tmp_path):
+    tool = _tool(tmp_path / "bin", "codex", "codex-cli 0.9")
+    path = tmp_path / "cache.json"
+    cache = ExecutableCache(path)
+    assert cache.version(str(tool)) == "codex-cli 0.9"
+    cache.save()
+    assert json.loads(path.read_text(encoding="utf-8"))["versions"][str(tool)]["version"] == "codex-cli 0.9"
+
+    tool.write_text(f"#!{sys.executable}\nprint('codex-cli 1.0')\n", encoding="utf-8")
+    os.utime(tool, (1, 1))
+    assert ExecutableCache(path).version(str(tool)) == "codex-cli 1.0"
+    assert cache.version("") == "" and cache.version(str(tmp_path / "nope")) == ""
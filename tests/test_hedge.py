@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from hedge import DONE_LINE, HedgeStats, expand, hedge_engines, stats_path, succeeded
+
+
+def test_a_count_races_the_own_engine_then_the_next_enabled_ones():
+    assert hedge_engines({"engine": "gemini", "hedge": 2}, {}) == ["gemini", "codex"]
+    assert hedge_engines({"engine": "codex", "hedge": True}, {"claude": {"enabled": False}}) == ["codex", "gemini"]
+    assert hedge_engines({"engine": "claude-cli", "hedge": "3"}, {}) == ["claude", "codex", "gemini"]
+
+
+def test_a_list_is_deduplicated_and_a_single_engine_is_no_race():
+    assert hedge_engines({"hedge": ["codex", "claude-cli", "codex"]}, {}) == ["codex", "claude"]
+    assert hedge_engines({"hedge": ["codex"]}, {}) == []
+    assert hedge_engines({"hedge": 0}, {}) == []
+
+
+@pytest.mark.parametrize("raw", [["codex", "llama"], {"codex": 1}])
+def test_bad_hedge_values_are_rejected(raw):
+    with pytest.raises(ValueError):
+        hedge_engines({"hedge": raw}, {})
+
+
+def test_expand_replaces_a_hedged_worker_with_isolated_legs():
+    workers = [{"task_id": "A", "engine": "codex", "role": "dev", "goal": "fix it", "hedge": 2}, {"task_id": "B"}, "junk"]
+    out, groups, notes = expand(workers, {})
+    assert [w["task_id"] if isinstance(w, dict) else w for w in out] == ["A~codex", "A~claude", "B", "junk"]
+    leg = out[1]
+    assert leg["engine"] == "claude" and leg["hedge_of"] == "A" and "hedge" not in leg
+    assert leg["isolation"] == "worktree" and leg["memo"] is False
+    assert leg["goal"].startswith("fix it\n") and DONE_LINE in leg["goal"]
+    assert groups == {"A": {"legs": ["A~codex", "A~claude"], "engines": ["codex", "claude"], "role": "dev"}}
+    assert notes == []
+
+
+def test_expand_runs_an_invalid_hedge_unhedged():
+    out, groups, notes = expand([{"task_id": "A", "hedge": ["nope", "codex"]}], {})
+    assert out == [{"task_id": "A", "hedge": ["nope", "codex"]}] and groups == {}
+    assert notes and notes[0].startswith("[WARN] A:")
+
+
+def test_success_needs_a_clean_result_or_the_done_line():
+    assert succeeded({"is_error": False, "text": "ok"}, "")
+    assert not succeeded({"is_error": True, "text": "limit"}, "STATUS: DONE")
+    assert succeeded(None, "changed two files\n  status: done  \n")
+    assert not succeeded(None, "end your reply with the line STATUS: DONE.")
+    assert not succeeded(None, "")
+
+
+def test_stats_are_summed_per_role_and_persisted(tmp_path):
+    path = stats_path(tmp_path)
+    stats = HedgeStats(path)
+    stats.record("dev", ["codex", "claude"], "claude", 12.0)
+    stats.record("dev", ["codex", "claude"], "claude", 18.0)
+    stats.record("dev", ["codex", "claude"], "", None)
+    reloaded = HedgeStats(path)
+    row = json.loads(path.read_text(encoding="utf-8"))["roles"]["dev"]
+    assert (row["races"], row["no_winner"]) == (3, 1)
+    assert row["engines"]["claude"] == {"entered": 3, "wins": 2, "win_sec_total": 30.0}
+    assert reloaded.summary_lines() == ["dev: 3 races, no winner 1; claude 2/3, avg 15s; codex 0/3"]
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import host_load
+from host_load import HostMonitor, admission_policy
+
+
+def _monitor(samples, **policy):
+    monitor = HostMonitor(admission_policy({"adaptive_admission": {"sample_sec": 1.0, **policy}}))
+    feed = iter(samples)
+
+    def sample(now=None):
+        monitor.last = next(feed)
+        return monitor.last
+
+    monitor.sample = sample
+    return monitor
+
+
+def test_policy_is_off_by_default_and_clamped():
+    assert admission_policy({})["enabled"] is False
+    policy = admission_policy({"adaptive_admission": {"cpu_max": "bad", "sample_sec": 0.1, "min_running": 2.7}})
+    assert policy["enabled"] and policy["cpu_max"] == host_load.DEFAULTS["cpu_max"]
+    assert (policy["sample_sec"], policy["min_running"]) == (0.5, 2)
+    assert admission_policy({"adaptive_admission": {"enabled": False}})["enabled"] is False
+
+
+def test_below_min_running_a_lane_is_never_held():
+    monitor = _monitor([], min_running=2)
+    assert monitor.check(1, now=100.0) == ("", "")
+
+
+def test_starts_ramp_up_one_per_sample_interval():
+    monitor = _monitor([{"cpu": 0.2}])
+    monitor.note_start(now=100.0)
+    reason, change = monitor.check(1, now=100.5)
+    assert reason.startswith("ramping up") and change == "" and not monitor.held
+    assert monitor.check(1, now=101.0) == ("", "")
+
+
+def test_saturation_holds_until_every_signal_clears_the_hysteresis():
+    monitor = _monitor([{"cpu": 0.95}, {"cpu": 0.85}, {"cpu": 0.75}])
+    reason, change = monitor.check(1, now=100.0)
+    assert change == "hold" and reason.startswith("cpu 95%") and monitor.held
+    reason, change = monitor.check(1, now=101.0)
+    assert change == "" and reason.startswith("cpu 85% >= 80%")
+    assert monitor.check(1, now=102.0) == ("", "release")
+    assert not monitor.held
+
+
+@pytest.mark.parametrize(
+    "sample, word",
+    [
+        ({"mem_avail_mb": 512, "mem_avail_pct": 50.0}, "memory"),
+        ({"mem_avail_mb": 8192, "mem_avail_pct": 5.0}, "memory"),
+        ({"io": 0.5}, "io pressure"),
+    ],
+)
+def test_memory_and_io_saturate_too(sample, word):
+    reason, change = _monitor([sample]).check(1, now=100.0)
+    assert change == "hold" and word in reason
+
+
+def test_missing_metrics_do_not_limit_admission():
+    assert _monitor([{}]).check(3, now=100.0) == ("", "")
+
+
+def test_samples_are_cached_for_the_sample_interval(monkeypatch):
+    calls = []
+    monkeypatch.setattr(host_load, "_proc_mem", lambda: calls.append(1) or (4096.0, 8192.0))
+    monitor = HostMonitor(admission_policy({"adaptive_admission": {"sample_sec": 2.0}}))
+    first = monitor.sample(now=100.0)
+    assert first["mem_avail_mb"] == 4096 and first["mem_avail_pct"] == 50.0
+    assert monitor.sample(now=101.0) is first
+    monitor.sample(now=102.5)
+    assert len(calls) == 2
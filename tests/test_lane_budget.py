@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import json
+import sys
+
+import dispatch
+import lane_budget
+from stream_events import StreamExtractor
+
+
+def _turn(msg_id, output_tokens):
+    usage = {"input_tokens": 10, "output_tokens": output_tokens}
+    return json.dumps({"type": "assistant", "message": {"id": msg_id, "content": [], "usage": usage}})
+
+
+def test_lane_budget_prefers_worker_then_engine_then_defaults():
+    defaults = {"max_wall_seconds": 600, "max_tokens": 1000}
+    assert lane_budget.lane_budget(defaults, {}, {}) == {"max_wall_seconds": 600, "max_tokens": 1000}
+    assert lane_budget.lane_budget(defaults, {"max_tokens": 500}, {}) == {"max_wall_seconds": 600, "max_tokens": 500}
+    assert lane_budget.lane_budget(defaults, {"max_tokens": 500}, {"max_tokens": 0, "max_wall_seconds": "bad"}) == {}
+
+
+def test_run_budget_ignores_zero_and_non_dict():
+    assert lane_budget.run_budget({"run_budget": 5}) == {}
+    assert lane_budget.run_budget({"run_budget": {"max_tokens": 3e6, "max_wall_seconds": 0}}) == {"max_tokens": 3000000}
+
+
+def test_exceeded_trips_on_the_token_count():
+    budget = {"max_tokens": 100}
+    assert lane_budget.exceeded(budget, 5.0, None) is None
+    assert lane_budget.exceeded(budget, 5.0, 99) is None
+    hit = lane_budget.exceeded(budget, 5.0, 120)
+    assert hit == {"limit": "max_tokens", "value": 100, "used": 120}
+    assert lane_budget.describe(hit) == "max_tokens 100 reached (120)"
+
+
+def test_exceeded_checks_wall_clock_first():
+    hit = lane_budget.exceeded({"max_wall_seconds": 10, "max_tokens": 1}, 12.34, 50)
+    assert hit == {"limit": "max_wall_seconds", "value": 10, "used": 12.3}
+
+
+def test_claude_stream_turns_add_up_to_a_token_trip():
+    extractor = StreamExtractor("claude")
+    events = []
+    for line in (_turn("m1", 30), _turn("m1", 30), _turn("m2", 70)):
+        events.extend(extractor.feed(line))
+    totals = [e["usage"]["total_tokens"] for e in events if e["kind"] == "tokens"]
+    assert totals == [40, 120]
+    assert lane_budget.exceeded({"max_tokens": 100}, 1.0, totals[-1])["limit"] == "max_tokens"
+
+
+def test_claude_lanes_stream_their_usage():
+    command, _stdin, err = dispatch._build_claude_command(prompt="p", worker={"cli_cmd": sys.executable}, defaults={})
+    assert err is None
+    assert command[command.index("--output-format") + 1] == "stream-json" and "--verbose" in command
+    worker = {"cli_cmd": sys.executable, "cli_args": ["--output-format", "json", "-p", "{prompt}"]}
+    command, _stdin, _err = dispatch._build_claude_command(prompt="p", worker=worker, defaults={})
+    assert command[command.index("--output-format") + 1] == "json" and "--verbose" not in command
+
+
+def test_exit_usage_comes_from_the_stream_result_line():
+    log = "\n".join(
+        [
+            _turn("m1", 30),
+            json.dumps({"type": "result", "result": "ok", "usage": {"input_tokens": 10, "output_tokens": 30}, "total_cost_usd": 0.01}),
+        ]
+    )
+    assert dispatch._parse_token_usage(log, "claude")["total_tokens"] == 40
+    assert dispatch._parse_token_usage(_turn("m1", 30), "claude") is None
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+
+import memo_cache
+from memo_cache import MemoCache, cache_key, memo_policy, snapshot, unified_diff
+
+COMMAND = ["codex", "exec", "--model", "m"]
+
+
+def _workspace(tmp_path):
+    ws = tmp_path / "ws"
+    (ws / "src").mkdir(parents=True)
+    (ws / "src" / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (ws / "src" / "b.txt").write_text("notes\n", encoding="utf-8")
+    return ws
+
+
+def test_policy_defaults_to_off_and_honours_the_worker_opt_out():
+    assert memo_policy({}, {})["enabled"] is False
+    assert memo_policy({"memo": True}, {}) == {"enabled": True, "ttl_hours": 24.0}
+    assert memo_policy({"memo": {"ttl_hours": 2}}, {}) == {"enabled": True, "ttl_hours": 2}
+    assert memo_policy({"memo": True}, {"memo": False})["enabled"] is False
+
+
+def test_snapshot_covers_globs_and_missing_plain_paths(tmp_path):
+    ws = _workspace(tmp_path)
+    files = snapshot(ws, ["src/*.py", "out/report.md"])
+    assert files == {"src/a.py": b"a = 1\n", "out/report.md": None}
+
+
+def test_key_changes_when_scope_content_changes(tmp_path):
+    ws = _workspace(tmp_path)
+    key = cache_key(COMMAND, "prompt", snapshot(ws, ["src"]))
+    assert cache_key(COMMAND, "prompt", snapshot(ws, ["src"])) == key
+    (ws / "src" / "a.py").write_text("a = 2\n", encoding="utf-8")
+    changed = cache_key(COMMAND, "prompt", snapshot(ws, ["src"]))
+    assert changed != key
+    (ws / "src" / "c.py").write_text("", encoding="utf-8")
+    assert cache_key(COMMAND, "prompt", snapshot(ws, ["src"])) != changed
+
+
+def test_key_changes_with_the_command_or_prompt(tmp_path):
+    files = snapshot(_workspace(tmp_path), ["src"])
+    key = cache_key(COMMAND, "prompt", files)
+    assert cache_key(COMMAND + ["--full-auto"], "prompt", files) != key
+    assert cache_key(COMMAND, "other prompt", files) != key
+
+
+def test_oversized_scope_is_not_memoized(tmp_path, monkeypatch):
+    monkeypatch.setattr(memo_cache, "MAX_FILES", 1)
+    assert snapshot(_workspace(tmp_path), ["src"]) is None
+
+
+def test_store_then_hit_replays_files_and_restores_the_run_artifacts(tmp_path):
+    ws = _workspace(tmp_path)
+    before = snapshot(ws, ["src"])
+    (ws / "src" / "a.py").write_text("a = 3\n", encoding="utf-8")
+    (ws / "src" / "b.txt").unlink()
+    after = snapshot(ws, ["src"])
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    log, sidecar, result = run_dir / "T1.log", run_dir / "T1.events.jsonl", run_dir / "results" / "T1.md"
+    log.write_text("worker output\n", encoding="utf-8")
+    sidecar.write_text("{}\n", encoding="utf-8")
+    result.parent.mkdir()
+    result.write_text("STATUS: DONE\n", encoding="utf-8")
+    changed = {rel: after.get(rel) for rel in set(before) | set(after) if before.get(rel) != after.get(rel)}
+    key = cache_key(COMMAND, "prompt", before)
+    cache = MemoCache(tmp_path / "runs")
+    cache.store({key: True}, {"task_id": "T1", "exit_code": 0}, log, sidecar, unified_diff(before, after), changed, result)
+
+    (ws / "src" / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (ws / "src" / "b.txt").write_text("notes\n", encoding="utf-8")
+    hit = cache.lookup(key, 24)
+    assert hit["task_id"] == "T1"
+    assert sorted(MemoCache.replay(hit, ws)) == ["src/a.py", "src/b.txt"]
+    assert (ws / "src" / "a.py").read_text(encoding="utf-8") == "a = 3\n"
+    assert not (ws / "src" / "b.txt").exists()
+
+    new_run = tmp_path / "run2"
+    new_run.mkdir()
+    diff = MemoCache.restore_logs(hit, new_run / "T1.log", new_run / "T1.events.jsonl", new_run / "results" / "T1.md")
+    assert (new_run / "T1.log").read_text(encoding="utf-8") == "worker output\n"
+    assert (new_run / "results" / "T1.md").read_text(encoding="utf-8") == "STATUS: DONE\n"
+    assert diff == new_run / "T1.diff" and "-a = 1" in diff.read_text(encoding="utf-8")
+
+
+def test_lookup_drops_entries_past_the_ttl(tmp_path):
+    cache = MemoCache(tmp_path)
+    cache.store({"ab" * 32: False}, {}, tmp_path / "none.log", tmp_path / "none.jsonl", "", {})
+    entry = cache._dir("ab" * 32) / "entry.json"
+    record = json.loads(entry.read_text(encoding="utf-8"))
+    record["stored_at"] = time.time() - 3 * 3600
+    entry.write_text(json.dumps(record), encoding="utf-8")
+    assert cache.lookup("ab" * 32, 24) is not None
+    assert cache.lookup("ab" * 32, 1) is None
+    assert not entry.parent.exists()
+
+
+def test_prune_removes_only_old_entries(tmp_path):
+    cache = MemoCache(tmp_path)
+    for key in ("aa" * 32, "bb" * 32):
+        cache.store({key: False}, {}, tmp_path / "none.log", tmp_path / "none.jsonl", "", {})
+    old = cache._dir("aa" * 32)
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    assert cache.prune(1) == 1
+    assert not old.exists() and cache._dir("bb" * 32).exists()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from outcome_index import OutcomeIndex, index_path
+
+
+def test_index_path_lives_next_to_the_run_dirs(tmp_path):
+    assert index_path(tmp_path, "AGENT") == tmp_path / ".outcomes.AGENT.json"
+
+
+def test_record_persists_and_reloads(tmp_path):
+    path = index_path(tmp_path, "AGENT")
+    index = OutcomeIndex(path)
+    assert index.get("T1") is None
+    index.record("T1", {"state": "DONE", "block": "", "log_mtime": 1.5})
+    assert OutcomeIndex(path).get("T1") == {"state": "DONE", "block": "", "log_mtime": 1.5}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_get_returns_a_copy(tmp_path):
+    index = OutcomeIndex(tmp_path / "o.json")
+    index.record("T1", {"block": "readonly_policy"}, flush=False)
+    index.get("T1")["block"] = ""
+    assert index.get("T1") == {"block": "readonly_policy"}
+
+
+def test_flush_is_deferred_until_asked(tmp_path):
+    path = tmp_path / "o.json"
+    index = OutcomeIndex(path)
+    index.record("T1", {"state": "FAILED"}, flush=False)
+    assert not path.exists()
+    index.flush()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"tasks": {"T1": {"state": "FAILED"}}}
+
+
+def test_unreadable_index_starts_empty(tmp_path):
+    path = tmp_path / "o.json"
+    path.write_text("{not json", encoding="utf-8")
+    assert OutcomeIndex(path).get("T1") is None
+
+
+def test_concurrent_records_all_reach_the_file(tmp_path, capsys):
+    path = tmp_path / "o.json"
+    index = OutcomeIndex(path)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: index.record(f"T{i}", {"state": "DONE"}), range(64)))
+    assert "not saved" not in capsys.readouterr().out
+    assert len(json.loads(path.read_text(encoding="utf-8"))["tasks"]) == 64
+    assert not list(tmp_path.glob("*.tmp"))
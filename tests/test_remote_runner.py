@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import os
+import socket
+import socketserver
+import sys
+import threading
+
+import pytest
+
+import remote_runner
+from remote_runner import Host, RemoteProcess, RunnerAgent, load_hosts, map_path, recv_frame, send_frame
+
+TOKEN = "t0ken"
+
+
+@pytest.fixture
+def agent():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), remote_runner._Handler)
+    server.daemon_threads = True
+    server.agent_ref = RunnerAgent(TOKEN, 1)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_frame_round_trip():
+    a, b = socket.socketpair()
+    with a, b:
+        send_frame(a, {"type": "output", "data": "héllo\n" * 1000})
+        send_frame(a, {"type": "exit", "code": 3})
+        assert recv_frame(b) == {"type": "output", "data": "héllo\n" * 1000}
+        assert recv_frame(b) == {"type": "exit", "code": 3}
+
+
+def test_oversized_frame_is_rejected_before_reading_its_body():
+    a, b = socket.socketpair()
+    with a, b:
+        a.sendall(remote_runner._HEADER.pack(remote_runner.MAX_FRAME + 1))
+        with pytest.raises(ValueError, match="exceeds"):
+            recv_frame(b)
+
+
+def test_non_object_and_truncated_frames_are_errors():
+    a, b = socket.socketpair()
+    with b:
+        body = b"[1, 2]"
+        a.sendall(remote_runner._HEADER.pack(len(body)) + body)
+        with pytest.raises(ValueError, match="not a JSON object"):
+            recv_frame(b)
+        a.sendall(remote_runner._HEADER.pack(10) + b"{}")
+        a.close()
+        with pytest.raises(EOFError):
+            recv_frame(b)
+
+
+def test_load_hosts_validates_entries(monkeypatch):
+    monkeypatch.setenv("ORCH_RUNNER_TOKEN", "from-env")
+    hosts = load_hosts({"hosts": [{"name": "gpu", "address": "10.0.0.5:7711", "slots": 0}, {"name": "off", "enabled": False}]})
+    assert list(hosts) == ["gpu"]
+    assert (hosts["gpu"].slots, hosts["gpu"].token) == (1, "from-env")
+    for bad in ([{"name": "local", "address": "h:1"}], [{"name": "a", "address": "no-port"}], {"name": "a"}):
+        with pytest.raises(ValueError):
+            load_hosts({"hosts": bad})
+
+
+def test_map_path_rewrites_only_paths_under_the_workspace():
+    assert map_path("/ws/repo/a.py", "/ws", "/srv/ws") == "/srv/ws/repo/a.py"
+    assert map_path("/ws", "/ws/", "/srv/ws/") == "/srv/ws"
+    assert map_path("/wsx/a.py", "/ws", "/srv/ws") == "/wsx/a.py"
+    assert map_path("/ws/a.py", "/ws", "") == "/ws/a.py"
+
+
+def test_probe_reports_slots_and_rejects_a_bad_token(agent):
+    host = Host(name="h", address=agent, slots=4, token=TOKEN)
+    remote_runner.probe(host)
+    assert host.up and host.slots == 1
+    bad = Host(name="h", address=agent, slots=1, token="wrong")
+    remote_runner.probe(bad)
+    assert not bad.up and bad.error == "bad token"
+
+
+def test_agent_runs_a_lane_and_streams_its_output(agent, tmp_path):
+    host = Host(name="h", address=agent, slots=1, token=TOKEN)
+    log = tmp_path / "lane.log"
+    fd = os.open(log, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+    script = "import sys; print(sys.stdin.read().upper()); sys.exit(3)"
+    proc = RemoteProcess.start(host, "T1", [sys.executable, "-c", script], str(tmp_path), "done", fd)
+    assert proc.wait(timeout=30) == 3
+    assert log.read_text(encoding="utf-8") == "DONE\n"
+
+
+def test_agent_refuses_a_lane_without_a_free_slot(agent, tmp_path):
+    host = Host(name="h", address=agent, slots=1, token=TOKEN)
+    fd = os.open(tmp_path / "a.log", os.O_WRONLY | os.O_CREAT)
+    first = RemoteProcess.start(host, "T1", [sys.executable, "-c", "import time; time.sleep(30)"], str(tmp_path), None, fd)
+    try:
+        with pytest.raises(RuntimeError, match="no free slot"):
+            RemoteProcess.start(host, "T2", [sys.executable, "-c", "pass"], str(tmp_path), None, -1)
+    finally:
+        first.kill()
+    assert first.wait(timeout=30) != 0
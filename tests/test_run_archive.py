@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+import zipfile
+
+import pytest
+
+import run_archive
+from run_archive import ArchivedRun, apply_retention, archive_root, compress_pending, list_archived, set_aside
+
+
+def _run_dir(runs_root, name="AGENT", mtime=None):
+    run_dir = runs_root / name
+    run_dir.mkdir(parents=True)
+    (run_dir / "manifest.json").write_text(json.dumps({"started": [{"task_id": "T1"}], "journal_offset": 0}), encoding="utf-8")
+    (run_dir / "events.jsonl").write_text(json.dumps({"event": "exited", "task_id": "T1", "data": {"exit_code": 0}}) + "\n", encoding="utf-8")
+    (run_dir / "T1.log").write_bytes(b"x" * 600_000 + b"END\n")
+    if mtime is not None:
+        os.utime(run_dir / "manifest.json", (mtime, mtime))
+    return run_dir
+
+
+def _zip(root, stem, age_days, size=0):
+    path = root / f"{stem}.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("pad", os.urandom(size))
+    ts = time.time() - age_days * 86400
+    os.utime(path, (ts, ts))
+    return path
+
+
+def test_set_aside_moves_the_run_and_never_overwrites(tmp_path):
+    ts = time.mktime((2026, 1, 2, 3, 4, 5, 0, 0, -1))
+    first = set_aside(_run_dir(tmp_path, mtime=ts), tmp_path)
+    assert first == archive_root(tmp_path) / "AGENT.20260102_030405.pending"
+    assert not (tmp_path / "AGENT").exists()
+    second = set_aside(_run_dir(tmp_path, mtime=ts), tmp_path)
+    assert second.name == "AGENT.20260102_030405-2.pending"
+
+
+def test_set_aside_steps_past_an_already_packed_run(tmp_path):
+    ts = time.mktime((2026, 1, 2, 3, 4, 5, 0, 0, -1))
+    set_aside(_run_dir(tmp_path, mtime=ts), tmp_path)
+    compress_pending(tmp_path)
+    assert set_aside(_run_dir(tmp_path, mtime=ts), tmp_path).name == "AGENT.20260102_030405-2.pending"
+
+
+def test_set_aside_skips_missing_and_empty_dirs(tmp_path):
+    assert set_aside(tmp_path / "missing", tmp_path) is None
+    (tmp_path / "empty").mkdir()
+    assert set_aside(tmp_path / "empty", tmp_path) is None
+
+
+def test_pending_runs_are_packed_and_stay_readable(tmp_path):
+    pending = set_aside(_run_dir(tmp_path), tmp_path)
+    stem = pending.name[: -len(run_archive.PENDING_SUFFIX)]
+    assert ArchivedRun(tmp_path, stem).manifest()["started"][0]["exit_code"] == 0
+    assert compress_pending(tmp_path) == [archive_root(tmp_path) / f"{stem}.zip"]
+    assert not pending.exists()
+    assert [s for s, _ in list_archived(tmp_path)] == [stem]
+    run = ArchivedRun(tmp_path, stem)
+    assert run.path.suffix == ".zip"
+    assert run.manifest()["started"][0]["exit_code"] == 0
+    assert run.tail("T1.log", 10) == b"xxxxxxEND\n"
+    assert run.tail("T1.log", 300_000) == b"x" * 299_996 + b"END\n"
+
+
+def test_stale_packing_claims_are_retaken(tmp_path, monkeypatch):
+    pending = set_aside(_run_dir(tmp_path), tmp_path)
+    stem = pending.name[: -len(run_archive.PENDING_SUFFIX)]
+    claimed = pending.with_name(f"{stem}.packing.99999")
+    os.replace(pending, claimed)
+    assert compress_pending(tmp_path) == []
+    monkeypatch.setattr(run_archive, "_STALE_PACKING_SEC", -1.0)
+    assert compress_pending(tmp_path) == [archive_root(tmp_path) / f"{stem}.zip"]
+
+
+@pytest.mark.parametrize("name", ["", ".", "..", "../AGENT", "a/b", "a\\b"])
+def test_names_outside_the_archive_are_refused(tmp_path, name):
+    set_aside(_run_dir(tmp_path), tmp_path)
+    (tmp_path / "secret.txt").write_text("no", encoding="utf-8")
+    assert not ArchivedRun(tmp_path, name).exists
+    stem = list_archived(tmp_path)[0][0]
+    run = ArchivedRun(tmp_path, stem)
+    assert run.read(name) is None and run.tail(name) is None
+    assert run.read("../../secret.txt") is None
+
+
+def test_retention_prunes_by_count_age_and_size(tmp_path):
+    root = archive_root(tmp_path)
+    root.mkdir(parents=True)
+    newest, mid, old = _zip(root, "a", 0, 1000), _zip(root, "b", 1, 1000), _zip(root, "c", 40, 1000)
+    assert apply_retention(tmp_path, {"keep_runs": 0, "max_age_days": 30, "max_total_mb": 0}) == [old]
+    assert apply_retention(tmp_path, {"keep_runs": 1, "max_age_days": 0, "max_total_mb": 0}) == [mid]
+    extra = _zip(root, "d", 2, 600_000)
+    assert apply_retention(tmp_path, {"keep_runs": 0, "max_age_days": 0, "max_total_mb": 0.5}) == [extra]
+    assert newest.exists()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+
+import run_journal
+from run_journal import apply_event
+
+
+def _event(kind, task_id=None, **data):
+    return {"event": kind, "task_id": task_id, "data": data}
+
+
+def _row_event(kind, task_id, **fields):
+    return {"event": kind, "task_id": task_id, "data": {"task_id": task_id, **fields}}
+
+
+def test_run_event_merges_into_the_top_level():
+    manifest = {"orch_id": "AGENT"}
+    apply_event(manifest, _event("run", dag={"stages": [["T1"]]}))
+    assert manifest == {"orch_id": "AGENT", "dag": {"stages": [["T1"]]}}
+
+
+def test_row_events_replace_rows_by_task_id():
+    manifest = {}
+    apply_event(manifest, _row_event("queued", "T1", waiting_on="slot"))
+    apply_event(manifest, _row_event("queued", "T1", waiting_on="engine"))
+    assert manifest["queued"] == [{"task_id": "T1", "waiting_on": "engine"}]
+    apply_event(manifest, _row_event("launched", "T1", pid=42))
+    assert manifest["queued"] == []
+    assert manifest["started"] == [{"task_id": "T1", "pid": 42}]
+
+
+def test_dequeued_drops_the_queue_row():
+    manifest = {"queued": [{"task_id": "T1"}, {"task_id": "T2"}]}
+    apply_event(manifest, _event("dequeued", "T1"))
+    assert manifest["queued"] == [{"task_id": "T2"}]
+
+
+def test_other_events_update_the_started_row():
+    manifest = {"started": [{"task_id": "T1", "pid": 42}]}
+    apply_event(manifest, _event("exited", "T1", exit_code=0))
+    apply_event(manifest, _event("tokens", "T9", token_usage={"total_tokens": 5}))
+    assert manifest["started"] == [{"task_id": "T1", "pid": 42, "exit_code": 0}]
+
+
+def test_event_without_data_dict_is_harmless():
+    manifest = {"started": [{"task_id": "T1"}]}
+    apply_event(manifest, {"event": "updated", "task_id": "T1", "data": "junk"})
+    assert manifest == {"started": [{"task_id": "T1"}]}
+
+
+def test_journal_round_trip_through_snapshot_and_events(tmp_path):
+    journal = run_journal.RunJournal(tmp_path, {"orch_id": "AGENT"}, snapshot_interval=3600)
+    journal.emit("launched", "T1", {"task_id": "T1", "pid": 1})
+    journal.snapshot(force=True)
+    journal.emit("exited", "T1", {"exit_code": 0})
+    reader = run_journal.ManifestReader()
+    manifest = reader.read(tmp_path)
+    assert manifest["started"] == [{"task_id": "T1", "pid": 1, "exit_code": 0}]
+    journal.close()
+    assert json.loads((tmp_path / run_journal.MANIFEST_FILE).read_text(encoding="utf-8-sig"))["started"][0]["exit_code"] == 0
+
+
+def test_read_events_skips_a_partial_last_line(tmp_path):
+    (tmp_path / run_journal.EVENTS_FILE).write_bytes(b'{"event": "run", "data": {}}\n{"event": "ru')
+    events, offset = run_journal.read_events(tmp_path)
+    assert [e["event"] for e in events] == ["run"]
+    assert offset == len(b'{"event": "run", "data": {}}\n')
+    assert run_journal.read_events(tmp_path, offset + 100) == ([], 0)
+
+
+def test_manifest_reader_forgets_a_removed_run(tmp_path):
+    reader = run_journal.ManifestReader()
+    assert reader.read(tmp_path / "missing") is None
+
+
+def test_manifest_reader_does_not_mutate_a_returned_manifest(tmp_path):
+    journal = run_journal.RunJournal(tmp_path, {"orch_id": "AGENT"}, snapshot_interval=3600)
+    journal.emit("launched", "T1", {"task_id": "T1", "pid": 1})
+    journal.snapshot(force=True)
+    reader = run_journal.ManifestReader()
+    first = reader.read(tmp_path)
+    journal.emit("exited", "T1", {"exit_code": 0})
+    journal.emit("launched", "T2", {"task_id": "T2", "pid": 2})
+    second = reader.read(tmp_path)
+    assert first["started"] == [{"task_id": "T1", "pid": 1}]
+    assert [row["task_id"] for row in second["started"]] == ["T1", "T2"]
+    assert second["started"][0]["exit_code"] == 0
+    journal.close()
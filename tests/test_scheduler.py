@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""The dispatcher's queue hooks, driven without launching anything."""
+import argparse
+
+import dispatch
+import memo_cache
+from outcome_index import OutcomeIndex
+from run_journal import RunJournal
+
+
+def _run(tmp_path, task_id, **kw):
+    return dispatch.WorkerRun(
+        task_id=task_id,
+        owner="o",
+        role="r",
+        engine="codex",
+        workspace=str(tmp_path),
+        command=["codex", "exec"],
+        log_file=tmp_path / f"{task_id}.log",
+        prompt_file="T.md",
+        repo="",
+        **kw,
+    )
+
+
+def _scheduler(tmp_path, runs, defaults=None):
+    run_dir = tmp_path / "runs" / "T"
+    run_dir.mkdir(parents=True)
+    journal = RunJournal(run_dir, {"started": [], "manual": [], "failed": [], "queued": []})
+    args = argparse.Namespace(dry_run=True, simulate=False, wait=False)
+    return dispatch._Scheduler(
+        args,
+        journal,
+        runs,
+        workspace=str(tmp_path),
+        defaults=defaults or {},
+        engines_cfg={},
+        hosts={},
+        local_slots=None,
+        hedge_groups={},
+        shard_groups={},
+        runs_root=tmp_path / "runs",
+        run_dir=run_dir,
+        orch_id="T",
+        stamp="20260101_000000",
+        outcomes=OutcomeIndex(tmp_path / "index.json"),
+        memo=memo_cache.MemoCache(tmp_path / "runs"),
+        max_concurrent=0,
+        stream_output=False,
+        results_file=None,
+        engine_versions={},
+        engine_command=lambda *a: (None, None, "unused"),
+    )
+
+
+def test_missing_dependency_fails_its_dependents_transitively(tmp_path):
+    runs = [_run(tmp_path, "A", depends_on=["X"]), _run(tmp_path, "B", depends_on=["A"]), _run(tmp_path, "C")]
+    sched = _scheduler(tmp_path, runs)
+    assert sched.dep_state == {"X": "MISSING"}
+    sched.propagate_dep_failures()
+    assert [run.task_id for run in sched.queue] == ["C"]
+    assert sched.dep_state == {"X": "MISSING", "A": "FAILED", "B": "FAILED"}
+    failed = {row["task_id"]: row for row in sched.journal.manifest["failed"]}
+    assert failed["A"]["state"] == "DEP_FAILED" and failed["A"]["error"] == "dependency X was not dispatched"
+    assert failed["B"]["error"] == "dependency A failed"
+
+
+def test_dependency_cycle_is_skipped(tmp_path):
+    runs = [_run(tmp_path, "A", depends_on=["B"]), _run(tmp_path, "B", depends_on=["A"])]
+    sched = _scheduler(tmp_path, runs)
+    sched.propagate_dep_failures()
+    assert sched.queue == []
+    assert {row["error"] for row in sched.journal.manifest["failed"]} == {"dependency cycle"}
+
+
+def test_overlapping_scope_waits_for_the_lane_ahead(tmp_path):
+    a, b, c = (_run(tmp_path, "A", scope=["src"]), _run(tmp_path, "B", scope=["src/x.py"]), _run(tmp_path, "C", scope=["docs"]))
+    sched = _scheduler(tmp_path, [a, b, c])
+    assert sched.scope_blocker(a) == ""
+    assert sched.scope_blocker(b) == "A"
+    assert sched.scope_blocker(c) == ""
+    sched.queue.remove(a)
+    assert sched.scope_blocker(b) == ""
+    sched.active_runs["A"] = a
+    assert sched.scope_blocker(b) == "A"
+
+
+def test_scope_scheduling_can_be_turned_off(tmp_path):
+    runs = [_run(tmp_path, "A", scope=["src"]), _run(tmp_path, "B", scope=["src"])]
+    sched = _scheduler(tmp_path, runs, {"scope_scheduling": False})
+    assert sched.scope_blocker(runs[1]) == ""
+    assert not sched.supervised
+
+
+def test_requeue_keeps_priority_order_and_journals_the_reason(tmp_path):
+    a, b = _run(tmp_path, "A", priority=1), _run(tmp_path, "B", priority=2)
+    sched = _scheduler(tmp_path, [b])
+    sched.requeue(a, "retry_backoff")
+    assert [run.task_id for run in sched.queue] == ["A", "B"]
+    assert sched.waiting_on["A"] == "retry_backoff"
+    row = next(r for r in sched.journal.manifest["queued"] if r["task_id"] == "A")
+    assert row["waiting_on"] == "retry_backoff"
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import scope_plan
+
+
+def test_scope_patterns_normalizes_and_dedupes():
+    worker = {"scope_paths": ["./server/api/", "server\\api", "docs/./x.md", ""]}
+    assert scope_plan.scope_patterns(worker) == ["docs/x.md", "server/api"]
+    assert scope_plan.scope_patterns({"scope_paths": "a.py, b.py"}) == ["a.py", "b.py"]
+    assert scope_plan.scope_patterns({}) == []
+
+
+def test_static_prefix_stops_at_the_first_glob():
+    assert scope_plan.static_prefix("server/api/*.py") == "server/api"
+    assert scope_plan.static_prefix("*/x.py") == ""
+    assert scope_plan.static_prefix("a/b.py") == "a/b.py"
+
+
+def test_literal_paths_overlap_when_nested():
+    assert scope_plan.paths_overlap("server", "server/api/x.py")
+    assert scope_plan.paths_overlap("a.py", "a.py")
+    assert not scope_plan.paths_overlap("server/api", "server/apis")
+    assert not scope_plan.paths_overlap("client", "server")
+
+
+def test_glob_against_literal():
+    assert scope_plan.paths_overlap("server/api/*.py", "server/api/x.py")
+    assert not scope_plan.paths_overlap("server/api/*.py", "server/api/x.js")
+    # A directory above the glob contains its matches; one below may hold a match.
+    assert scope_plan.paths_overlap("server/api/*.py", "server")
+    assert scope_plan.paths_overlap("server/*/x.py", "server/api")
+    assert not scope_plan.paths_overlap("server/api/*.py", "client/x.py")
+
+
+def test_two_globs_overlap_by_prefix():
+    assert scope_plan.paths_overlap("server/*.py", "server/api/*.py")
+    assert not scope_plan.paths_overlap("server/*.py", "client/*.py")
+
+
+def test_conflict_graph_and_waves():
+    scopes = {"T1": ["server/api"], "T2": ["server/api/x.py"], "T3": ["client"], "T4": []}
+    graph = scope_plan.conflict_graph(scopes)
+    assert graph == {"T1": {"T2": "server/api <> server/api/x.py"}, "T2": {"T1": "server/api/x.py <> server/api"}}
+    assert scope_plan.waves(["T1", "T2", "T3", "T4"], graph) == [["T1", "T3", "T4"], ["T2"]]
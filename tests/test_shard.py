@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import shard
+
+
+def test_shard_policy_forms():
+    assert shard.shard_policy({}) == {"count": 0, "by": "size", "review": False}
+    assert shard.shard_policy({"shard": 3})["count"] == 3
+    assert shard.shard_policy({"shard": True})["count"] == 0
+    assert shard.shard_policy({"shard": 99})["count"] == shard.MAX_SHARDS
+    policy = shard.shard_policy({"shard": {"count": "2", "by": "LINES", "review": True}})
+    assert policy == {"count": 2, "by": "lines", "review": True}
+
+
+def test_shard_policy_rejects_bad_values():
+    with pytest.raises(ValueError):
+        shard.shard_policy({"shard": "many"})
+    with pytest.raises(ValueError):
+        shard.shard_policy({"shard": {"count": 2, "by": "words"}})
+
+
+def test_partition_balances_largest_first():
+    weights = {"a.py": 10, "b.py": 7, "c.py": 5, "d.py": 3, "e.py": 1}
+    parts = shard.partition(weights, 2)
+    assert parts == [["a.py", "d.py"], ["b.py", "c.py", "e.py"]]
+    assert [sum(weights[f] for f in part) for part in parts] == [13, 13]
+
+
+def test_partition_never_returns_empty_shards():
+    assert shard.partition({"a.py": 1}, 4) == [["a.py"]]
+    assert shard.partition({}, 3) == []
+
+
+def _workspace(tmp_path):
+    pkg = tmp_path / "pkg"
+    pkg.mkdir()
+    for name, size in {"a.py": 400, "b.py": 300, "c.py": 200, "d.py": 100}.items():
+        (pkg / name).write_text("x" * size, encoding="utf-8")
+    return tmp_path
+
+
+def test_expand_splits_scope_into_lanes_with_a_review(tmp_path):
+    worker = {"task_id": "T1", "goal": "tidy", "scope_paths": ["pkg"], "shard": {"count": 2, "review": True}, "hedge": 2}
+    workers, groups, notes = shard.expand([worker, {"task_id": "T2"}], str(_workspace(tmp_path)))
+    ids = [w["task_id"] for w in workers]
+    assert ids == ["T1.1", "T1.2", "T1.review", "T2"]
+    assert workers[0]["scope_paths"] == ["pkg/a.py", "pkg/d.py"]
+    assert workers[1]["scope_paths"] == ["pkg/b.py", "pkg/c.py"]
+    assert all("shard" not in w for w in workers)
+    review = workers[2]
+    assert review["depends_on"] == ["T1.1", "T1.2"]
+    assert "hedge" not in review
+    assert groups["T1"]["after"] == ["T1.review"]
+    assert [row["weight"] for row in groups["T1"]["shards"]] == [500, 500]
+    assert notes and notes[0].startswith("[SHARD] T1:")
+
+
+def test_expand_runs_unsharded_without_files(tmp_path):
+    worker = {"task_id": "T1", "scope_paths": ["nothing-here"], "shard": 3}
+    workers, groups, notes = shard.expand([worker], str(tmp_path))
+    assert workers == [{"task_id": "T1", "scope_paths": ["nothing-here"]}]
+    assert groups == {}
+    assert "running unsharded" in notes[0]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import task_dag
+
+
+def test_dependencies_accepts_list_or_comma_string():
+    assert task_dag.dependencies({"depends_on": ["T1", " T2 ", "T1", ""]}) == ["T1", "T2"]
+    assert task_dag.dependencies({"depends_on": "T1, T3"}) == ["T1", "T3"]
+    assert task_dag.dependencies({"depends_on": 5}) == []
+    assert task_dag.dependencies({}) == []
+
+
+def test_topo_order_keeps_given_order_where_possible():
+    order, cyclic = task_dag.topo_order(["A", "B", "C", "D"], {"A": ["C"], "D": ["B"]})
+    assert order == ["B", "C", "A", "D"]
+    assert cyclic == []
+
+
+def test_topo_order_ignores_unknown_dependencies():
+    order, cyclic = task_dag.topo_order(["A", "B"], {"A": ["GONE"]})
+    assert order == ["A", "B"]
+    assert cyclic == []
+
+
+def test_topo_order_reports_cycles_and_their_dependents():
+    order, cyclic = task_dag.topo_order(["A", "B", "C", "D"], {"A": ["B"], "B": ["A"], "C": ["B"]})
+    assert order == ["D"]
+    assert cyclic == ["A", "B", "C"]
+
+
+def test_stages_group_by_longest_chain():
+    deps = {"B": ["A"], "C": ["A"], "D": ["B", "C"], "E": []}
+    assert task_dag.stages(["A", "E", "B", "C", "D"], deps) == [["A", "E"], ["B", "C"], ["D"]]
+    assert task_dag.stages([], {}) == []
+
+
+def test_critical_path_follows_the_longest_duration():
+    deps = {"B": ["A"], "C": ["A"], "D": ["B", "C"]}
+    durations = {"A": 1.0, "B": 5.0, "C": 2.0, "D": 1.5}
+    assert task_dag.critical_path(["A", "B", "C", "D"], deps, durations) == (["A", "B", "D"], 7.5)
+
+
+def test_critical_path_counts_missing_durations_as_zero():
+    deps = {"C": ["A", "B"]}
+    assert task_dag.critical_path(["A", "B", "C"], deps, {"A": None, "B": 2, "C": 1}) == (["B", "C"], 3.0)
+    assert task_dag.critical_path([], {}, {}) == ([], 0.0)